@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Servidor local que imita a API HTTP do vMix (Function=SetText)
+
+Grava cada chamada com horário de chegada e de aplicação e guarda o texto
+atual de cada campo (o que estaria no ar). Permite injetar latência,
+erros HTTP, timeouts e travar o host por completo.
+
+Uso isolado (aponte o ip/porta do vmix_updater/config.json para ele):
+    python benchmarks/fake_vmix.py --port 8088 --latency 20 --error-rate 0.05
+
+Controle pela própria API:
+    /fake/config?latency=0.05&jitter=0.01&error_rate=0.1&stalled=1  (em segundos)
+    /fake/calls   chamadas gravadas (JSON)
+    /fake/state   texto atual de cada campo (JSON)
+    /fake/reset   limpa chamadas e estado
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class FakeVmix:
+    """Estado e injeção de falhas do vMix falso"""
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, jitter=0.0,
+                 error_rate=0.0, timeout_rate=0.0, timeout=30.0, seed=None):
+        self.latency = latency          # segundos por chamada
+        self.jitter = jitter            # segundos, uniforme em [-jitter, +jitter]
+        self.error_rate = error_rate    # fração respondida com HTTP 500
+        self.timeout_rate = timeout_rate  # fração que fica `timeout` s sem resposta
+        self.timeout = timeout
+        self.rng = random.Random(seed)
+
+        self.calls = []
+        self.state = {}
+        self._lock = threading.Lock()
+        # Host travado: chamadas ficam esperando até release()
+        self._running = threading.Event()
+        self._running.set()
+
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.host, self.port = self.server.server_address[:2]
+
+    @property
+    def stalled(self):
+        return not self._running.is_set()
+
+    def stall(self):
+        self._running.clear()
+
+    def release(self):
+        self._running.set()
+
+    def configure(self, **options):
+        for name in ("latency", "jitter", "error_rate", "timeout_rate", "timeout"):
+            if name in options:
+                setattr(self, name, float(options[name]))
+        if "stalled" in options:
+            self.stall() if str(options["stalled"]) in ("1", "true", "True") else self.release()
+
+    def reset(self):
+        with self._lock:
+            self.calls.clear()
+            self.state.clear()
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def close(self):
+        self.release()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def set_text(self, params):
+        """Aplica um SetText; retorna (status HTTP, corpo)"""
+        received = time.time()
+        self._running.wait()
+
+        with self._lock:
+            roll = self.rng.random()
+            delay = max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter))
+
+        if roll < self.timeout_rate:
+            time.sleep(self.timeout)
+            status = 504
+        else:
+            time.sleep(delay)
+            status = 500 if roll < self.timeout_rate + self.error_rate else 200
+
+        call = {
+            "received": received,
+            "applied": time.time() if status == 200 else None,
+            "status": status,
+            "input": params.get("Input"),
+            "field": params.get("SelectedName"),
+            "value": params.get("Value"),
+        }
+        with self._lock:
+            self.calls.append(call)
+            if status == 200:
+                self.state[(call["input"], call["field"])] = call["value"]
+
+        if status == 200:
+            return 200, "Function completed successfully."
+        return status, "Erro injetado"
+
+    def _handler(self):
+        vmix = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+                if url.path == "/API" and params.get("Function") == "SetText":
+                    status, body = vmix.set_text(params)
+                    self.reply(status, body, "text/plain")
+                elif url.path == "/fake/config":
+                    vmix.configure(**params)
+                    self.reply(200, json.dumps(vmix.settings()))
+                elif url.path == "/fake/calls":
+                    with vmix._lock:
+                        self.reply(200, json.dumps(vmix.calls))
+                elif url.path == "/fake/state":
+                    with vmix._lock:
+                        state = {f"{title}/{field}": value
+                                 for (title, field), value in vmix.state.items()}
+                    self.reply(200, json.dumps(state, ensure_ascii=False))
+                elif url.path == "/fake/reset":
+                    vmix.reset()
+                    self.reply(200, "{}")
+                else:
+                    self.reply(404, "Função desconhecida", "text/plain")
+
+            def reply(self, status, body, content_type="application/json"):
+                data = body.encode("utf-8")
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    # Cliente desistiu (timeout do lado do updater)
+                    pass
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def settings(self):
+        return {
+            "latency": self.latency,
+            "jitter": self.jitter,
+            "error_rate": self.error_rate,
+            "timeout_rate": self.timeout_rate,
+            "timeout": self.timeout,
+            "stalled": self.stalled,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="vMix falso para testes locais")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8088)
+    parser.add_argument("--latency", type=float, default=0, help="ms por chamada")
+    parser.add_argument("--jitter", type=float, default=0, help="ms (±)")
+    parser.add_argument("--error-rate", type=float, default=0, help="fração com HTTP 500")
+    parser.add_argument("--timeout-rate", type=float, default=0, help="fração sem resposta")
+    parser.add_argument("--timeout", type=float, default=30, help="s sem resposta")
+    args = parser.parse_args()
+
+    vmix = FakeVmix(args.host, args.port, args.latency / 1000, args.jitter / 1000,
+                    args.error_rate, args.timeout_rate, args.timeout)
+    print(f"🎬 vMix falso em http://{vmix.host}:{vmix.port}/API")
+    print("💡 Pressione Ctrl+C para parar")
+    try:
+        vmix.server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n⏹️  {len(vmix.calls)} chamadas recebidas")
+    finally:
+        vmix.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
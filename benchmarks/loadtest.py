@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+Teste de carga ponta a ponta do dashboard web
+
+- um coletor falso publica snapshots sintéticos por IPC (o mesmo canal do
+  collector_daemon.py), na taxa pedida
+- web/app.py roda em outro processo, assinando esse canal
+  (COLLECTOR_ADDRESS), como em produção com o daemon
+- clientes Socket.IO simulados recebem os patches e medem a latência de
+  entrega; pollers REST consultam /api/data com If-None-Match
+
+Relata o tempo de fan-out de cada snapshot (emits de todas as salas),
+a latência de entrega por patch, conexões perdidas, patches com salto de
+seq e CPU/memória do servidor.
+
+Uso:
+    python benchmarks/loadtest.py --clients 500 --pollers 20 --rate 2 --duration 30
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import secrets
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from datetime import datetime
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from collector_daemon import SnapshotPublisher  # noqa: E402
+
+
+# ---------------------------------------------------------------------------
+# Servidor (processo separado)
+# ---------------------------------------------------------------------------
+
+def memory_rss():
+    """RSS atual do processo em bytes (Linux), ou o pico (outros Unix)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        pass
+    try:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        return None
+
+
+def serve(port):
+    """Sobe web/app.py assinando o coletor falso, com a rota /loadtest/stats"""
+    sys.path.insert(0, os.path.join(ROOT, "web"))
+    import app as webapp
+
+    # Fan-out: emits de todas as salas de um snapshot
+    fanout = []
+    emit_patches = webapp.emit_patches
+
+    def timed_emit(patches):
+        start = time.perf_counter()
+        emit_patches(patches)
+        fanout.append(time.perf_counter() - start)
+
+    webapp.emit_patches = timed_emit
+
+    @webapp.app.route("/loadtest/stats")
+    def loadtest_stats():
+        return webapp.jsonify({
+            "cpu_seconds": time.process_time(),
+            "rss": memory_rss(),
+            "fanout": fanout,
+        })
+
+    webapp.start_background()
+    webapp.socketio.run(webapp.app, host="127.0.0.1", port=port, log_output=False,
+                        allow_unsafe_werkzeug=True)
+
+
+# ---------------------------------------------------------------------------
+# Coletor falso
+# ---------------------------------------------------------------------------
+
+class SyntheticFeed:
+    """Snapshots sintéticos no formato do collect_all_data"""
+
+    def __init__(self, symbols, change_ratio=1.0, seed=42):
+        self.rng = random.Random(seed)
+        self.change_ratio = change_ratio
+        self.cambio = {
+            f"USD-{currency}": {"rate": rate, "change": 0.0, "change_percent": 0.0,
+                                "source": "Replay"}
+            for currency, rate in (("BRL", 5.0), ("EUR", 0.92), ("JPY", 150.0))
+        }
+        self.bolsa = {
+            f"IDX{i:04d}": {"price": self.rng.uniform(1000, 130000), "change": 0.0,
+                            "change_percent": 0.0, "volume": 0, "source": "Replay"}
+            for i in range(symbols)
+        }
+
+    def next(self):
+        for group in (self.cambio, self.bolsa):
+            for info in group.values():
+                if self.rng.random() > self.change_ratio:
+                    continue
+                key = "rate" if "rate" in info else "price"
+                move = info[key] * self.rng.gauss(0, 0.001)
+                info[key] = round(info[key] + move, 4)
+                info["change"] = round(info["change"] + move, 4)
+                info["change_percent"] = round(self.rng.gauss(0, 1), 2)
+                if "volume" in info:
+                    info["volume"] += self.rng.randint(100, 10000)
+
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "cambio": json.loads(json.dumps(self.cambio)),
+            "bolsa": json.loads(json.dumps(self.bolsa)),
+            "market_status": {"B3": {"is_open": True}},
+        }
+
+
+def publish_loop(publisher, feed, rate, stop):
+    interval = 1.0 / rate
+    next_run = time.monotonic()
+    while not stop.is_set():
+        publisher.publish(feed.next(), datetime.now())
+        next_run += interval
+        stop.wait(max(0.0, next_run - time.monotonic()))
+
+
+# ---------------------------------------------------------------------------
+# Clientes simulados
+# ---------------------------------------------------------------------------
+
+async def socket_client(url, stats, stop, subscribe=None):
+    import socketio
+
+    client = socketio.AsyncClient(reconnection=False)
+    seqs = {}
+
+    @client.on("data_update")
+    async def on_update(message):
+        seqs.update(message.get("seqs", {}))
+
+    @client.on("data_patch")
+    async def on_patch(patch):
+        received = time.time()
+        sent = datetime.fromisoformat(patch["timestamp"]).timestamp()
+        stats["latencies"].append(received - sent)
+        stats["patches"] += 1
+
+        # Patch mais antigo que o snapshot recebido: o dashboard ignora
+        last = seqs.get(patch["room"])
+        if last is not None and patch["seq"] <= last:
+            return
+        if last is not None and patch["seq"] != last + 1:
+            stats["gaps"] += 1
+        seqs[patch["room"]] = patch["seq"]
+
+    @client.on("disconnect")
+    async def on_disconnect(*args):
+        if not stop.is_set():
+            stats["dropped"] += 1
+
+    try:
+        await client.connect(url, transports=["websocket"], wait_timeout=30)
+        stats["connected"] += 1
+        if subscribe:
+            await client.emit("subscribe", subscribe)
+    except Exception:
+        stats["failed"] += 1
+        return
+
+    await stop.wait()
+    await client.disconnect()
+
+
+async def rest_poller(url, interval, stats, stop):
+    import aiohttp
+
+    etag = None
+    async with aiohttp.ClientSession() as session:
+        while not stop.is_set():
+            headers = {"If-None-Match": etag} if etag else {}
+            start = time.perf_counter()
+            try:
+                async with session.get(f"{url}/api/data", headers=headers) as response:
+                    await response.read()
+                    stats["rest_latencies"].append(time.perf_counter() - start)
+                    stats["rest_status"][response.status] = (
+                        stats["rest_status"].get(response.status, 0) + 1
+                    )
+                    etag = response.headers.get("ETag", etag)
+            except Exception:
+                stats["rest_errors"] += 1
+            try:
+                await asyncio.wait_for(stop.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+async def run_clients(url, clients, pollers, poll_interval, duration, ramp, subscribe_ratio):
+    stats = {
+        "latencies": [], "patches": 0, "gaps": 0, "connected": 0, "failed": 0,
+        "dropped": 0, "rest_latencies": [], "rest_status": {}, "rest_errors": 0,
+    }
+    stop = asyncio.Event()
+    tasks = []
+
+    for i in range(clients):
+        subscribe = None
+        if i < clients * subscribe_ratio:
+            subscribe = {"symbols": [f"IDX{i % 10:04d}"], "groups": ["cambio"]}
+        tasks.append(asyncio.ensure_future(socket_client(url, stats, stop, subscribe)))
+        if ramp:
+            await asyncio.sleep(ramp / max(clients, 1))
+    for _ in range(pollers):
+        tasks.append(asyncio.ensure_future(rest_poller(url, poll_interval, stats, stop)))
+
+    await asyncio.sleep(duration)
+    stop.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return stats
+
+
+def client_process(url, clients, pollers, args, results):
+    stats = asyncio.run(run_clients(url, clients, pollers, args.poll_interval, args.duration,
+                                    args.ramp, args.subscribe_ratio))
+    results.put(stats)
+
+
+def merge_stats(parts):
+    merged = parts[0]
+    for part in parts[1:]:
+        for key, value in part.items():
+            if isinstance(value, list):
+                merged[key].extend(value)
+            elif isinstance(value, dict):
+                for status, count in value.items():
+                    merged[key][status] = merged[key].get(status, 0) + count
+            else:
+                merged[key] += value
+    return merged
+
+
+# ---------------------------------------------------------------------------
+# Orquestração
+# ---------------------------------------------------------------------------
+
+def get_json(url):
+    with urllib.request.urlopen(url, timeout=10) as response:
+        return json.loads(response.read())
+
+
+def wait_server(url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return get_json(f"{url}/loadtest/stats")
+        except OSError:
+            if time.monotonic() > deadline:
+                raise TimeoutError("servidor não respondeu a tempo")
+            time.sleep(0.1)
+
+
+def sample_server(url, stop, samples):
+    """CPU (%) e memória do servidor a cada segundo"""
+    last = None
+    while not stop.wait(1.0):
+        try:
+            stats = get_json(f"{url}/loadtest/stats")
+        except OSError:
+            continue
+        now = time.monotonic()
+        if last is not None:
+            cpu = (stats["cpu_seconds"] - last[1]) / (now - last[0]) * 100
+            samples.append((cpu, stats["rss"]))
+        last = (now, stats["cpu_seconds"])
+
+
+def percentiles(values, scale=1000):
+    if not len(values):
+        return "sem amostras"
+    p50, p90, p99 = np.percentile(np.array(values) * scale, [50, 90, 99])
+    return f"p50 {p50:8.1f} | p90 {p90:8.1f} | p99 {p99:8.1f} | máx {max(values) * scale:8.1f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do dashboard web")
+    parser.add_argument("--clients", type=int, default=200, help="clientes Socket.IO")
+    parser.add_argument("--pollers", type=int, default=10, help="clientes REST em /api/data")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="segundos entre GETs")
+    parser.add_argument("--rate", type=float, default=1.0, help="snapshots por segundo")
+    parser.add_argument("--symbols", type=int, default=100, help="símbolos por snapshot")
+    parser.add_argument("--change-ratio", type=float, default=1.0,
+                        help="fração dos símbolos que muda a cada snapshot")
+    parser.add_argument("--subscribe-ratio", type=float, default=0.0,
+                        help="fração dos clientes que assina só alguns símbolos")
+    parser.add_argument("--duration", type=float, default=30, help="segundos de carga")
+    parser.add_argument("--ramp", type=float, default=5, help="segundos para conectar todos")
+    parser.add_argument("--procs", type=int, default=1, help="processos de clientes")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port)
+        return
+
+    url = f"http://127.0.0.1:{args.port}"
+    address = f"127.0.0.1:{args.port + 1}"
+
+    print("🏋️  TESTE DE CARGA DO DASHBOARD")
+    print("=" * 90)
+    print(f"👥 {args.clients} clientes Socket.IO, {args.pollers} pollers REST, {args.procs} processo(s)")
+    print(f"📡 {args.rate} snapshots/s com {args.symbols} símbolos por {args.duration}s")
+
+    # Chave do canal só desta execução (o daemon não tem chave padrão)
+    authkey = secrets.token_hex(16)
+    publisher = SnapshotPublisher(address, authkey)
+    publisher.start()
+    feed = SyntheticFeed(args.symbols, args.change_ratio)
+    publisher.publish(feed.next(), datetime.now())
+
+    env = dict(
+        os.environ, COLLECTOR_ADDRESS=address, COLLECTOR_AUTHKEY=authkey, PYTHONIOENCODING="utf-8"
+    )
+    log = tempfile.TemporaryFile()
+    server = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--serve", "--port", str(args.port)],
+        env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+
+    stop = threading.Event()
+    samples = []
+    try:
+        wait_server(url)
+
+        publisher_thread = threading.Thread(
+            target=publish_loop, args=(publisher, feed, args.rate, stop), daemon=True
+        )
+        publisher_thread.start()
+        threading.Thread(target=sample_server, args=(url, stop, samples), daemon=True).start()
+
+        results = multiprocessing.Queue()
+        procs = []
+        for i in range(args.procs):
+            clients = args.clients // args.procs + (1 if i < args.clients % args.procs else 0)
+            pollers = args.pollers // args.procs + (1 if i < args.pollers % args.procs else 0)
+            proc = multiprocessing.Process(
+                target=client_process, args=(url, clients, pollers, args, results)
+            )
+            proc.start()
+            procs.append(proc)
+
+        timeout = args.duration + args.ramp + 60
+        parts = [results.get(timeout=timeout) for _ in procs]
+        for proc in procs:
+            proc.join()
+        stats = merge_stats(parts)
+        server_stats = get_json(f"{url}/loadtest/stats")
+    finally:
+        stop.set()
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+        publisher.close()
+
+    print("-" * 90)
+    print(f"🔌 Conexões: {stats['connected']} ok, {stats['failed']} falharam, "
+          f"{stats['dropped']} caíram durante o teste")
+    print(f"📦 Fan-out por snapshot ({len(server_stats['fanout'])}): "
+          f"{percentiles(server_stats['fanout'])}")
+    print(f"📨 Entrega por patch ({stats['patches']}, {stats['gaps']} saltos de seq): "
+          f"{percentiles(stats['latencies'])}")
+    print(f"🌐 REST /api/data ({len(stats['rest_latencies'])} GETs, status {stats['rest_status']}, "
+          f"{stats['rest_errors']} erros): {percentiles(stats['rest_latencies'])}")
+    if samples:
+        cpu = [cpu for cpu, _ in samples]
+        rss = [rss for _, rss in samples if rss]
+        line = f"🖥️  Servidor: CPU média {np.mean(cpu):5.1f}% (máx {max(cpu):5.1f}%)"
+        if rss:
+            line += f", memória máx {max(rss) / 1024 / 1024:7.1f} MB"
+        print(line)
+    print("=" * 90)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Benchmark offline do pipeline de coleta (sem acessar Yahoo/BCB)
+
+Mede, para watchlists de 10 a 1000 símbolos, sobre um pregão em replay:
+- get_index_data_yahoo: N índices
+- get_stock_data: N ações (metadados e barras incrementais)
+- get_summary: snapshot com N índices
+- collect_all_data: coleta completa com N ações em STOCK_SYMBOLS
+
+Relata a primeira chamada (fria), os percentis p50/p90/p99 das chamadas
+seguintes (uma barra nova por chamada), a vazão e o pico de memória
+(tracemalloc, em uma rodada separada).
+
+Uso:
+    python benchmarks/pipeline.py
+    python benchmarks/pipeline.py --sizes 10 100 --iterations 50 --cases stocks collect
+    python benchmarks/pipeline.py --fixtures benchmarks/fixtures/pregao.json.gz
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from replay import FixtureSet, ReplayTransport, synthetic_index_symbols, synthetic_stock_symbols
+
+from bolsa_api import BolsaAPI
+from financial_collector import FinancialDataCollector
+from metadata_cache import MetadataCache
+
+DEFAULT_SIZES = [10, 50, 100, 500, 1000]
+
+
+def metadata_cache(workdir):
+    """Cache de metadados vazio e fora do cache/ do projeto"""
+    return MetadataCache(path=os.path.join(workdir, f"metadata_{time.monotonic_ns()}.json"))
+
+
+def index_case(size, workdir):
+    bolsa = BolsaAPI(metadata_cache=metadata_cache(workdir))
+    watchlist = synthetic_index_symbols(size)
+    return lambda: bolsa.get_index_data_yahoo(watchlist)
+
+
+def stocks_case(size, workdir):
+    bolsa = BolsaAPI(metadata_cache=metadata_cache(workdir))
+    watchlist = synthetic_stock_symbols(size)
+    return lambda: bolsa.get_stock_data(watchlist)
+
+
+def summary_case(size, workdir):
+    bolsa = BolsaAPI(metadata_cache=metadata_cache(workdir))
+    collector = new_collector(0, workdir)
+    snapshot = {
+        "timestamp": "2025-01-02T10:00:00",
+        "cambio": collector.cambio_api.get_all_rates(),
+        "bolsa": bolsa.get_index_data_yahoo(synthetic_index_symbols(size)),
+        "market_status": bolsa.get_market_status(),
+    }
+    return lambda: FinancialDataCollector.get_summary(snapshot)
+
+
+def collect_case(size, workdir):
+    collector = new_collector(size, workdir)
+    return collector.collect_all_data
+
+
+def new_collector(size, workdir):
+    collector = FinancialDataCollector()
+    collector.bolsa_api = BolsaAPI(metadata_cache=metadata_cache(workdir))
+    collector.stock_symbols = synthetic_stock_symbols(size)
+    collector.fixer_api_key = None
+    return collector
+
+
+# nome -> (função que prepara a chamada, unidade da vazão)
+CASES = {
+    "indices": (index_case, "chamadas/s"),
+    "stocks": (stocks_case, "chamadas/s"),
+    "summary": (summary_case, "resumos/s"),
+    "collect": (collect_case, "snapshots/s"),
+}
+
+
+def run_case(fixtures, case, size, iterations, workdir, quiet=True):
+    """Retorna (latência fria, latências seguintes, vazão)"""
+    setup, _ = CASES[case]
+    output = io.StringIO() if quiet else sys.stdout
+
+    with ReplayTransport(fixtures) as transport, contextlib.redirect_stdout(output):
+        call = setup(size, workdir)
+
+        start = time.perf_counter()
+        call()
+        cold = time.perf_counter() - start
+
+        latencies = []
+        for _ in range(iterations):
+            transport.advance()
+            start = time.perf_counter()
+            call()
+            latencies.append(time.perf_counter() - start)
+
+    throughput = len(latencies) / sum(latencies) if latencies else 0.0
+    return cold, np.array(latencies), throughput
+
+
+def peak_memory(fixtures, case, size, iterations, workdir):
+    """Pico de memória alocada (MB) na preparação, chamada fria e algumas seguintes"""
+    tracemalloc.start()
+    try:
+        run_case(fixtures, case, size, iterations, workdir)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline do pipeline de coleta")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="tamanhos de watchlist")
+    parser.add_argument("--iterations", type=int, default=30,
+                        help="chamadas medidas depois da fria (uma barra nova cada)")
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--fixtures", help="fixtures gravadas (benchmarks/replay.py record)")
+    parser.add_argument("--no-memory", action="store_true", help="não mede o pico de memória")
+    parser.add_argument("--verbose", action="store_true", help="mostra a saída do coletor")
+    args = parser.parse_args()
+
+    print("⏱️  BENCHMARK OFFLINE DO PIPELINE")
+    print("=" * 100)
+
+    base = FixtureSet.load(args.fixtures) if args.fixtures else None
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            if base is None:
+                fixtures = FixtureSet.synthetic(n_stocks=size, n_indices=size)
+            else:
+                fixtures = base
+                fixtures.add_stocks(synthetic_stock_symbols(size))
+                fixtures.add_indices(list(synthetic_index_symbols(size).values()))
+
+            print(f"📋 Watchlist com {size} símbolos")
+            for case in args.cases:
+                cold, latencies, throughput = run_case(
+                    fixtures, case, size, args.iterations, workdir, quiet=not args.verbose
+                )
+                p50, p90, p99 = np.percentile(latencies * 1000, [50, 90, 99])
+                line = (
+                    f"   {case:8} fria {cold * 1000:9.1f} ms | p50 {p50:8.1f} | p90 {p90:8.1f}"
+                    f" | p99 {p99:8.1f} ms | {throughput:8.1f} {CASES[case][1]}"
+                )
+                if not args.no_memory:
+                    peak = peak_memory(fixtures, case, size, min(args.iterations, 3), workdir)
+                    line += f" | pico {peak:7.1f} MB"
+                print(line)
+            print()
+
+    print("=" * 100)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+"""
+Fixtures e transporte de replay para os benchmarks offline
+
+FixtureSet guarda um pregão inteiro de barras de 1 minuto por símbolo, os
+metadados (ticker.info) e as respostas JSON das APIs REST. ReplayTransport
+substitui, durante um bloco `with`, as chamadas de rede do coletor:
+
+- yfinance.download e yfinance.Ticker (history, info)
+- HttpPool.get (fontes REST síncronas)
+- aiohttp.ClientSession (fontes REST assíncronas)
+
+O relógio do replay avança uma barra por vez (advance), então os
+downloads incrementais recebem só as barras novas, como no pregão real.
+
+Fixtures gravadas das APIs reais:
+    python benchmarks/replay.py record benchmarks/fixtures/pregao.json.gz PETR4 VALE3
+"""
+
+import gzip
+import json
+import os
+import sys
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from cambio_api import BCB_URL, EXCHANGERATE_URL, FIXER_URL  # noqa: E402
+
+FIELDS = ["Open", "High", "Low", "Close", "Volume"]
+
+# Índices e pares consultados pelo coletor
+INDEX_SYMBOLS = ["^BVSP", "^GSPC", "^IXIC", "^DJI", "^GDAXI", "^FTSE", "^N225", "^HSI"]
+FX_SYMBOLS = ["USDBRL=X", "EURUSD=X", "USDJPY=X", "USDCNY=X", "USDINR=X", "USDKRW=X"]
+
+# Pregão sintético: 2025-01-02, 13:00 UTC (10:00 em Brasília), 8 horas
+SESSION_START = pd.Timestamp("2025-01-02 13:00", tz="UTC")
+SESSION_BARS = 480
+
+
+def stock_ticker(symbol: str) -> str:
+    return f"{symbol}.SA"
+
+
+def synthetic_stock_symbols(n: int) -> List[str]:
+    return [f"S{i:04d}" for i in range(n)]
+
+
+def synthetic_index_symbols(n: int) -> Dict[str, str]:
+    """Watchlist de índices sintéticos {nome: símbolo do Yahoo}"""
+    return {f"IDX{i:04d}": f"^IDX{i:04d}" for i in range(n)}
+
+
+class FixtureSet:
+    """Barras do pregão, metadados e respostas REST usados no replay"""
+
+    def __init__(self, index: pd.DatetimeIndex, bars: Dict[str, np.ndarray],
+                 info: Dict[str, Dict], rest: Dict[str, object]):
+        self.index = index
+        # símbolo -> array (barras, 5) com Open, High, Low, Close, Volume
+        self.bars = bars
+        self.info = info
+        self.rest = rest
+
+    @classmethod
+    def synthetic(cls, n_stocks: int = 10, n_indices: int = 0, bars: int = SESSION_BARS,
+                  seed: int = 42) -> "FixtureSet":
+        """Pregão sintético determinístico (passeio aleatório por símbolo)"""
+        rng = np.random.default_rng(seed)
+        index = pd.date_range(SESSION_START, periods=bars, freq="1min")
+
+        fixtures = cls(index, {}, {}, {})
+        base_prices = {"USDBRL=X": 5.0, "EURUSD=X": 1.08, "USDJPY=X": 150.0,
+                       "USDCNY=X": 7.2, "USDINR=X": 83.0, "USDKRW=X": 1300.0}
+        for symbol in FX_SYMBOLS:
+            fixtures.bars[symbol] = random_walk(rng, bars, base_prices[symbol], volume=False)
+        fixtures.add_indices(INDEX_SYMBOLS + list(synthetic_index_symbols(n_indices).values()), rng)
+        fixtures.add_stocks(synthetic_stock_symbols(n_stocks), rng)
+
+        fixtures.rest = {
+            BCB_URL: [{"data": "02/01/2025", "valor": "5.0123"}],
+            EXCHANGERATE_URL: {
+                "base": "USD",
+                "rates": {"BRL": 5.01, "EUR": 0.925, "JPY": 150.1, "CNY": 7.21,
+                          "INR": 83.2, "KRW": 1301.5},
+            },
+        }
+        return fixtures
+
+    def add_stocks(self, symbols: List[str], rng=None) -> None:
+        """Garante barras e metadados para as ações da watchlist"""
+        rng = rng or np.random.default_rng(len(self.bars))
+        recorded = [ticker for ticker in self.info if ticker in self.bars]
+        for symbol in symbols:
+            ticker = stock_ticker(symbol)
+            if ticker in self.bars:
+                continue
+            self._add_series(ticker, recorded, rng, 5, 100)
+            self.info[ticker] = {
+                "marketCap": int(rng.integers(10**8, 10**11)),
+                "longName": f"{symbol} S.A.",
+            }
+
+    def add_indices(self, symbols: List[str], rng=None) -> None:
+        """Garante barras para os índices da watchlist"""
+        rng = rng or np.random.default_rng(len(self.bars))
+        recorded = [symbol for symbol in INDEX_SYMBOLS if symbol in self.bars]
+        for symbol in symbols:
+            if symbol not in self.bars:
+                self._add_series(symbol, recorded, rng, 1000, 130000)
+
+    def _add_series(self, symbol, recorded, rng, low, high) -> None:
+        # Em fixtures gravadas, símbolos que faltam copiam uma série gravada
+        if recorded:
+            self.bars[symbol] = self.bars[recorded[len(self.bars) % len(recorded)]].copy()
+        else:
+            self.bars[symbol] = random_walk(rng, len(self.index), rng.uniform(low, high))
+
+    def frame(self, symbols: List[str], rows: slice) -> pd.DataFrame:
+        """Frame no formato do yf.download(group_by="column"): colunas (campo, ticker)"""
+        symbols = [symbol for symbol in symbols if symbol in self.bars]
+        index = self.index[rows]
+        if not symbols:
+            return pd.DataFrame(index=index)
+
+        # (barras, campos, tickers) -> colunas ordenadas por campo e ticker
+        values = np.stack([self.bars[symbol][rows] for symbol in symbols], axis=2)
+        columns = pd.MultiIndex.from_product([FIELDS, symbols], names=["Price", "Ticker"])
+        return pd.DataFrame(values.reshape(len(index), -1), index=index, columns=columns)
+
+    def save(self, path: str) -> None:
+        payload = {
+            "index": [int(ts.timestamp()) for ts in self.index],
+            "bars": {
+                symbol: [[None if np.isnan(v) else float(v) for v in column]
+                         for column in values.T]
+                for symbol, values in self.bars.items()
+            },
+            "info": self.info,
+            "rest": self.rest,
+        }
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "wt", encoding="utf-8") as f:
+            json.dump(payload, f)
+
+    @classmethod
+    def load(cls, path: str) -> "FixtureSet":
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            payload = json.load(f)
+
+        index = pd.to_datetime(payload["index"], unit="s", utc=True)
+        bars = {
+            symbol: np.array(columns, dtype=np.float64).T
+            for symbol, columns in payload["bars"].items()
+        }
+        return cls(index, bars, payload["info"], payload["rest"])
+
+
+def random_walk(rng, bars: int, start: float, volume: bool = True) -> np.ndarray:
+    """Barras OHLCV de um passeio aleatório começando em start"""
+    close = start * np.exp(np.cumsum(rng.normal(0, 0.0008, bars)))
+    open_ = np.concatenate(([start], close[:-1]))
+    spread = np.abs(rng.normal(0, 0.0004, bars)) * close
+    high = np.maximum(open_, close) + spread
+    low = np.minimum(open_, close) - spread
+    volumes = rng.integers(1_000, 100_000, bars).astype(np.float64) if volume else np.zeros(bars)
+    return np.column_stack((open_, high, low, close, volumes))
+
+
+class ReplayResponse:
+    """Resposta mínima no formato de requests"""
+
+    def __init__(self, url: str, payload):
+        self.url = url
+        self.payload = payload
+        self.status_code = self.status = 200 if payload is not None else 404
+
+    def raise_for_status(self):
+        if self.payload is None:
+            raise OSError(f"{self.status} sem fixture para {self.url}")
+
+    def json(self, **kwargs):
+        self.raise_for_status()
+        return self.payload
+
+
+class AsyncReplayResponse(ReplayResponse):
+    """aiohttp: `async with session.get(url) as response` e `await response.json()`"""
+
+    async def json(self, **kwargs):
+        return ReplayResponse.json(self)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class ReplaySession:
+    """Substitui aiohttp.ClientSession: respostas vêm das fixtures"""
+
+    def __init__(self, transport: "ReplayTransport", connector=None, **kwargs):
+        self.transport = transport
+        self.connector = connector
+
+    def get(self, url: str, **kwargs):
+        response = self.transport.respond(url)
+        return AsyncReplayResponse(response.url, response.payload)
+
+    async def close(self):
+        if self.connector is not None:
+            await self.connector.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+        return False
+
+
+class ReplayTicker:
+    """Substitui yfinance.Ticker: history e info vêm das fixtures"""
+
+    def __init__(self, transport: "ReplayTransport", symbol: str):
+        self.transport = transport
+        self.symbol = symbol
+        transport.calls["ticker"] += 1
+
+    @property
+    def info(self) -> Dict:
+        self.transport.calls["info"] += 1
+        return dict(self.transport.fixtures.info.get(self.symbol, {}))
+
+    def history(self, period: str = "1d", interval: str = "1m", **kwargs) -> pd.DataFrame:
+        self.transport.calls["history"] += 1
+        frame = self.transport.fixtures.frame([self.symbol], slice(0, self.transport.cursor))
+        if frame.empty:
+            return pd.DataFrame(columns=FIELDS)
+        return frame.xs(self.symbol, axis=1, level=1)
+
+
+class ReplayTransport:
+    """
+    Durante o `with`, as chamadas de rede do coletor são respondidas pelas
+    fixtures, com o relógio do replay em `cursor` barras desde a abertura
+    """
+
+    def __init__(self, fixtures: FixtureSet, warmup_bars: int = 60):
+        self.fixtures = fixtures
+        self.cursor = min(warmup_bars, len(fixtures.index))
+        self.calls = {"download": 0, "ticker": 0, "history": 0, "info": 0, "rest": 0}
+        self._patches = []
+
+    def advance(self, bars: int = 1) -> None:
+        """Avança o relógio do replay (sem passar do fim do pregão)"""
+        self.cursor = min(self.cursor + bars, len(self.fixtures.index))
+
+    def download(self, tickers=None, start=None, period=None, **kwargs) -> pd.DataFrame:
+        self.calls["download"] += 1
+        if isinstance(tickers, str):
+            tickers = tickers.split()
+
+        first = 0
+        if start is not None:
+            first = int(self.fixtures.index.searchsorted(pd.Timestamp(start, unit="s", tz="UTC")))
+        return self.fixtures.frame(list(tickers), slice(first, self.cursor))
+
+    def respond(self, url: str, **kwargs) -> ReplayResponse:
+        self.calls["rest"] += 1
+        return ReplayResponse(url, self.fixtures.rest.get(url))
+
+    def _patch(self, target, name, value):
+        self._patches.append((target, name, getattr(target, name)))
+        setattr(target, name, value)
+
+    def __enter__(self):
+        import aiohttp
+        import yfinance
+
+        from http_pool import HttpPool
+
+        transport = self
+        self._patch(yfinance, "download", self.download)
+        self._patch(yfinance, "Ticker", lambda symbol, *a, **kw: ReplayTicker(transport, symbol))
+        self._patch(HttpPool, "get", lambda pool, url, **kw: transport.respond(url))
+        self._patch(aiohttp, "ClientSession", lambda **kw: ReplaySession(transport, **kw))
+        return self
+
+    def __exit__(self, *exc):
+        while self._patches:
+            target, name, original = self._patches.pop()
+            setattr(target, name, original)
+        return False
+
+
+def record_fixtures(path: str, stocks: List[str], fixer_api_key: Optional[str] = None) -> FixtureSet:
+    """Grava um pregão real (barras de 1 minuto do dia) para replay posterior"""
+    import requests
+    import yfinance as yf
+
+    tickers = FX_SYMBOLS + INDEX_SYMBOLS + [stock_ticker(symbol) for symbol in stocks]
+    frame = yf.download(tickers=tickers, period="1d", interval="1m", group_by="column",
+                        auto_adjust=True, progress=False, threads=True)
+
+    index = frame.index.tz_convert("UTC")
+    bars = {}
+    for ticker in tickers:
+        if ticker in frame.columns.get_level_values(1):
+            bars[ticker] = frame.xs(ticker, axis=1, level=1)[FIELDS].to_numpy(dtype=np.float64)
+
+    info = {}
+    for symbol in stocks:
+        ticker = stock_ticker(symbol)
+        details = yf.Ticker(ticker).info
+        info[ticker] = {"marketCap": details.get("marketCap"), "longName": details.get("longName")}
+
+    urls = [BCB_URL, EXCHANGERATE_URL]
+    if fixer_api_key:
+        urls.append(FIXER_URL.format(api_key=fixer_api_key))
+    rest = {url: requests.get(url, timeout=10).json() for url in urls}
+
+    fixtures = FixtureSet(index, bars, info, rest)
+    fixtures.save(path)
+    return fixtures
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] != "record":
+        print("Uso: python benchmarks/replay.py record <arquivo.json.gz> [AÇÕES...]")
+        sys.exit(1)
+
+    recorded = record_fixtures(sys.argv[2], sys.argv[3:] or ["PETR4", "VALE3", "ITUB4"],
+                               os.getenv("FINHUB_API_KEY"))
+    print(f"💾 {len(recorded.bars)} símbolos, {len(recorded.index)} barras em {sys.argv[2]}")
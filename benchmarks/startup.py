@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Benchmark de inicialização dos pontos de entrada
+
+Para cada ponto de entrada, em processos novos a cada rodada:
+- importação a frio: tempo de `import` do módulo principal
+- primeira resposta: do início do processo até o menu aparecer
+  (run.py, financial_collector.py) ou até o servidor responder GET /
+  (web/run_web.py)
+
+Uso:
+    python benchmarks/startup.py
+    python benchmarks/startup.py --runs 10 --with-data
+"""
+
+import argparse
+import os
+import queue
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (nome, diretório, módulo importado)
+IMPORTS = [
+    ("financial_collector", ROOT, "financial_collector"),
+    ("cambio_api", ROOT, "cambio_api"),
+    ("bolsa_api", ROOT, "bolsa_api"),
+    ("web/app", os.path.join(ROOT, "web"), "app"),
+]
+
+# (nome, script, texto que indica que o programa está pronto)
+MENUS = [
+    ("run.py", "run.py", "Digite sua opção"),
+    ("financial_collector.py", "financial_collector.py", "Escolha uma opção"),
+]
+
+WEB_PORT = 5000
+
+
+def child_env():
+    env = dict(os.environ)
+    env["PYTHONIOENCODING"] = "utf-8"
+    # Impede run_web.py de abrir o navegador
+    env["BROWSER"] = "true"
+    return env
+
+
+def time_import(directory, module):
+    """Tempo (s) de `import module` em um interpretador novo"""
+    code = (
+        "import sys, time\n"
+        f"sys.path.insert(0, {directory!r})\n"
+        "start = time.perf_counter()\n"
+        f"import {module}\n"
+        "print(time.perf_counter() - start)\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=directory,
+        env=child_env(),
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def read_output(proc, chunks):
+    for chunk in iter(lambda: proc.stdout.read1(4096), b""):
+        chunks.put(chunk)
+
+
+def time_menu(script, marker, timeout=60):
+    """Tempo (s) do início do processo até `marker` aparecer na saída"""
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-u", script],
+        cwd=ROOT,
+        env=child_env(),
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+    )
+    chunks = queue.Queue()
+    threading.Thread(target=read_output, args=(proc, chunks), daemon=True).start()
+
+    output = b""
+    expected = marker.encode("utf-8")
+    try:
+        while expected not in output:
+            remaining = timeout - (time.perf_counter() - start)
+            if remaining <= 0:
+                raise TimeoutError(f"{script} não mostrou '{marker}' em {timeout}s")
+            try:
+                output += chunks.get(timeout=remaining)
+            except queue.Empty:
+                continue
+        return time.perf_counter() - start
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+def wait_http(url, deadline):
+    while True:
+        try:
+            with urllib.request.urlopen(url, timeout=5) as response:
+                response.read()
+                return
+        except OSError:
+            if time.perf_counter() > deadline:
+                raise TimeoutError(f"{url} não respondeu a tempo")
+            time.sleep(0.02)
+
+
+def time_web(with_data=False, timeout=120):
+    """
+    Tempo (s) até web/run_web.py responder GET / e, com with_data, até a
+    primeira resposta de /api/data (coleta real nas APIs)
+    """
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-u", "run_web.py"],
+        cwd=os.path.join(ROOT, "web"),
+        env=child_env(),
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = start + timeout
+        wait_http(f"http://127.0.0.1:{WEB_PORT}/", deadline)
+        first_page = time.perf_counter() - start
+
+        first_data = None
+        if with_data:
+            wait_http(f"http://127.0.0.1:{WEB_PORT}/api/data", deadline)
+            first_data = time.perf_counter() - start
+        return first_page, first_data
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+
+
+def report(name, samples):
+    if not samples:
+        print(f"   {name:32} sem amostras")
+        return
+    ms = [sample * 1000 for sample in samples]
+    print(
+        f"   {name:32} mín {min(ms):8.1f} ms | mediana {statistics.median(ms):8.1f} ms"
+        f" | máx {max(ms):8.1f} ms"
+    )
+
+
+def run(measure, runs):
+    samples = []
+    for _ in range(runs):
+        try:
+            samples.append(measure())
+        except Exception as e:
+            print(f"   ⚠️ {e}")
+            break
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de inicialização")
+    parser.add_argument("--runs", type=int, default=5, help="rodadas por medição")
+    parser.add_argument(
+        "--with-data",
+        action="store_true",
+        help="mede também a primeira resposta de /api/data (acessa as APIs reais)",
+    )
+    parser.add_argument("--skip-web", action="store_true", help="não sobe o servidor web")
+    args = parser.parse_args()
+
+    print("⏱️  BENCHMARK DE INICIALIZAÇÃO")
+    print("=" * 80)
+
+    print("📦 Importação a frio")
+    for name, directory, module in IMPORTS:
+        report(name, run(lambda: time_import(directory, module), args.runs))
+
+    print()
+    print("🖥️  Primeira resposta (menu)")
+    for name, script, marker in MENUS:
+        report(name, run(lambda: time_menu(script, marker), args.runs))
+
+    if not args.skip_web:
+        print()
+        print(f"🌐 Primeira resposta (web/run_web.py, porta {WEB_PORT})")
+        results = run(lambda: time_web(args.with_data), args.runs)
+        report("GET /", [page for page, _ in results])
+        if args.with_data:
+            report("GET /api/data", [data for _, data in results])
+
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Driver do caminho gráfico: ApiUpdater real contra o vMix falso
+
+Gera snapshots sintéticos na taxa pedida, coloca cada um na fila do
+ApiUpdater (queue.put) e cruza os envios com as chamadas gravadas no
+servidor falso. Relata:
+- requisições SetText por snapshot
+- tempo de queue.put até o último campo aplicado no vMix
+- snapshots descartados pela caixa de um lugar só e campos com falha
+- comportamento com o host travado (--stall-at / --stall-for)
+
+Uso:
+    python benchmarks/vmix_driver.py --rate 2 --duration 20 --latency 15
+    python benchmarks/vmix_driver.py --stall-at 5 --stall-for 8 --read-timeout 2
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import threading
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fake_vmix import FakeVmix  # noqa: E402
+from http_pool import HttpPool  # noqa: E402
+from vmix_updater import updater as vmix_updater  # noqa: E402
+
+
+PAIRS = {"USD-BRL": 5.0, "USD-EUR": 0.92, "USD-JPY": 150.0, "USD-CNY": 7.2, "USD-KRW": 1300.0}
+
+
+class SnapshotFeed:
+    """Snapshots com os pares e o IBOV que vão para a tarja"""
+
+    def __init__(self, change_ratio=0.5, seed=42):
+        self.rng = random.Random(seed)
+        self.change_ratio = change_ratio
+        self.seq = 0
+        self.cambio = {pair: {"rate": rate, "change": 0.0, "change_percent": 0.0}
+                       for pair, rate in PAIRS.items()}
+        self.ibov = {"price": 125000.0, "change": 0.0, "change_percent": 0.0}
+
+    def next(self):
+        self.seq += 1
+        for info, key in [(info, "rate") for info in self.cambio.values()] + [(self.ibov, "price")]:
+            if self.seq > 1 and self.rng.random() > self.change_ratio:
+                continue
+            move = info[key] * self.rng.gauss(0, 0.0005)
+            info[key] += move
+            info["change"] += move
+            info["change_percent"] = self.rng.gauss(0, 1)
+
+        return {
+            "driver_seq": self.seq,
+            "cambio": {pair: dict(info) for pair, info in self.cambio.items()},
+            "bolsa": {"IBOV": dict(self.ibov)},
+        }
+
+
+class TimedUpdater:
+    """Registra início e fim de cada push do ApiUpdater"""
+
+    def __init__(self, updater):
+        self.updater = updater
+        self.pushes = []
+        self.busy = False
+        self._push = updater.push
+        updater.push = self.push
+
+    def push(self, data):
+        self.busy = True
+        start = time.time()
+        try:
+            return self._push(data)
+        finally:
+            self.pushes.append({
+                "seq": data["driver_seq"], "start": start, "end": time.time(),
+                "batch": self.updater.last_batch,
+            })
+            self.busy = False
+
+
+def percentiles(values, scale=1000):
+    if not values:
+        return "sem amostras"
+    p50, p90, p99 = np.percentile(np.array(values) * scale, [50, 90, 99])
+    return f"p50 {p50:8.1f} | p90 {p90:8.1f} | p99 {p99:8.1f} | máx {max(values) * scale:8.1f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Driver do ApiUpdater contra o vMix falso")
+    parser.add_argument("--rate", type=float, default=1.0, help="snapshots por segundo")
+    parser.add_argument("--duration", type=float, default=20, help="segundos")
+    parser.add_argument("--change-ratio", type=float, default=0.5,
+                        help="fração das cotações que muda a cada snapshot")
+    parser.add_argument("--latency", type=float, default=10, help="ms por SetText")
+    parser.add_argument("--jitter", type=float, default=5, help="ms (±)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fração com HTTP 500")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="fração sem resposta")
+    parser.add_argument("--stall-at", type=float, help="s após o início em que o host trava")
+    parser.add_argument("--stall-for", type=float, default=5, help="s com o host travado")
+    parser.add_argument("--read-timeout", type=float, default=5, help="timeout de leitura (s)")
+    parser.add_argument("--retries", type=int, default=1, help="novas tentativas por SetText")
+    parser.add_argument("--max-concurrency", type=int, help="SetText simultâneos por host")
+    parser.add_argument("--resync", type=float, default=300, help="s entre reenvios completos")
+    parser.add_argument("--verbose", action="store_true", help="mostra a saída do updater")
+    args = parser.parse_args()
+
+    # load_config() lê vmix_updater/config.json relativo ao diretório atual
+    os.chdir(ROOT)
+
+    vmix = FakeVmix(latency=args.latency / 1000, jitter=args.jitter / 1000,
+                    error_rate=args.error_rate, timeout_rate=args.timeout_rate,
+                    timeout=args.read_timeout * 3, seed=1).start()
+    vmix_updater.vmix_pool = HttpPool(
+        pool_size=8, connect_timeout=1, read_timeout=args.read_timeout,
+        retries=args.retries, backoff_factor=0.1,
+    )
+
+    output = sys.stdout if args.verbose else io.StringIO()
+    with contextlib.redirect_stdout(output):
+        updater = vmix_updater.ApiUpdater()
+        updater.config = dict(updater.config, ip=vmix.host, porta=str(vmix.port))
+        updater.resync_interval = args.resync
+        if args.max_concurrency:
+            updater.dispatcher.max_per_host = args.max_concurrency
+        timed = TimedUpdater(updater)
+        updater.start()
+
+    print("🎬 DRIVER vMix (servidor falso)")
+    print("=" * 90)
+    print(f"📡 {args.rate} snapshots/s por {args.duration}s, latência {args.latency}±{args.jitter} ms,"
+          f" erros {args.error_rate:.0%}, timeouts {args.timeout_rate:.0%}")
+
+    stall_window = None
+    if args.stall_at is not None:
+        stall_window = (time.time() + args.stall_at, time.time() + args.stall_at + args.stall_for)
+        threading.Timer(args.stall_at, vmix.stall).start()
+        threading.Timer(args.stall_at + args.stall_for, vmix.release).start()
+        print(f"🧊 Host travado de {args.stall_at}s a {args.stall_at + args.stall_for}s")
+
+    feed = SnapshotFeed(args.change_ratio)
+    put_times = {}
+    with contextlib.redirect_stdout(output):
+        start = time.monotonic()
+        next_put = start
+        while time.monotonic() - start < args.duration:
+            snapshot = feed.next()
+            put_times[snapshot["driver_seq"]] = time.time()
+            updater.queue.put(snapshot)
+            next_put += 1.0 / args.rate
+            time.sleep(max(0.0, next_put - time.monotonic()))
+
+        # Espera o último snapshot ir ao ar
+        deadline = time.monotonic() + args.read_timeout * (args.retries + 1) * 4 + 10
+        while (not updater.queue.empty() or timed.busy) and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    updater.stop()
+    vmix.release()
+
+    calls = list(vmix.calls)
+    rows = []
+    for push in timed.pushes:
+        window = [call for call in calls if push["start"] <= call["received"] <= push["end"]]
+        applied = [call["applied"] for call in window if call["applied"]]
+        rows.append({
+            **push,
+            "requests": len(window),
+            "last_applied": max(applied) if applied else None,
+        })
+
+    latencies = [row["last_applied"] - put_times[row["seq"]] for row in rows if row["last_applied"]]
+    requests = [row["requests"] for row in rows]
+    failed = sum(row["batch"]["failed"] for row in rows if row["batch"])
+    statuses = {}
+    for call in calls:
+        statuses[call["status"]] = statuses.get(call["status"], 0) + 1
+
+    print("-" * 90)
+    print(f"📦 Snapshots: {len(put_times)} colocados na fila, {len(timed.pushes)} enviados, "
+          f"{updater.queue.dropped} descartados (substituídos por um mais novo)")
+    if requests:
+        print(f"📨 SetText por snapshot enviado: média {np.mean(requests):.1f}, máx {max(requests)} "
+              f"({len(calls)} no total, status {statuses}, {failed} campos com falha)")
+    print(f"⏱️  queue.put → último campo aplicado: {percentiles(latencies)}")
+
+    if stall_window:
+        stalled = [row["last_applied"] - put_times[row["seq"]] for row in rows
+                   if row["last_applied"] and stall_window[0] <= put_times[row["seq"]] <= stall_window[1]]
+        recovered = [call["applied"] for call in calls
+                     if call["applied"] and call["applied"] >= stall_window[1]]
+        print(f"🧊 Snapshots colocados durante o travamento: {percentiles(stalled)}")
+        if recovered:
+            print(f"🔁 Primeiro campo aplicado {(min(recovered) - stall_window[1]) * 1000:.0f} ms "
+                  f"depois de destravar")
+        else:
+            print("🔁 Nenhum campo aplicado depois de destravar")
+    print("=" * 90)
+
+    vmix.close()
+
+
+if __name__ == "__main__":
+    main()
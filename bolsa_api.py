@@ -3,17 +3,32 @@ Módulo para capturar dados da bolsa de valores em tempo real
 Inclui Ibovespa, IBX e índices globais
 """
 
-import requests
-import json
+from __future__ import annotations
+
 from datetime import datetime
-from typing import Dict, Optional, List
-import yfinance as yf
+from typing import TYPE_CHECKING, Dict, Optional, List
+
+if TYPE_CHECKING:
+    import yfinance as yf
+
+from intraday_store import IntradayBarStore, missing_tickers, split_by_ticker, summarize_intraday
+from metadata_cache import MetadataCache
+from metrics import span
 
 
 class BolsaAPI:
     """Classe para capturar dados da bolsa de múltiplas fontes"""
+
+    # Campos do ticker.info usados em get_stock_data
+    METADATA_FIELDS = ['marketCap', 'longName']
     
-    def __init__(self):
+    def __init__(self, metadata_cache: Optional[MetadataCache] = None):
+        # Cache de metadados (ticker.info é uma das chamadas mais lentas do Yahoo)
+        self.metadata_cache = metadata_cache or MetadataCache()
+
+        # Barras de 1 minuto das ações, baixadas de forma incremental
+        self.stock_bars = IntradayBarStore(interval="1m")
+
         # Símbolos dos principais índices
         self.indices = {
             'IBOV': '^BVSP',      # Ibovespa
@@ -27,19 +42,79 @@ class BolsaAPI:
             'NIKKEI': '^N225',    # Nikkei 225 (Japão)
             'HANG_SENG': '^HSI'   # Hang Seng (Hong Kong)
         }
-    
-    def get_index_data_yahoo(self, symbols: List[str]) -> Dict:
+
+        # Grupos consultados em get_all_indices
+        self.brazilian_indices = {
+            'IBOV': '^BVSP',
+            'IBRX100': '^BVSP',  # Proxy - idealmente seria um símbolo específico
+            'SMLL': '^BVSP'      # Proxy para Small Cap
+        }
+        self.global_indices = {
+            'SP500': '^GSPC',
+            'NASDAQ': '^IXIC',
+            'DOW': '^DJI',
+            'DAX': '^GDAXI',
+            'FTSE': '^FTSE',
+            'NIKKEI': '^N225',
+            'HANG_SENG': '^HSI'
+        }
+
+    def resolve_symbols(self, *groups: Dict[str, str]) -> Dict[str, List[str]]:
+        """
+        Agrupa os nomes (aliases) por símbolo do Yahoo Finance
+
+        Retorna {símbolo: [nomes]} com cada símbolo uma única vez, na ordem
+        em que aparece nos grupos.
+        """
+        resolved = {}
+        for group in groups:
+            for name, symbol in group.items():
+                names = resolved.setdefault(symbol, [])
+                if name not in names:
+                    names.append(name)
+        return resolved
+
+    def get_index_data_yahoo(self, symbols: Dict[str, str], batch: bool = True) -> Dict:
         """
         Pega dados dos índices usando Yahoo Finance
+
+        Cada símbolo é buscado uma única vez e o resultado é replicado para
+        todos os nomes que apontam para ele. Com batch=True todos os símbolos
+        são baixados em uma única requisição e os indicadores são calculados
+        de uma vez sobre o frame combinado.
+        """
+        resolved = self.resolve_symbols(symbols)
+
+        if batch:
+            quotes = self._get_quotes_yahoo_batch(list(resolved))
+        else:
+            quotes = self._get_quotes_yahoo(list(resolved))
+
+        data = {}
+        for symbol, names in resolved.items():
+            if symbol not in quotes:
+                continue
+            for name in names:
+                data[name] = dict(quotes[symbol])
+
+        # Mantém a ordem dos nomes pedidos
+        return {name: data[name] for name in symbols if name in data}
+
+    def _get_quotes_yahoo(self, tickers: List[str]) -> Dict:
+        """
+        Busca cada símbolo separadamente (uma requisição por ticker)
         """
+        import yfinance as yf
+
         try:
             data = {}
             
-            for name, symbol in symbols.items():
-                ticker = yf.Ticker(symbol)
-                
+            for symbol in tickers:
                 # Pega dados históricos do dia
-                hist = ticker.history(period="1d", interval="5m")
+                with span("source", source="yahoo_indices") as outcome:
+                    hist = yf.Ticker(symbol).history(period="1d", interval="5m")
+                    if hist.empty:
+                        outcome.fail()
                 
                 if not hist.empty:
                     current_price = hist['Close'].iloc[-1]
@@ -51,7 +126,7 @@ class BolsaAPI:
                     change = current_price - open_price
                     change_percent = (change / open_price) * 100 if open_price != 0 else 0
                     
-                    data[name] = {
+                    data[symbol] = {
                         'price': round(current_price, 2),
                         'open': round(open_price, 2),
                         'high': round(high_price, 2),
@@ -68,6 +143,55 @@ class BolsaAPI:
         except Exception as e:
             print(f"Erro ao buscar dados do Yahoo Finance: {e}")
             return {}
+
+    def _get_quotes_yahoo_batch(self, tickers: List[str]) -> Dict:
+        """
+        Baixa todos os símbolos em uma única requisição multi-ticker
+        """
+        import yfinance as yf
+
+        try:
+            if not tickers:
+                return {}
+
+            with span("source", source="yahoo_indices") as outcome:
+                frame = yf.download(
+                    tickers=tickers,
+                    period="1d",
+                    interval="5m",
+                    group_by="column",
+                    auto_adjust=True,
+                    progress=False,
+                    threads=True,
+                )
+                missing = missing_tickers(split_by_ticker(frame, tickers), tickers)
+                if missing:
+                    print(f"⚠️ Yahoo Finance sem barras para: {', '.join(missing)}")
+                    outcome.fail()
+            with span("aggregate", step="indices_summary"):
+                summary = summarize_intraday(frame, tickers)
+
+            data = {}
+            timestamp = datetime.now().isoformat()
+
+            for symbol, row in summary.iterrows():
+                data[symbol] = {
+                    'price': round(float(row['price']), 2),
+                    'open': round(float(row['open']), 2),
+                    'high': round(float(row['high']), 2),
+                    'low': round(float(row['low']), 2),
+                    'change': round(float(row['change']), 2),
+                    'change_percent': round(float(row['change_percent']), 2),
+                    'volume': int(row['volume']) if row['volume'] > 0 else 0,
+                    'timestamp': timestamp,
+                    'source': 'Yahoo Finance',
+                    'symbol': symbol
+                }
+
+            return data
+        except Exception as e:
+            print(f"Erro ao buscar dados do Yahoo Finance: {e}")
+            return {}
     
     def get_ibovespa_b3(self) -> Dict:
         """
@@ -86,47 +210,42 @@ class BolsaAPI:
         """
         Pega dados dos principais índices globais
         """
-        global_indices = {
-            'SP500': '^GSPC',
-            'NASDAQ': '^IXIC',
-            'DOW': '^DJI',
-            'DAX': '^GDAXI',
-            'FTSE': '^FTSE',
-            'NIKKEI': '^N225',
-            'HANG_SENG': '^HSI'
-        }
-        
-        return self.get_index_data_yahoo(global_indices)
+        return self.get_index_data_yahoo(self.global_indices)
     
     def get_brazilian_indices(self) -> Dict:
         """
         Pega dados dos índices brasileiros
         """
-        brazilian_indices = {
-            'IBOV': '^BVSP',
-            'IBRX100': '^BVSP',  # Proxy - idealmente seria um símbolo específico
-            'SMLL': '^BVSP'      # Proxy para Small Cap
-        }
-        
-        return self.get_index_data_yahoo(brazilian_indices)
+        return self.get_index_data_yahoo(self.brazilian_indices)
     
-    def get_stock_data(self, symbols: List[str]) -> Dict:
+    def get_stock_data(
+        self, symbols: List[str], incremental: bool = True, fetch_metadata: bool = True
+    ) -> Dict:
         """
         Pega dados de ações específicas
+
+        Com incremental=True as barras de 1 minuto ficam em memória
+        (self.stock_bars) e cada chamada baixa apenas as barras novas.
+        Com fetch_metadata=False os metadados vêm só do cache (atualizados
+        à parte por refresh_metadata).
         """
+        if incremental:
+            return self._get_stock_data_incremental(symbols, fetch_metadata)
+
+        import yfinance as yf
+
         try:
             data = {}
             
             for symbol in symbols:
-                # Adiciona .SA para ações brasileiras se não tiver sufixo
-                if '.' not in symbol and len(symbol) <= 6:
-                    ticker_symbol = f"{symbol}.SA"
-                else:
-                    ticker_symbol = symbol
+                ticker_symbol = self.stock_ticker_symbol(symbol)
                 
                 ticker = yf.Ticker(ticker_symbol)
-                info = ticker.info
-                hist = ticker.history(period="1d", interval="1m")
+                info = self.get_stock_metadata(ticker_symbol, ticker, fetch_metadata)
+                with span("source", source="yahoo_stocks") as outcome:
+                    hist = ticker.history(period="1d", interval="1m")
+                    if hist.empty:
+                        outcome.fail()
                 
                 if not hist.empty:
                     current_price = hist['Close'].iloc[-1]
@@ -142,8 +261,8 @@ class BolsaAPI:
                         'change': round(change, 2),
                         'change_percent': round(change_percent, 2),
                         'volume': int(hist['Volume'].sum()),
-                        'market_cap': info.get('marketCap', 'N/A'),
-                        'company_name': info.get('longName', symbol),
+                        'market_cap': info.get('marketCap') or 'N/A',
+                        'company_name': info.get('longName') or symbol,
                         'timestamp': datetime.now().isoformat(),
                         'source': 'Yahoo Finance',
                         'symbol': ticker_symbol
@@ -153,22 +272,136 @@ class BolsaAPI:
         except Exception as e:
             print(f"Erro ao buscar dados de ações: {e}")
             return {}
+        finally:
+            self.metadata_cache.save()
+
+    def _get_stock_data_incremental(self, symbols: List[str], fetch_metadata: bool = True) -> Dict:
+        """
+        Atualiza as barras do dia só com as novas e calcula os dados das ações
+        """
+        try:
+            ticker_symbols = {symbol: self.stock_ticker_symbol(symbol) for symbol in symbols}
+            with span("source", source="yahoo_stocks") as outcome:
+                missing = self.stock_bars.update(list(ticker_symbols.values()))
+                if missing:
+                    print(f"⚠️ Yahoo Finance sem barras para: {', '.join(missing)}")
+                    outcome.fail()
+            with span("aggregate", step="stocks_summary"):
+                summary = self.stock_bars.summary(list(ticker_symbols.values()))
+
+            data = {}
+            timestamp = datetime.now().isoformat()
+
+            for symbol, ticker_symbol in ticker_symbols.items():
+                if ticker_symbol not in summary.index:
+                    continue
+
+                row = summary.loc[ticker_symbol]
+                info = self.get_stock_metadata(ticker_symbol, fetch=fetch_metadata)
+                data[symbol] = {
+                    'price': round(float(row['price']), 2),
+                    'open': round(float(row['open']), 2),
+                    'high': round(float(row['high']), 2),
+                    'low': round(float(row['low']), 2),
+                    'change': round(float(row['change']), 2),
+                    'change_percent': round(float(row['change_percent']), 2),
+                    'volume': int(row['volume']),
+                    'market_cap': info.get('marketCap') or 'N/A',
+                    'company_name': info.get('longName') or symbol,
+                    'timestamp': timestamp,
+                    'source': 'Yahoo Finance',
+                    'symbol': ticker_symbol
+                }
+
+            return data
+        except Exception as e:
+            print(f"Erro ao buscar dados de ações: {e}")
+            return {}
+        finally:
+            self.metadata_cache.save()
+
+    def stock_ticker_symbol(self, symbol: str) -> str:
+        """Adiciona .SA para ações brasileiras se não tiver sufixo"""
+        if '.' not in symbol and len(symbol) <= 6:
+            return f"{symbol}.SA"
+        return symbol
+
+    def get_stock_metadata(
+        self, ticker_symbol: str, ticker: Optional[yf.Ticker] = None, fetch: bool = True
+    ) -> Dict:
+        """
+        Retorna nome e valor de mercado do ticker, consultando ticker.info
+        apenas quando algum campo do cache venceu
+
+        Com fetch=False nunca consulta o Yahoo: valores vencidos do cache
+        valem até a próxima atualização (vazio se o ticker nunca foi buscado)
+        """
+        metadata = self.metadata_cache.get(ticker_symbol, self.METADATA_FIELDS)
+        if metadata is not None:
+            return metadata
+        if not fetch:
+            return self.metadata_cache.get(ticker_symbol, self.METADATA_FIELDS, allow_stale=True) or {}
+
+        return self.fetch_stock_metadata(ticker_symbol, ticker)
+
+    def fetch_stock_metadata(self, ticker_symbol: str, ticker: Optional[yf.Ticker] = None) -> Dict:
+        """Consulta ticker.info e atualiza o cache, sem olhar o TTL"""
+        import yfinance as yf
+
+        ticker = ticker or yf.Ticker(ticker_symbol)
+        with span("source", source="yahoo_metadata") as outcome:
+            info = ticker.info or {}
+            # Só os campos que vieram: uma falha passageira do Yahoo não
+            # apaga valores bons do cache nem fixa None por todo o TTL
+            fetched = {
+                field: info[field] for field in self.METADATA_FIELDS
+                if info.get(field) is not None
+            }
+            if not fetched:
+                outcome.fail()
+
+        if fetched:
+            self.metadata_cache.set(ticker_symbol, fetched)
+        cached = self.metadata_cache.get(ticker_symbol, self.METADATA_FIELDS, allow_stale=True) or {}
+        return {field: fetched.get(field, cached.get(field)) for field in self.METADATA_FIELDS}
+
+    def metadata_refresh_interval(self) -> float:
+        """
+        Período da atualização agendada dos metadados: metade do menor TTL,
+        para nenhum campo ficar vencido mais que meio TTL
+        """
+        return min(self.metadata_cache.ttl(field) for field in self.METADATA_FIELDS) / 2
+
+    def refresh_metadata(self, symbols: List[str]) -> int:
+        """
+        Busca de novo os metadados das ações com algum campo vencido no
+        cache (atualização agendada); tickers dentro do TTL ficam como estão
+
+        Retorna quantos tickers foram atualizados.
+        """
+        refreshed = 0
+        try:
+            for symbol in symbols:
+                ticker_symbol = self.stock_ticker_symbol(symbol)
+                if self.metadata_cache.get(ticker_symbol, self.METADATA_FIELDS) is not None:
+                    continue
+                try:
+                    self.fetch_stock_metadata(ticker_symbol)
+                    refreshed += 1
+                except Exception as e:
+                    print(f"Erro ao buscar metadados de {ticker_symbol}: {e}")
+            return refreshed
+        finally:
+            self.metadata_cache.save()
     
     def get_all_indices(self) -> Dict:
         """
         Consolida dados de todos os índices
         """
-        all_data = {}
-        
-        # Índices brasileiros
-        brazilian_data = self.get_brazilian_indices()
-        all_data.update(brazilian_data)
-        
-        # Índices globais
-        global_data = self.get_global_indices()
-        all_data.update(global_data)
-        
-        return all_data
+        # Índices brasileiros e globais em uma única busca: símbolos
+        # repetidos entre os grupos (ex.: ^BVSP) são baixados uma vez só
+        all_indices = {**self.brazilian_indices, **self.global_indices}
+        return self.get_index_data_yahoo(all_indices)
     
     def get_market_status(self) -> Dict:
         """
@@ -3,31 +3,94 @@ Módulo para capturar cotações de câmbio em tempo real
 Suporta múltiplas fontes de dados confiáveis
 """
 
-import requests
+from __future__ import annotations
+
+import asyncio
 import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime
-from typing import Dict, Optional, List
-import yfinance as yf
+from typing import TYPE_CHECKING, Callable, Dict, Optional, List, Tuple
+
+if TYPE_CHECKING:
+    import aiohttp
+
+from http_pool import HttpPool, get_pool
+from intraday_store import IntradayBarStore
+from metrics import span
+
+
+# Endpoints REST das fontes de câmbio
+FIXER_URL = "http://data.fixer.io/api/latest?access_key={api_key}&base=USD&symbols=BRL,EUR,JPY,CNY,INR,KRW"
+EXCHANGERATE_URL = "https://api.exchangerate-api.com/v4/latest/USD"
+# API do BCB para dólar comercial
+BCB_URL = "https://api.bcb.gov.br/dados/serie/bcdata.sgs.10813/dados/ultimos/1?formato=json"
 
 
 class CambioAPI:
     """Classe para capturar dados de câmbio de múltiplas fontes"""
+
+    # Política de consolidação em get_all_rates, em ordem de prioridade:
+    # 'override' substitui pares já preenchidos, 'fill' só preenche lacunas,
+    # 'fallback' preenche lacunas mas só é consultada se, depois das demais
+    # fontes, ainda faltar algum par
+    DEFAULT_MERGE_POLICY = [
+        ('yahoo', 'fill'),              # Principal fonte - gratuita e confiável
+        ('bcb', 'override'),            # Fonte oficial para USD-BRL
+        ('exchangerate', 'fallback'),   # Backup
+        ('fixer', 'fallback'),          # Adicional, se houver chave
+    ]
     
-    def __init__(self):
+    def __init__(
+        self,
+        merge_policy: Optional[List[Tuple[str, str]]] = None,
+        first_wins: bool = False,
+        sources_timeout: float = 15,
+        http: Optional[HttpPool] = None,
+    ):
         self.base_currency = 'USD'
+        # Conexões keep-alive compartilhadas com as APIs REST
+        self.http = http or get_pool("cambio")
+        # Barras de 1 minuto dos pares, baixadas de forma incremental
+        self.fx_bars = IntradayBarStore(interval="1m")
+        self.currencies = ['BRL', 'EUR', 'JPY', 'CNY', 'INR', 'KRW']
+
+        # first_wins=True: entre as fontes 'fill', vale a primeira que responder
+        # (em vez da ordem de prioridade da política)
+        self.merge_policy = list(merge_policy or self.DEFAULT_MERGE_POLICY)
+        self.first_wins = first_wins
+        self.sources_timeout = sources_timeout
+        self._executor = ThreadPoolExecutor(
+            max_workers=len(self.merge_policy), thread_name_prefix="cambio"
+        )
+        # Último resultado de cada fonte, reaproveitado nas consultas parciais
+        # (get_all_rates com only=...) pelas fontes que ficaram de fora
+        self.last_results: Dict[str, Dict] = {}
+        self._results_lock = threading.Lock()
         
-    def get_exchange_rates_yahoo(self, currencies: List[str]) -> Dict:
+    def get_exchange_rates_yahoo(self, currencies: List[str], incremental: bool = True) -> Dict:
         """
         Pega cotações usando Yahoo Finance (gratuito e confiável)
+
+        Com incremental=True as barras de 1 minuto ficam em memória
+        (self.fx_bars) e cada chamada baixa apenas as barras novas.
         """
+        if incremental:
+            return self._get_exchange_rates_yahoo_incremental(currencies)
+
+        import yfinance as yf
+
         try:
             rates = {}
             for currency in currencies:
                 if currency != 'USD':
                     # Para moedas vs USD
-                    symbol = f"USD{currency}=X" if currency in ['BRL', 'JPY', 'CNY', 'INR', 'KRW'] else f"{currency}USD=X"
-                    ticker = yf.Ticker(symbol)
-                    hist = ticker.history(period="1d", interval="1m")
+                    symbol = self.yahoo_symbol(currency)
+                    with span("source", source="yahoo_fx") as outcome:
+                        hist = yf.Ticker(symbol).history(period="1d", interval="1m")
+                        if hist.empty:
+                            outcome.fail()
                     
                     if not hist.empty:
                         current_price = hist['Close'].iloc[-1]
@@ -47,6 +110,56 @@ class CambioAPI:
         except Exception as e:
             print(f"Erro ao buscar dados do Yahoo Finance: {e}")
             return {}
+
+    def _get_exchange_rates_yahoo_incremental(self, currencies: List[str]) -> Dict:
+        """
+        Atualiza as barras do dia só com as novas e calcula as cotações
+        """
+        try:
+            symbols = {
+                currency: self.yahoo_symbol(currency)
+                for currency in currencies
+                if currency != 'USD'
+            }
+            with span("source", source="yahoo_fx") as outcome:
+                missing = self.fx_bars.update(list(symbols.values()))
+                if missing:
+                    print(f"⚠️ Yahoo Finance sem barras para: {', '.join(missing)}")
+                    outcome.fail()
+            with span("aggregate", step="fx_summary"):
+                summary = self.fx_bars.summary(list(symbols.values()))
+
+            rates = {}
+            timestamp = datetime.now().isoformat()
+
+            for currency, symbol in symbols.items():
+                if symbol not in summary.index:
+                    continue
+
+                row = summary.loc[symbol]
+                current_price = float(row['price'])
+                prev_close = float(row['first_close'])
+                change = current_price - prev_close
+                change_percent = (change / prev_close) * 100 if prev_close != 0 else 0
+
+                rates[f'USD-{currency}'] = {
+                    'rate': round(current_price, 4),
+                    'change': round(change, 4),
+                    'change_percent': round(change_percent, 2),
+                    'timestamp': timestamp,
+                    'source': 'Yahoo Finance'
+                }
+
+            return rates
+        except Exception as e:
+            print(f"Erro ao buscar dados do Yahoo Finance: {e}")
+            return {}
+
+    def yahoo_symbol(self, currency: str) -> str:
+        """Símbolo do Yahoo Finance do par da moeda com o dólar"""
+        if currency in ['BRL', 'JPY', 'CNY', 'INR', 'KRW']:
+            return f"USD{currency}=X"
+        return f"{currency}USD=X"
     
     def get_exchange_rates_fixer(self, api_key: Optional[str] = None) -> Dict:
         """
@@ -56,109 +169,354 @@ class CambioAPI:
             return {}
             
         try:
-            url = f"http://data.fixer.io/api/latest?access_key={api_key}&base=USD&symbols=BRL,EUR,JPY,CNY,INR,KRW"
-            response = requests.get(url, timeout=10)
-            data = response.json()
-            
-            if data.get('success'):
-                rates = {}
-                for currency, rate in data['rates'].items():
-                    rates[f'USD-{currency}'] = {
-                        'rate': rate,
-                        'change': 0,  # Fixer não fornece mudança
-                        'change_percent': 0,
-                        'timestamp': datetime.now().isoformat(),
-                        'source': 'Fixer.io'
-                    }
-                return rates
+            with span("source", source="fixer"):
+                response = self.http.get(FIXER_URL.format(api_key=api_key))
+                return self._parse_fixer(response.json())
         except Exception as e:
             print(f"Erro ao buscar dados do Fixer: {e}")
             return {}
+
+    def _parse_fixer(self, data: Dict) -> Dict:
+        rates = {}
+        if data.get('success'):
+            for currency, rate in data['rates'].items():
+                rates[f'USD-{currency}'] = {
+                    'rate': rate,
+                    'change': 0,  # Fixer não fornece mudança
+                    'change_percent': 0,
+                    'timestamp': datetime.now().isoformat(),
+                    'source': 'Fixer.io'
+                }
+        return rates
     
     def get_exchange_rates_exchangerate(self) -> Dict:
         """
         Pega cotações usando ExchangeRate-API (gratuito, sem chave necessária)
         """
         try:
-            url = "https://api.exchangerate-api.com/v4/latest/USD"
-            response = requests.get(url, timeout=10)
-            data = response.json()
-            
-            rates = {}
-            currencies = ['BRL', 'EUR', 'JPY', 'CNY', 'INR', 'KRW']
-            
-            for currency in currencies:
-                if currency in data['rates']:
-                    rates[f'USD-{currency}'] = {
-                        'rate': data['rates'][currency],
-                        'change': 0,  # API não fornece mudança
-                        'change_percent': 0,
-                        'timestamp': datetime.now().isoformat(),
-                        'source': 'ExchangeRate-API'
-                    }
-                    
-            return rates
+            with span("source", source="exchangerate"):
+                response = self.http.get(EXCHANGERATE_URL)
+                return self._parse_exchangerate(response.json())
         except Exception as e:
             print(f"Erro ao buscar dados do ExchangeRate-API: {e}")
             return {}
+
+    def _parse_exchangerate(self, data: Dict) -> Dict:
+        rates = {}
+        currencies = ['BRL', 'EUR', 'JPY', 'CNY', 'INR', 'KRW']
+        
+        for currency in currencies:
+            if currency in data['rates']:
+                rates[f'USD-{currency}'] = {
+                    'rate': data['rates'][currency],
+                    'change': 0,  # API não fornece mudança
+                    'change_percent': 0,
+                    'timestamp': datetime.now().isoformat(),
+                    'source': 'ExchangeRate-API'
+                }
+                
+        return rates
     
     def get_usd_brl_bcb(self) -> Dict:
         """
         Pega cotação USD/BRL direto do Banco Central do Brasil (fonte oficial)
         """
         try:
-            # API do BCB para dólar comercial
-            url = "https://api.bcb.gov.br/dados/serie/bcdata.sgs.10813/dados/ultimos/1?formato=json"
-            response = requests.get(url, timeout=10)
-            data = response.json()
-            
-            if data:
-                latest = data[0]
-                return {
-                    'USD-BRL': {
-                        'rate': float(latest['valor']),
-                        'change': 0,
-                        'change_percent': 0,
-                        'timestamp': datetime.now().isoformat(),
-                        'source': 'Banco Central do Brasil',
-                        'date': latest['data']
-                    }
-                }
+            with span("source", source="bcb"):
+                response = self.http.get(BCB_URL)
+                return self._parse_bcb(response.json())
+        except Exception as e:
+            print(f"Erro ao buscar dados do BCB: {e}")
+            return {}
+
+    def _parse_bcb(self, data: List[Dict]) -> Dict:
+        if not data:
+            return {}
+
+        latest = data[0]
+        return {
+            'USD-BRL': {
+                'rate': float(latest['valor']),
+                'change': 0,
+                'change_percent': 0,
+                'timestamp': datetime.now().isoformat(),
+                'source': 'Banco Central do Brasil',
+                'date': latest['data']
+            }
+        }
+
+    async def _get_json_async(self, session: aiohttp.ClientSession, url: str):
+        async with session.get(url) as response:
+            response.raise_for_status()
+            # Algumas APIs não devolvem Content-Type application/json
+            return await response.json(content_type=None)
+
+    async def get_exchange_rates_fixer_async(
+        self, session: aiohttp.ClientSession, api_key: Optional[str] = None
+    ) -> Dict:
+        """Versão assíncrona de get_exchange_rates_fixer"""
+        if not api_key:
+            return {}
+
+        try:
+            with span("source", source="fixer"):
+                data = await self._get_json_async(session, FIXER_URL.format(api_key=api_key))
+                return self._parse_fixer(data)
+        except Exception as e:
+            print(f"Erro ao buscar dados do Fixer: {e}")
+            return {}
+
+    async def get_exchange_rates_exchangerate_async(self, session: aiohttp.ClientSession) -> Dict:
+        """Versão assíncrona de get_exchange_rates_exchangerate"""
+        try:
+            with span("source", source="exchangerate"):
+                data = await self._get_json_async(session, EXCHANGERATE_URL)
+                return self._parse_exchangerate(data)
+        except Exception as e:
+            print(f"Erro ao buscar dados do ExchangeRate-API: {e}")
+            return {}
+
+    async def get_usd_brl_bcb_async(self, session: aiohttp.ClientSession) -> Dict:
+        """Versão assíncrona de get_usd_brl_bcb"""
+        try:
+            with span("source", source="bcb"):
+                data = await self._get_json_async(session, BCB_URL)
+                return self._parse_bcb(data)
         except Exception as e:
             print(f"Erro ao buscar dados do BCB: {e}")
             return {}
     
-    def get_all_rates(self, fixer_api_key: Optional[str] = None) -> Dict:
+    def get_rate_sources(self, fixer_api_key: Optional[str] = None) -> Dict[str, Callable[[], Dict]]:
+        """
+        Fontes de câmbio disponíveis, indexadas pelo nome usado na política
+        """
+        sources = {
+            'yahoo': lambda: self.get_exchange_rates_yahoo(self.currencies),
+            'bcb': self.get_usd_brl_bcb,
+            'exchangerate': self.get_exchange_rates_exchangerate,
+        }
+        if fixer_api_key:
+            sources['fixer'] = lambda: self.get_exchange_rates_fixer(fixer_api_key)
+        return sources
+
+    def merge_rates(self, results: Dict[str, Dict], finished: Optional[List[str]] = None) -> Dict:
+        """
+        Consolida os resultados das fontes segundo a política de merge
+
+        results: {fonte: cotações}; finished: ordem em que as fontes
+        terminaram (usada quando first_wins=True)
+        """
+        fill_sources = [name for name, mode in self.merge_policy if mode in ('fill', 'fallback')]
+        override_sources = [name for name, mode in self.merge_policy if mode == 'override']
+
+        if self.first_wins and finished:
+            fill_sources.sort(key=lambda name: finished.index(name) if name in finished else len(finished))
+
+        merged = {}
+        for name in fill_sources:
+            for pair, value in (results.get(name) or {}).items():
+                if pair not in merged:
+                    merged[pair] = value
+
+        for name in override_sources:
+            merged.update(results.get(name) or {})
+
+        return merged
+
+    def missing_pairs(self, rates: Dict) -> List[str]:
+        """Pares de self.currencies que ainda não têm cotação"""
+        return [
+            pair for pair in (f'USD-{currency}' for currency in self.currencies)
+            if pair not in rates
+        ]
+
+    def _split_fallbacks(self, names: List[str]) -> Tuple[List[str], List[str]]:
+        """Separa as fontes consultadas sempre das de reserva ('fallback')"""
+        modes = dict(self.merge_policy)
+        primary = [name for name in names if modes.get(name) != 'fallback']
+        fallbacks = [name for name in names if modes.get(name) == 'fallback']
+        return primary, fallbacks
+
+    def _can_stop_early(self, results: Dict[str, Dict], pending: List[str]) -> bool:
+        """
+        Verifica se as fontes que ainda não responderam não podem mais mudar o resultado
+        """
+        modes = dict(self.merge_policy)
+        if any(modes.get(name) == 'override' for name in pending):
+            return False
+
+        if self.missing_pairs(self.merge_rates(results)):
+            return False
+        expected = [f'USD-{currency}' for currency in self.currencies]
+
+        if self.first_wins:
+            return True
+
+        # Na ordem de prioridade, uma fonte 'fill' pendente só muda um par
+        # se a fonte que o preencheu tiver prioridade menor que a dela
+        priority = [name for name, _ in self.merge_policy]
+        owners = {}
+        for name in priority:
+            for pair in results.get(name) or {}:
+                owners.setdefault(pair, priority.index(name))
+
+        return all(
+            owners[pair] < priority.index(name)
+            for name in pending
+            for pair in expected
+        )
+
+    def get_all_rates(
+        self, fixer_api_key: Optional[str] = None, only: Optional[List[str]] = None
+    ) -> Dict:
         """
         Consolida cotações de todas as fontes disponíveis
+
+        As fontes são consultadas em paralelo; o tempo total é o da fonte
+        útil mais lenta (limitado por sources_timeout), não a soma de todas.
+        As fontes 'fallback' só são consultadas se ainda faltar algum par
+        depois das outras (com o Yahoo completo, nenhuma chamada a mais),
+        dentro do mesmo sources_timeout.
+
+        Com only=[...] consulta só essas fontes e usa o último resultado das
+        demais (cada fonte pode ser agendada com seu próprio período).
         """
-        all_rates = {}
-        
-        # Yahoo Finance (principal fonte - gratuita e confiável)
-        currencies = ['BRL', 'EUR', 'JPY', 'CNY', 'INR', 'KRW']
-        yahoo_rates = self.get_exchange_rates_yahoo(currencies)
-        all_rates.update(yahoo_rates)
-        
-        # BCB para USD/BRL (fonte oficial brasileira)
-        bcb_rates = self.get_usd_brl_bcb()
-        if bcb_rates:
-            # Substitui o Yahoo com dados oficiais do BCB
-            all_rates.update(bcb_rates)
-        
-        # ExchangeRate-API como backup
-        if not all_rates:
-            exchange_rates = self.get_exchange_rates_exchangerate()
-            all_rates.update(exchange_rates)
-        
-        # Fixer como fonte adicional se houver chave
+        sources = self.get_rate_sources(fixer_api_key)
+        policy_sources = [
+            name for name, _ in self.merge_policy
+            if name in sources and (only is None or name in only)
+        ]
+        primary, fallbacks = self._split_fallbacks(policy_sources)
+
+        results = {}
+        finished = []
+        deadline = time.monotonic() + self.sources_timeout
+        self._query_sources(sources, primary, results, finished, deadline)
+
+        with self._results_lock:
+            if only is not None:
+                # Fontes agendadas à parte (ex.: BCB) também contam como preenchidas
+                for name, value in self.last_results.items():
+                    if name not in policy_sources:
+                        results.setdefault(name, value)
+
+        if fallbacks and self.missing_pairs(self.merge_rates(results)):
+            self._query_sources(sources, fallbacks, results, finished, deadline)
+
+        with self._results_lock:
+            self.last_results.update(results)
+            if only is not None:
+                for name, value in self.last_results.items():
+                    results.setdefault(name, value)
+
+        with span("aggregate", step="fx_merge"):
+            return self.merge_rates(results, finished)
+
+    def _query_sources(
+        self,
+        sources: Dict[str, Callable[[], Dict]],
+        names: List[str],
+        results: Dict[str, Dict],
+        finished: List[str],
+        deadline: float,
+    ) -> None:
+        """Consulta as fontes em paralelo e guarda as respostas em results/finished"""
+        futures = {self._executor.submit(sources[name]): name for name in names}
+
+        pending = set(futures)
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                late = ", ".join(futures[future] for future in pending)
+                print(f"Fontes de câmbio sem resposta a tempo: {late}")
+                break
+
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = futures[future]
+                try:
+                    results[name] = future.result() or {}
+                except Exception as e:
+                    print(f"Erro na fonte de câmbio {name}: {e}")
+                    results[name] = {}
+                finished.append(name)
+
+            if pending and self._can_stop_early(results, [futures[f] for f in pending]):
+                break
+
+    async def get_all_rates_async(
+        self, session: aiohttp.ClientSession, fixer_api_key: Optional[str] = None
+    ) -> Dict:
+        """
+        Versão assíncrona de get_all_rates
+
+        As fontes REST usam a sessão aiohttp; o Yahoo Finance (bloqueante)
+        roda no pool de threads da classe.
+        """
+        loop = asyncio.get_running_loop()
+        sources = {
+            'yahoo': lambda: loop.run_in_executor(
+                self._executor, self.get_exchange_rates_yahoo, self.currencies
+            ),
+            'bcb': lambda: self.get_usd_brl_bcb_async(session),
+            'exchangerate': lambda: self.get_exchange_rates_exchangerate_async(session),
+        }
         if fixer_api_key:
-            fixer_rates = self.get_exchange_rates_fixer(fixer_api_key)
-            # Adiciona apenas se não temos dados para essas moedas
-            for key, value in fixer_rates.items():
-                if key not in all_rates:
-                    all_rates[key] = value
-        
-        return all_rates
+            sources['fixer'] = lambda: self.get_exchange_rates_fixer_async(session, fixer_api_key)
+
+        primary, fallbacks = self._split_fallbacks(
+            [name for name, _ in self.merge_policy if name in sources]
+        )
+        results = {}
+        finished = []
+        deadline = loop.time() + self.sources_timeout
+        await self._query_sources_async(sources, primary, results, finished, deadline)
+        if fallbacks and self.missing_pairs(self.merge_rates(results)):
+            await self._query_sources_async(sources, fallbacks, results, finished, deadline)
+
+        with self._results_lock:
+            self.last_results.update(results)
+
+        with span("aggregate", step="fx_merge"):
+            return self.merge_rates(results, finished)
+
+    async def _query_sources_async(
+        self,
+        sources: Dict[str, Callable],
+        names: List[str],
+        results: Dict[str, Dict],
+        finished: List[str],
+        deadline: float,
+    ) -> None:
+        """Versão assíncrona de _query_sources (deadline no relógio do loop)"""
+        loop = asyncio.get_running_loop()
+        tasks = {asyncio.ensure_future(sources[name]()): name for name in names}
+
+        pending = set(tasks)
+        while pending:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                late = ", ".join(tasks[task] for task in pending)
+                print(f"Fontes de câmbio sem resposta a tempo: {late}")
+                break
+
+            done, pending = await asyncio.wait(
+                pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                name = tasks[task]
+                try:
+                    results[name] = task.result() or {}
+                except Exception as e:
+                    print(f"Erro na fonte de câmbio {name}: {e}")
+                    results[name] = {}
+                finished.append(name)
+
+            if pending and self._can_stop_early(results, [tasks[t] for t in pending]):
+                break
+
+        for task in pending:
+            task.cancel()
 
 
 def main():
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Daemon de coleta: busca os dados uma única vez e publica cada snapshot
+para os processos assinantes (workers do dashboard web) por IPC local
+
+Canal: multiprocessing.connection (TCP em localhost ou socket Unix),
+autenticado com COLLECTOR_AUTHKEY (obrigatória, sem valor padrão).
+
+Uso:
+    COLLECTOR_AUTHKEY=<segredo> python collector_daemon.py
+    COLLECTOR_ADDRESS=127.0.0.1:6001 COLLECTOR_AUTHKEY=<segredo> python web/run_web.py
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+from multiprocessing.connection import Client, Listener
+
+from vmix_updater.mailbox import LatestValueMailbox
+
+
+DEFAULT_ADDRESS = "127.0.0.1:6001"
+
+
+def parse_address(value=None):
+    """
+    "host:porta" vira um endereço TCP; qualquer outro valor é o caminho
+    de um socket Unix
+    """
+    value = value or os.getenv("COLLECTOR_ADDRESS") or DEFAULT_ADDRESS
+    host, sep, port = value.rpartition(":")
+    if sep and port.isdigit():
+        return (host or "127.0.0.1", int(port))
+    return value
+
+
+def get_authkey(value=None):
+    """
+    Chave do canal; sem ela o processo não sobe, para nunca aceitar
+    assinantes com uma chave conhecida
+    """
+    value = value or os.getenv("COLLECTOR_AUTHKEY")
+    if not value:
+        raise ValueError("COLLECTOR_AUTHKEY não definida (use a mesma no daemon e nos workers)")
+    return value.encode("utf-8")
+
+
+class SnapshotPublisher:
+    """
+    Aceita assinantes e envia a cada um o último snapshot publicado
+
+    Cada assinante tem sua própria thread de envio com uma caixa de um
+    lugar só: um worker lento recebe apenas o snapshot mais novo e não
+    atrasa os demais.
+    """
+
+    def __init__(self, address=None, authkey=None):
+        self.address = parse_address(address)
+        self.authkey = get_authkey(authkey)
+        self.latest = None
+        self.subscribers = {}
+        self._lock = threading.Lock()
+        self._listener = None
+
+    def start(self):
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            # Socket Unix que sobrou de uma execução anterior
+            os.remove(self.address)
+        self._listener = Listener(self.address, authkey=self.authkey)
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        print(f"📡 Publicando snapshots em {self.address}")
+
+    def _accept_loop(self):
+        while True:
+            try:
+                conn = self._listener.accept()
+            except OSError:
+                # Listener fechado
+                break
+            except Exception as e:
+                # Falha de autenticação ou handshake de um cliente
+                print(f"⚠️ Assinante recusado: {e}")
+                continue
+
+            mailbox = LatestValueMailbox()
+            with self._lock:
+                self.subscribers[conn] = mailbox
+                if self.latest is not None:
+                    mailbox.put(self.latest)
+            threading.Thread(target=self._send_loop, args=(conn, mailbox), daemon=True).start()
+            print(f"🔗 Assinante conectado ({len(self.subscribers)} ativos)")
+
+    def _send_loop(self, conn, mailbox):
+        try:
+            while True:
+                conn.send(mailbox.get())
+        except (OSError, EOFError, ValueError):
+            pass
+        finally:
+            with self._lock:
+                self.subscribers.pop(conn, None)
+            conn.close()
+            print(f"🔌 Assinante desconectado ({len(self.subscribers)} ativos)")
+
+    def publish(self, data, updated_at=None):
+        """Envia o snapshot a todos os assinantes (e aos que conectarem depois)"""
+        message = {"data": data, "updated_at": updated_at or datetime.now()}
+        with self._lock:
+            self.latest = message
+            for mailbox in self.subscribers.values():
+                mailbox.put(message)
+
+    def close(self):
+        if self._listener is not None:
+            self._listener.close()
+            if isinstance(self.address, str) and os.path.exists(self.address):
+                os.remove(self.address)
+
+
+class SnapshotSubscriber:
+    """
+    Recebe os snapshots do daemon em uma thread e chama
+    on_snapshot(data, updated_at); reconecta sozinho se o daemon cair
+    """
+
+    def __init__(self, on_snapshot, address=None, authkey=None, retry_interval=5):
+        self.on_snapshot = on_snapshot
+        self.address = parse_address(address)
+        self.authkey = get_authkey(authkey)
+        self.retry_interval = retry_interval
+        self.connected = False
+
+    def start(self):
+        thread = threading.Thread(target=self.run, daemon=True)
+        thread.start()
+        return thread
+
+    def run(self):
+        while True:
+            try:
+                conn = Client(self.address, authkey=self.authkey)
+            except Exception as e:
+                print(f"⏳ Daemon de coleta indisponível em {self.address}: {e}")
+                time.sleep(self.retry_interval)
+                continue
+
+            self.connected = True
+            print(f"🔗 Conectado ao daemon de coleta em {self.address}")
+            try:
+                while True:
+                    message = conn.recv()
+                    try:
+                        self.on_snapshot(message["data"], message["updated_at"])
+                    except Exception as e:
+                        print(f"❌ Erro ao aplicar snapshot recebido: {e}")
+            except (OSError, EOFError) as e:
+                print(f"⚠️ Conexão com o daemon de coleta perdida: {e}")
+            finally:
+                self.connected = False
+                conn.close()
+            time.sleep(self.retry_interval)
+
+
+def run_daemon(address=None, authkey=None):
+    """Coleta contínua sem tela: histórico em disco, vMix e publicação por IPC"""
+    from financial_collector import FinancialDataCollector
+    from metrics import SummaryPrinter, serve_metrics
+    from profiling import get_profiler, install_signal_handler
+
+    # Antes de qualquer coleta: falha logo se COLLECTOR_AUTHKEY faltar
+    publisher = SnapshotPublisher(address, authkey)
+    collector = FinancialDataCollector()
+    collector.start_updater()
+    publisher.start()
+
+    print("🚀 Daemon de coleta iniciado")
+
+    # /metrics do próprio daemon (o app web só mede o broadcast neste modo)
+    if os.getenv("METRICS_PORT"):
+        serve_metrics(int(os.getenv("METRICS_PORT")))
+    metrics_summary = SummaryPrinter()
+    # Perfil sob demanda (PROFILE_ITERATIONS ou kill -USR1)
+    profiler = get_profiler("collector_daemon")
+    install_signal_handler()
+    # Cada fonte no seu período, em taxa fixa (sem sleep após a coleta)
+    snapshots = collector.scheduled_snapshots()
+
+    try:
+        while True:
+            try:
+                with profiler.iteration():
+                    data = next(snapshots)
+                    updated_at = datetime.now()
+
+                    publisher.publish(data, updated_at)
+                    collector.updater.queue.put(data)
+                    collector.history_log.append_snapshot(collector.last_changes)
+
+                print(
+                    f"✅ Snapshot publicado {updated_at.strftime('%H:%M:%S')} "
+                    f"({len(publisher.subscribers)} assinantes)"
+                )
+            except Exception as e:
+                print(f"❌ Erro na coleta: {e}")
+
+            metrics_summary.maybe_print()
+
+    except KeyboardInterrupt:
+        print("\n⏹️  Daemon interrompido pelo usuário")
+    finally:
+        snapshots.close()
+        publisher.close()
+        collector.history_log.flush()
+
+
+if __name__ == "__main__":
+    run_daemon()
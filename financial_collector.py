@@ -3,23 +3,39 @@ Sistema principal para coleta de informações financeiras em tempo real
 Integra dados de câmbio e bolsa de valores
 """
 
+import asyncio
 import json
 import time
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 import os
-from dotenv import load_dotenv
 
 from cambio_api import CambioAPI
 from bolsa_api import BolsaAPI
+from history_log import HistoryLog
+from metrics import SummaryPrinter, span
+from profiling import get_profiler, install_signal_handler
+from scheduler import FixedRateScheduler
+from timeseries_store import TimeSeriesStore
 from vmix_updater.updater import ApiUpdater
 
 
 class FinancialDataCollector:
     """Classe principal para coleta de dados financeiros"""
 
+    # Parte do snapshot atualizada por cada tarefa do agendador
+    SOURCE_KEYS = {
+        "cambio": "cambio",
+        "bcb": "cambio",
+        "bolsa": "bolsa",
+        "market_status": "market_status",
+        "acoes": "acoes",
+    }
+
     def __init__(self, config_file: Optional[str] = None):
         # Carrega variáveis de ambiente
+        from dotenv import load_dotenv
+
         load_dotenv()
 
         self.cambio_api = CambioAPI()
@@ -31,13 +47,49 @@ class FinancialDataCollector:
 
         # APIs keys opcionais
         self.fixer_api_key = os.getenv("FINHUB_API_KEY")
+
+        # Ações acompanhadas (opcional, separadas por vírgula: PETR4,VALE3)
+        self.stock_symbols = [
+            symbol.strip()
+            for symbol in os.getenv("STOCK_SYMBOLS", "").split(",")
+            if symbol.strip()
+        ]
+        # Histórico em memória das cotações (alimentado a cada coleta)
+        self.history = TimeSeriesStore(capacity=int(os.getenv("HISTORY_CAPACITY", 2880)))
+        # Histórico em disco (HISTORY_DIR), gravado em lotes durante a coleta contínua
+        self.history_log = HistoryLog()
+        # Agendador da coleta contínua (criado por scheduled_snapshots)
+        self.scheduler: Optional[FixedRateScheduler] = None
+
+        # A thread de envio ao vMix só inicia com start_updater()
         self.updater = ApiUpdater()
-        self.updater.start()
+
+        # Snapshot montado pela coleta agendada (uma parte por fonte) e só as
+        # partes que mudaram na última entrega (para os históricos)
+        self.latest = {"cambio": {}, "bolsa": {}, "market_status": {}, "acoes": {}}
+        self.last_changes = {}
+        self._pending_sources = set()
+
+    def start_updater(self):
+        """Inicia a thread que envia os snapshots ao vMix (uma vez só)"""
+        if self.updater.ident is None:
+            self.updater.start()
+        return self.updater
 
     def collect_all_data(self) -> Dict:
         """
         Coleta todos os dados financeiros disponíveis
         """
+        with span("collect"):
+            return asyncio.run(self.collect_all_data_async())
+
+    async def collect_all_data_async(self) -> Dict:
+        """
+        Coleta todos os dados financeiros de forma assíncrona
+
+        Câmbio, índices, ações e status do mercado são coletados ao mesmo
+        tempo; as chamadas bloqueantes do yfinance rodam em um executor.
+        """
         if self.debug:
             print(f"🔄 Coletando dados em {datetime.now().strftime('%H:%M:%S')}")
 
@@ -48,29 +100,158 @@ class FinancialDataCollector:
             "market_status": {},
         }
 
-        try:
-            # Dados de câmbio
-            cambio_data = self.cambio_api.get_all_rates(self.fixer_api_key)
-            data["cambio"] = cambio_data
+        import aiohttp
+
+        loop = asyncio.get_running_loop()
+        # Mesmos limites de conexão e timeouts do pool HTTP síncrono
+        http = self.cambio_api.http
+        timeout = aiohttp.ClientTimeout(
+            sock_connect=http.connect_timeout, sock_read=http.read_timeout
+        )
+        connector = aiohttp.TCPConnector(limit_per_host=http.pool_size)
+
+        async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+            legs = {
+                "cambio": self.cambio_api.get_all_rates_async(session, self.fixer_api_key),
+                "bolsa": loop.run_in_executor(None, self.bolsa_api.get_all_indices),
+                "market_status": loop.run_in_executor(None, self.bolsa_api.get_market_status),
+            }
+            if self.stock_symbols:
+                legs["acoes"] = loop.run_in_executor(
+                    None, self.bolsa_api.get_stock_data, self.stock_symbols
+                )
 
-            # Dados da bolsa
-            bolsa_data = self.bolsa_api.get_all_indices()
-            data["bolsa"] = bolsa_data
+            results = await asyncio.gather(*legs.values(), return_exceptions=True)
 
-            # Status do mercado
-            market_status = self.bolsa_api.get_market_status()
-            data["market_status"] = market_status
+        for key, result in zip(legs, results):
+            if isinstance(result, Exception):
+                print(f"❌ Erro na coleta ({key}): {result}")
+                result = {}
+            data[key] = result
 
-            if self.debug:
-                print(
-                    f"✅ Coletados {len(cambio_data)} pares de moedas e {len(bolsa_data)} índices"
-                )
+        with span("aggregate", step="history"):
+            self.history.append_snapshot(data)
 
-        except Exception as e:
-            print(f"❌ Erro na coleta: {e}")
+        if self.debug:
+            print(
+                f"✅ Coletados {len(data['cambio'])} pares de moedas e {len(data['bolsa'])} índices"
+            )
 
         return data
 
+    def source_intervals(self) -> Dict[str, float]:
+        """
+        Período (s) de cada fonte na coleta agendada
+
+        Índices, ações e status do mercado seguem update_interval, a menos
+        que tenham período próprio no .env.
+        """
+        def interval(name, default):
+            return float(os.getenv(name, default))
+
+        return {
+            "cambio": interval("FX_INTERVAL", 15),
+            "bcb": interval("BCB_INTERVAL", 60 * 60),
+            "bolsa": interval("INDICES_INTERVAL", self.update_interval),
+            "market_status": interval("MARKET_STATUS_INTERVAL", self.update_interval),
+            "acoes": interval("STOCKS_INTERVAL", self.update_interval),
+            # Padrão: metade do menor TTL do cache de metadados (3 h)
+            "metadata": interval("METADATA_INTERVAL", self.bolsa_api.metadata_refresh_interval()),
+        }
+
+    def build_scheduler(self) -> FixedRateScheduler:
+        """Agendador com uma tarefa por fonte, cada uma no seu período"""
+        intervals = self.source_intervals()
+        # BCB (oficial, série diária) tem período próprio; as demais fontes
+        # de câmbio são consultadas juntas
+        fx_sources = [name for name, _ in self.cambio_api.merge_policy if name != "bcb"]
+
+        scheduler = FixedRateScheduler()
+        scheduler.add(
+            "cambio", intervals["cambio"],
+            lambda: self.cambio_api.get_all_rates(self.fixer_api_key, only=fx_sources),
+        )
+        scheduler.add(
+            "bcb", intervals["bcb"],
+            lambda: self.cambio_api.get_all_rates(self.fixer_api_key, only=["bcb"]),
+        )
+        scheduler.add("bolsa", intervals["bolsa"], self.bolsa_api.get_all_indices)
+        scheduler.add("market_status", intervals["market_status"], self.bolsa_api.get_market_status)
+        if self.stock_symbols:
+            scheduler.add(
+                "acoes", intervals["acoes"],
+                lambda: self.bolsa_api.get_stock_data(self.stock_symbols, fetch_metadata=False),
+            )
+            scheduler.add(
+                "metadata", intervals["metadata"],
+                lambda: self.bolsa_api.refresh_metadata(self.stock_symbols),
+            )
+        return scheduler
+
+    def apply_results(self, results: List[Tuple[str, Dict]]) -> Optional[Dict]:
+        """
+        Atualiza o snapshot com as fontes que terminaram
+
+        Retorna o snapshot novo, ou None enquanto alguma fonte ainda não
+        respondeu pela primeira vez (ou se nenhuma parte mudou).
+        """
+        timestamp = datetime.now().isoformat()
+        changes = {"timestamp": timestamp}
+        for name, result in results:
+            key = self.SOURCE_KEYS.get(name)
+            self._pending_sources.discard(name)
+            if key is not None:
+                self.latest[key] = result or {}
+                changes[key] = self.latest[key]
+
+        if self._pending_sources or len(changes) == 1:
+            return None
+
+        data = {"timestamp": timestamp}
+        for key in ("cambio", "bolsa", "market_status"):
+            data[key] = self.latest[key]
+        if self.stock_symbols:
+            data["acoes"] = self.latest["acoes"]
+
+        # Só as partes novas vão para o histórico: cada fonte tem seu período
+        self.last_changes = changes
+        with span("aggregate", step="history"):
+            self.history.append_snapshot(changes)
+        return data
+
+    def scheduled_snapshots(self, scheduler: Optional[FixedRateScheduler] = None) -> Iterator[Dict]:
+        """
+        Coleta agendada: um snapshot novo a cada vez que alguma fonte termina
+
+        O primeiro snapshot sai quando todas as fontes (exceto os metadados,
+        que só abastecem o cache) responderam pela primeira vez.
+        """
+        scheduler = self.scheduler = scheduler or self.build_scheduler()
+        self._pending_sources = {name for name in scheduler.jobs if name in self.SOURCE_KEYS}
+        print(f"🗓️  Períodos das fontes: {scheduler.describe()}")
+        try:
+            while True:
+                try:
+                    data = self.apply_results(scheduler.wait())
+                except Exception as e:
+                    print(f"❌ Erro ao montar o snapshot: {e}")
+                    continue
+                if data is not None:
+                    yield data
+        finally:
+            scheduler.shutdown()
+
+    def refresh_now(self) -> List[str]:
+        """
+        Pede à coleta agendada uma rodada já (atualização manual); o
+        snapshot novo sai de scheduled_snapshots como os demais
+        """
+        if self.scheduler is None:
+            return []
+        return self.scheduler.run_now(
+            [name for name in self.scheduler.jobs if name in self.SOURCE_KEYS]
+        )
+
     def format_bloomberg_style(self, data: Dict) -> str:
         """
         Formata os dados no estilo Bloomberg (similar à tela mostrada)
@@ -142,7 +323,8 @@ class FinancialDataCollector:
 
         return filepath
 
-    def get_summary(self, data: Dict) -> Dict:
+    @staticmethod
+    def get_summary(data: Dict) -> Dict:
         """
         Cria um resumo executivo dos dados
         """
@@ -200,7 +382,6 @@ class FinancialDataCollector:
         Executa coleta contínua de dados
         """
         print("🚀 Iniciando coleta contínua de dados financeiros...")
-        print(f"📊 Intervalo de atualização: {self.update_interval} segundos")
 
         if duration_minutes:
             print(f"⏱️  Duração: {duration_minutes} minutos")
@@ -208,30 +389,41 @@ class FinancialDataCollector:
         print("=" * 60)
 
         start_time = time.time()
+        self.start_updater()
+        # Resumo das métricas a cada METRICS_SUMMARY_INTERVAL segundos
+        metrics_summary = SummaryPrinter()
+        # Perfil sob demanda (PROFILE_ITERATIONS ou kill -USR1)
+        profiler = get_profiler("run_continuous")
+        install_signal_handler()
+        # Cada fonte no seu período, em taxa fixa (sem sleep após a coleta)
+        snapshots = self.scheduled_snapshots()
 
         try:
             while True:
-                # Coleta dados
-                data = self.collect_all_data()
-                self.updater.queue.put(data)
-
-                # Exibe no formato Bloomberg
-                formatted_output = self.format_bloomberg_style(data)
-
-                # Limpa tela (Windows)
-                os.system("cls" if os.name == "nt" else "clear")
-                print(formatted_output)
-
-                # Verifica alertas
-                summary = self.get_summary(data)
-                if summary["alerts"]:
-                    print("\n🔔 ALERTAS:")
-                    for alert in summary["alerts"]:
-                        print(f"   {alert}")
-
-                # Salva dados (opcional)
-                if self.debug:
-                    self.save_to_file(data, "latest_data.json")
+                with profiler.iteration():
+                    # Espera o próximo snapshot da coleta agendada
+                    data = next(snapshots)
+                    self.updater.queue.put(data)
+
+                    # Exibe no formato Bloomberg
+                    with span("aggregate", step="format"):
+                        formatted_output = self.format_bloomberg_style(data)
+
+                    # Limpa tela (Windows)
+                    os.system("cls" if os.name == "nt" else "clear")
+                    print(formatted_output)
+
+                    # Verifica alertas
+                    with span("aggregate", step="summary"):
+                        summary = self.get_summary(data)
+                    if summary["alerts"]:
+                        print("\n🔔 ALERTAS:")
+                        for alert in summary["alerts"]:
+                            print(f"   {alert}")
+                    metrics_summary.maybe_print()
+
+                    # Acrescenta ao histórico em disco as partes novas (gravação em lotes)
+                    self.history_log.append_snapshot(self.last_changes)
 
                 # Verifica se deve parar
                 if duration_minutes:
@@ -240,13 +432,13 @@ class FinancialDataCollector:
                         print(f"\n✅ Coleta finalizada após {duration_minutes} minutos")
                         break
 
-                # Aguarda próxima atualização
-                time.sleep(self.update_interval)
-
         except KeyboardInterrupt:
             print("\n⏹️  Coleta interrompida pelo usuário")
         except Exception as e:
             print(f"\n❌ Erro durante execução contínua: {e}")
+        finally:
+            snapshots.close()
+            self.history_log.flush()
 
 
 def main():
@@ -0,0 +1,508 @@
+"""
+Histórico em disco das cotações coletadas (substitui os dumps JSON)
+Arquivos binários só de acréscimo, particionados por dia e classe de ativo
+
+Layout em HISTORY_DIR:
+    2025-09-26/cambio.log       registros novos, na ordem de chegada
+    2025-09-26/cambio.bin       registros compactados, ordenados por símbolo e horário
+    2025-09-26/cambio.idx.json  {símbolo: [primeira linha, última linha + 1]} do .bin
+    writer.lock                 trava do processo que grava (um só por diretório)
+
+Só um processo grava em cada HISTORY_DIR: se o laço web e o run_continuous
+rodarem juntos, o segundo a gravar encontra a trava ocupada e não grava
+(nada de registros duplicados nem compactação apagando o .log de outro).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+from timeseries_store import iter_quotes
+
+
+# Registro de tamanho fixo (72 bytes): permite ler com np.fromfile / np.memmap
+RECORD_DTYPE = np.dtype([
+    ('timestamp', '<f8'),
+    ('symbol', 'S24'),
+    ('price', '<f8'),
+    ('change', '<f8'),
+    ('change_percent', '<f8'),
+    ('volume', '<f8'),
+])
+
+ASSET_CLASSES = ('cambio', 'bolsa', 'acoes')
+
+WRITER_LOCK = "writer.lock"
+
+
+def history_root(root: Optional[str] = None) -> str:
+    """
+    Diretório do histórico; caminhos relativos são resolvidos a partir da
+    pasta do projeto (o coletor e o servidor web rodam de pastas diferentes)
+    """
+    root = root or os.getenv("HISTORY_DIR", "history")
+    if not os.path.isabs(root):
+        root = os.path.join(os.path.dirname(os.path.abspath(__file__)), root)
+    return root
+
+
+class WriterLock:
+    """
+    Trava exclusiva entre processos (flock/msvcrt) sobre um arquivo;
+    liberada pelo sistema quando o processo termina
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+        self.held = False
+
+    def acquire(self) -> bool:
+        """Tenta pegar a trava sem esperar; True se este processo a tem"""
+        if self.held:
+            return True
+
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._file = open(self.path, "a+")
+
+        try:
+            if os.name == "nt":
+                import msvcrt
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return False
+
+        self._file.seek(0)
+        self._file.truncate()
+        self._file.write(f"{os.getpid()}\n")
+        self._file.flush()
+        self.held = True
+        return True
+
+
+class HistoryLog:
+    """
+    Grava snapshots em lotes (buffer em memória) e compacta as partições
+    dos dias que já terminaram
+    """
+
+    def __init__(
+        self,
+        root: Optional[str] = None,
+        batch_size: int = 500,
+        flush_interval: float = 60,
+    ):
+        self.root = history_root(root)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._buffer = {}
+        self._buffered = 0
+        self._last_flush = time.monotonic()
+        self._current_day = None
+        self._lock = threading.Lock()
+        self._writer_lock = WriterLock(os.path.join(self.root, WRITER_LOCK))
+        self._warned = False
+
+    def _can_write(self) -> bool:
+        """
+        Pega a trava de gravação do diretório na primeira escrita; se outro
+        processo já grava nele, este descarta seus registros
+        """
+        if self._writer_lock.acquire():
+            return True
+        if not self._warned:
+            self._warned = True
+            print(
+                f"⚠️ Outro processo já grava o histórico em {self.root}; "
+                f"este não vai gravar (use outro HISTORY_DIR)"
+            )
+        return False
+
+    def partition_path(self, day: str, asset_class: str, kind: str = "log") -> str:
+        return os.path.join(self.root, day, f"{asset_class}.{kind}")
+
+    def append_snapshot(self, data: Dict) -> None:
+        """Adiciona as cotações de um resultado de collect_all_data ao buffer"""
+        moment = datetime.fromisoformat(data["timestamp"])
+        timestamp = moment.timestamp()
+        day = moment.date().isoformat()
+
+        with self._lock:
+            for asset_class, symbol, price, info in iter_quotes(data):
+                record = (
+                    timestamp,
+                    symbol.encode("utf-8")[:24],
+                    price,
+                    info.get('change', 0.0),
+                    info.get('change_percent', 0.0),
+                    info.get('volume', 0) or 0,
+                )
+                self._buffer.setdefault((day, asset_class), []).append(record)
+                self._buffered += 1
+
+            previous_day = self._current_day
+            self._current_day = day
+
+            due = (
+                self._buffered >= self.batch_size
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+            if due or (previous_day and previous_day != day):
+                self._flush_locked()
+
+        # Virada do dia: a partição de ontem não recebe mais dados
+        if previous_day and previous_day != day:
+            self.compact(previous_day)
+        # Primeiro snapshot do processo: .log de dias em que ele não rodava
+        # (ou em que caiu antes da virada) nunca seriam compactados
+        elif previous_day is None:
+            self.compact_stale(day)
+
+    def flush(self) -> None:
+        """Grava no disco os registros em buffer"""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if self._buffered and not self._can_write():
+            self._buffer = {}
+            self._buffered = 0
+            return
+
+        for (day, asset_class), records in self._buffer.items():
+            if not records:
+                continue
+
+            path = self.partition_path(day, asset_class)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "ab") as f:
+                np.array(records, dtype=RECORD_DTYPE).tofile(f)
+
+        self._buffer = {}
+        self._buffered = 0
+        self._last_flush = time.monotonic()
+
+    def compact(self, day: Optional[str] = None) -> None:
+        """
+        Junta o .log de cada partição no .bin ordenado e reescreve o índice
+        (day=None compacta todos os dias)
+        """
+        self.flush()
+        # Só quem grava compacta: o .log pode estar recebendo registros
+        if not self._can_write():
+            return
+
+        for partition_day, asset_class in self.partitions():
+            if day and partition_day != day:
+                continue
+
+            log_path = self.partition_path(partition_day, asset_class, "log")
+            if not os.path.exists(log_path):
+                continue
+
+            try:
+                self._compact_partition(partition_day, asset_class, log_path)
+            except OSError as e:
+                # Ex.: arquivo aberto por um leitor no Windows; o .log fica e
+                # é compactado na próxima abertura (compact_stale)
+                print(f"⚠️ Erro ao compactar {partition_day}/{asset_class}: {e}")
+
+    def _compact_partition(self, partition_day: str, asset_class: str, log_path: str) -> None:
+        with self._lock:
+            bin_path = self.partition_path(partition_day, asset_class, "bin")
+            parts = [read_records(path) for path in (bin_path, log_path)]
+            records = np.concatenate(parts)
+            records = records[np.lexsort((records['timestamp'], records['symbol']))]
+
+            index = {}
+            symbols, starts = np.unique(records['symbol'], return_index=True)
+            ends = list(starts[1:]) + [len(records)]
+            for symbol, start, end in zip(symbols, starts, ends):
+                index[symbol.decode("utf-8")] = [int(start), int(end)]
+
+            # Arquivos temporários + os.replace: leitores nunca veem um
+            # arquivo pela metade. O índice vai primeiro; entre as duas
+            # trocas o leitor vê índice novo com .bin antigo, e a
+            # contagem de registros (última linha do índice) não bate
+            idx_path = self.partition_path(partition_day, asset_class, "idx.json")
+            with open(f"{idx_path}.tmp", "w", encoding="utf-8") as f:
+                json.dump(index, f)
+            _retry(os.replace, f"{idx_path}.tmp", idx_path)
+
+            tmp_bin = f"{bin_path}.tmp"
+            records.tofile(tmp_bin)
+            _retry(os.replace, tmp_bin, bin_path)
+
+            _retry(os.remove, log_path)
+
+    def compact_stale(self, today: str) -> None:
+        """Compacta os .log que sobraram de dias anteriores a `today`"""
+        stale = sorted({
+            day for day, asset_class in self.partitions()
+            if day < today and os.path.exists(self.partition_path(day, asset_class, "log"))
+        })
+        for day in stale:
+            self.compact(day)
+
+    def partitions(self) -> List[Tuple[str, str]]:
+        """Partições existentes: (dia, classe de ativo)"""
+        found = []
+        if not os.path.isdir(self.root):
+            return found
+
+        for day in sorted(os.listdir(self.root)):
+            for asset_class in ASSET_CLASSES:
+                if any(
+                    os.path.exists(self.partition_path(day, asset_class, kind))
+                    for kind in ("log", "bin")
+                ):
+                    found.append((day, asset_class))
+        return found
+
+    def read_frame(
+        self,
+        asset_class: Optional[str] = None,
+        start_day: Optional[str] = None,
+        end_day: Optional[str] = None,
+        symbols: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        """
+        Lê o histórico como DataFrame (colunas: timestamp, symbol, asset_class,
+        price, change, change_percent, volume), ordenado por horário
+        """
+        import pandas as pd
+
+        self.flush()
+
+        frames = []
+        for day, partition_class in self.partitions():
+            if asset_class and partition_class != asset_class:
+                continue
+            if (start_day and day < start_day) or (end_day and day > end_day):
+                continue
+
+            records = np.concatenate([
+                read_records(self.partition_path(day, partition_class, kind))
+                for kind in ("bin", "log")
+            ])
+            if symbols:
+                wanted = np.array([s.encode("utf-8") for s in symbols], dtype='S24')
+                records = records[np.isin(records['symbol'], wanted)]
+
+            frame = pd.DataFrame(records)
+            frame['asset_class'] = partition_class
+            frames.append(frame)
+
+        if not frames:
+            columns = list(RECORD_DTYPE.names) + ['asset_class']
+            return pd.DataFrame(columns=columns)
+
+        frame = pd.concat(frames, ignore_index=True)
+        frame['symbol'] = frame['symbol'].str.decode("utf-8")
+        frame['timestamp'] = pd.to_datetime(frame['timestamp'], unit='s', utc=True)
+        return frame.sort_values('timestamp', kind='stable').reset_index(drop=True)
+
+
+def _retry(operation, *args, attempts: int = 5, delay: float = 0.1) -> None:
+    """
+    os.replace/os.remove com novas tentativas: no Windows falham com
+    PermissionError enquanto outro processo tem o arquivo aberto
+    """
+    for attempt in range(attempts):
+        try:
+            return operation(*args)
+        except PermissionError:
+            if attempt == attempts - 1:
+                raise
+            time.sleep(delay * (attempt + 1))
+
+
+def read_records(path: str) -> np.ndarray:
+    """Lê um arquivo de registros (vazio se não existir)"""
+    if not os.path.exists(path):
+        return np.zeros(0, dtype=RECORD_DTYPE)
+
+    # Ignora um registro final incompleto (processo interrompido no meio da escrita)
+    count = os.path.getsize(path) // RECORD_DTYPE.itemsize
+    return np.fromfile(path, dtype=RECORD_DTYPE, count=count)
+
+
+
+class HistoryReader:
+    """
+    Leitura do histórico com np.memmap: os arquivos são mapeados na memória
+    e as consultas devolvem fatias dos buffers mapeados, sem carregar a
+    partição inteira em cada processo do servidor web
+
+    No Windows um arquivo mapeado não pode ser trocado nem apagado, e a
+    compactação do coletor falharia enquanto o servidor web lê. Lá
+    (use_mmap=False) nenhum arquivo fica aberto: o .bin é lido só nas
+    linhas do símbolo (np.fromfile com offset) e o .log a cada consulta.
+    """
+
+    def __init__(self, root: Optional[str] = None, use_mmap: Optional[bool] = None):
+        self.root = history_root(root)
+        self.use_mmap = os.name != "nt" if use_mmap is None else use_mmap
+        self._maps = {}
+        self._lock = threading.Lock()
+
+    def _open(self, path: str) -> Tuple[np.ndarray, Optional[Dict]]:
+        """
+        Mapeia um arquivo de registros (e o índice, para .bin); o mapa é
+        reaberto quando o arquivo ou o índice mudam (novos registros ou
+        compactação)
+
+        O índice volta None se não corresponder ao .bin (compactação no
+        meio, entre as trocas dos dois arquivos): a consulta filtra o .bin
+        inteiro e o par não fica em cache.
+        """
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return np.zeros(0, dtype=RECORD_DTYPE), {}
+
+        count = stat.st_size // RECORD_DTYPE.itemsize
+        idx_path = path[:-len(".bin")] + ".idx.json" if path.endswith(".bin") else None
+        try:
+            idx_stat = os.stat(idx_path) if idx_path else None
+        except FileNotFoundError:
+            idx_stat = None
+        key = (
+            stat.st_mtime_ns, count,
+            idx_stat and (idx_stat.st_mtime_ns, idx_stat.st_size),
+        )
+
+        if not self.use_mmap and idx_path is None:
+            # .log sem mapa: cópia lida agora (o arquivo não fica aberto)
+            return read_records(path), {}
+
+        with self._lock:
+            cached = self._maps.get(path)
+            if cached and cached[0] == key:
+                return cached[1], cached[2]
+
+            if count == 0:
+                records = np.zeros(0, dtype=RECORD_DTYPE)
+            elif self.use_mmap:
+                records = np.memmap(path, dtype=RECORD_DTYPE, mode='r', shape=(count,))
+            else:
+                # Só o índice fica em cache; as linhas são lidas em _rows
+                records = None
+
+            index = {}
+            if idx_path:
+                try:
+                    with open(idx_path, "r", encoding="utf-8") as f:
+                        index = json.load(f)
+                except (FileNotFoundError, ValueError):
+                    index = None
+                # As linhas do índice cobrem o .bin inteiro, até a última
+                if index is not None and max((end for _, end in index.values()), default=0) != count:
+                    index = None
+            if index is None:
+                return (read_records(path) if records is None else records), None
+
+            self._maps[path] = (key, records, index)
+            return records, index
+
+    def _rows(self, path: str, records, first: int, last: int, symbol: bytes) -> np.ndarray:
+        """Linhas [first, last) do .bin: fatia do mapa ou leitura com offset"""
+        if records is not None:
+            return records[first:last]
+
+        try:
+            rows = np.fromfile(
+                path, dtype=RECORD_DTYPE, count=last - first,
+                offset=first * RECORD_DTYPE.itemsize,
+            )
+        except (FileNotFoundError, ValueError):
+            rows = np.zeros(0, dtype=RECORD_DTYPE)
+        # .bin trocado por outra compactação depois da leitura do índice
+        if len(rows) != last - first or not (rows['symbol'] == symbol).all():
+            rows = read_records(path)
+            rows = rows[rows['symbol'] == symbol]
+        return rows
+
+    def days(self, start: float, end: float) -> List[str]:
+        """
+        Partições diárias existentes no intervalo [start, end]; lista o
+        diretório em vez de percorrer cada dia do calendário (from=0 seriam
+        ~20 mil dias)
+        """
+        first = datetime.fromtimestamp(max(start, 0)).date().isoformat()
+        last = datetime.fromtimestamp(max(end, 0)).date().isoformat()
+        try:
+            names = os.listdir(self.root)
+        except FileNotFoundError:
+            return []
+        # Nomes ISO (AAAA-MM-DD) se ordenam como as datas
+        return sorted(
+            name for name in names
+            if first <= name <= last and os.path.isdir(os.path.join(self.root, name))
+        )
+
+    def slice(self, symbol: str, start: float, end: float) -> np.ndarray:
+        """
+        Registros do símbolo com start <= timestamp <= end, em ordem
+
+        Em um .bin compactado o resultado é uma fatia do arquivo mapeado
+        (índice do símbolo + busca binária no horário); o .log do dia ainda
+        não compactado é filtrado por máscara.
+        """
+        encoded = symbol.encode("utf-8")
+        parts = []
+
+        for day in self.days(start, end):
+            for asset_class in ASSET_CLASSES:
+                base = os.path.join(self.root, day, asset_class)
+
+                records, index = self._open(f"{base}.bin")
+                if index is None:
+                    # Índice fora de sincronia com o .bin: filtra tudo
+                    parts.extend(_filter(records, encoded, start, end))
+                elif symbol in index:
+                    first, last = index[symbol]
+                    rows = self._rows(f"{base}.bin", records, first, last, encoded)
+                    lo = np.searchsorted(rows['timestamp'], start, side='left')
+                    hi = np.searchsorted(rows['timestamp'], end, side='right')
+                    if hi > lo:
+                        parts.append(rows[lo:hi])
+
+                records, _ = self._open(f"{base}.log")
+                parts.extend(_filter(records, encoded, start, end))
+
+        if not parts:
+            return np.zeros(0, dtype=RECORD_DTYPE)
+        if len(parts) == 1:
+            return parts[0]
+
+        records = np.concatenate(parts)
+        return records[np.argsort(records['timestamp'], kind='stable')]
+
+
+def _filter(records: np.ndarray, symbol: bytes, start: float, end: float) -> List[np.ndarray]:
+    """Registros do símbolo no intervalo, por máscara (arquivo sem índice)"""
+    if not len(records):
+        return []
+    mask = (
+        (records['symbol'] == symbol)
+        & (records['timestamp'] >= start)
+        & (records['timestamp'] <= end)
+    )
+    return [records[mask]] if mask.any() else []
@@ -0,0 +1,142 @@
+"""
+Pool de conexões HTTP compartilhado (keep-alive) para o vMix e as fontes REST
+Evita abrir uma conexão TCP nova a cada requisição
+"""
+
+import os
+import threading
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+# Padrões do pool das fontes REST (variáveis HTTP_*)
+DEFAULTS = {
+    "pool_size": 10,
+    "pool_connections": 10,
+    "connect_timeout": 3.05,
+    "read_timeout": 10,
+    "retries": 2,
+    "backoff_factor": 0.3,
+}
+
+
+class HttpPool:
+    """Sessão requests com pool de conexões por host, timeouts e retentativas"""
+
+    def __init__(
+        self,
+        pool_size: int = 10,
+        pool_connections: int = 10,
+        connect_timeout: float = 3.05,
+        read_timeout: float = 10,
+        retries: int = 2,
+        backoff_factor: float = 0.3,
+    ):
+        self.pool_size = pool_size
+        self.pool_connections = pool_connections
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["GET"],
+            raise_on_status=False,
+        )
+        # pool_connections = quantos hosts ficam em cache,
+        # pool_maxsize = conexões mantidas abertas por host
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_size,
+            max_retries=retry,
+        )
+
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    @property
+    def timeout(self):
+        return (self.connect_timeout, self.read_timeout)
+
+    @property
+    def max_request_time(self) -> float:
+        """Limite de um GET com todas as tentativas e o backoff entre elas"""
+        attempts = self.retries + 1
+        backoff = sum(self.backoff_factor * 2 ** i for i in range(self.retries))
+        return attempts * (self.connect_timeout + self.read_timeout) + backoff
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """GET reaproveitando conexões abertas (timeout padrão do pool)"""
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.get(url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+    @classmethod
+    def from_config(
+        cls,
+        config: Optional[Dict] = None,
+        env_prefix: str = "HTTP",
+        defaults: Optional[Dict] = None,
+    ) -> "HttpPool":
+        """
+        Cria o pool a partir de um dicionário (ex.: seção "http" do config.json),
+        usando as variáveis {env_prefix}_* do ambiente e depois `defaults`
+        como padrão (ex.: HTTP_RETRIES, VMIX_HTTP_RETRIES)
+        """
+        config = config or {}
+        defaults = defaults or DEFAULTS
+
+        def setting(key, cast):
+            value = config.get(key, os.getenv(f"{env_prefix}_{key.upper()}", defaults[key]))
+            return cast(value)
+
+        return cls(
+            pool_size=setting("pool_size", int),
+            pool_connections=setting("pool_connections", int),
+            connect_timeout=setting("connect_timeout", float),
+            read_timeout=setting("read_timeout", float),
+            retries=setting("retries", int),
+            backoff_factor=setting("backoff_factor", float),
+        )
+
+
+# Pools compartilhados por nome ("cambio", "vmix"...)
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(
+    name: str = "default",
+    config: Optional[Dict] = None,
+    env_prefix: str = "HTTP",
+    defaults: Optional[Dict] = None,
+) -> HttpPool:
+    """
+    Retorna o pool compartilhado com esse nome, criando-o na primeira chamada
+    (os demais argumentos só valem nessa criação; ver HttpPool.from_config)
+    """
+    with _pools_lock:
+        pool = _pools.get(name)
+        if pool is None:
+            pool = HttpPool.from_config(config, env_prefix, defaults)
+            _pools[name] = pool
+        return pool
+
+
+def reset_pool(name: str) -> None:
+    """Fecha e descarta um pool (o próximo get_pool recria com a config atual)"""
+    with _pools_lock:
+        pool = _pools.pop(name, None)
+    if pool is not None:
+        pool.close()
@@ -0,0 +1,194 @@
+"""
+Barras intraday (1 minuto) por símbolo, mantidas em memória durante o dia
+Baixa do Yahoo Finance apenas as barras novas a cada ciclo
+
+pandas e yfinance só são importados no primeiro uso (inicialização rápida)
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def summarize_intraday(frame: pd.DataFrame, tickers: List[str]) -> pd.DataFrame:
+    """
+    Calcula abertura, máxima, mínima, fechamento, volume e variação de
+    todos os tickers de um download multi-ticker do Yahoo Finance.
+    'first_close' é o fechamento da primeira barra do período.
+
+    Retorna um DataFrame indexado pelo ticker. Tickers sem cotação no
+    período ficam de fora.
+    """
+    import numpy as np
+    import pandas as pd
+
+    columns = ['price', 'open', 'high', 'low', 'volume', 'first_close', 'change', 'change_percent']
+    if frame is None or frame.empty:
+        return pd.DataFrame(columns=columns)
+
+    # Downloads de um único ticker podem vir sem o nível do ticker nas colunas
+    if not isinstance(frame.columns, pd.MultiIndex):
+        frame = pd.concat({tickers[0]: frame}, axis=1).swaplevel(0, 1, axis=1)
+
+    def field(name: str) -> pd.DataFrame:
+        return frame[name].reindex(columns=tickers)
+
+    # Cada bolsa tem seu horário: o frame combinado tem NaN fora do pregão,
+    # por isso a abertura é o primeiro valor válido e o preço o último.
+    summary = pd.DataFrame({
+        'price': field('Close').ffill().iloc[-1],
+        'open': field('Open').bfill().iloc[0],
+        'high': field('High').max(),
+        'low': field('Low').min(),
+        'volume': field('Volume').sum().fillna(0),
+        'first_close': field('Close').bfill().iloc[0],
+    })
+    summary = summary.dropna(subset=['price', 'open'])
+
+    summary['change'] = summary['price'] - summary['open']
+    open_prices = summary['open'].to_numpy()
+    summary['change_percent'] = np.divide(
+        summary['change'].to_numpy() * 100,
+        open_prices,
+        out=np.zeros(len(summary)),
+        where=open_prices != 0,
+    )
+
+    return summary[columns]
+
+
+def split_by_ticker(frame: pd.DataFrame, tickers: List[str]) -> Dict[str, pd.DataFrame]:
+    """
+    Separa um download multi-ticker em um DataFrame OHLCV por ticker
+    """
+    import pandas as pd
+
+    if frame is None or frame.empty:
+        return {}
+
+    if not isinstance(frame.columns, pd.MultiIndex):
+        return {tickers[0]: frame}
+
+    bars = {}
+    available = frame.columns.get_level_values(1)
+    for ticker in tickers:
+        if ticker in available:
+            bars[ticker] = frame.xs(ticker, axis=1, level=1).dropna(subset=['Close'])
+    return bars
+
+
+def missing_tickers(bars: Dict[str, pd.DataFrame], tickers: List[str]) -> List[str]:
+    """Tickers pedidos que vieram sem nenhuma barra (o yfinance não levanta erro)"""
+    return [ticker for ticker in tickers if ticker not in bars or bars[ticker].empty]
+
+
+class IntradayBarStore:
+    """
+    Guarda as barras do dia de cada símbolo e, a cada atualização, baixa
+    só as barras a partir do último horário conhecido
+    """
+
+    def __init__(self, interval: str = "1m"):
+        self.interval = interval
+        self._bars = {}
+        self._lock = threading.Lock()
+
+    def last_timestamp(self, symbol: str) -> Optional[pd.Timestamp]:
+        with self._lock:
+            bars = self._bars.get(symbol)
+            return bars.index[-1] if bars is not None and not bars.empty else None
+
+    def update(self, symbols: List[str]) -> List[str]:
+        """
+        Atualiza as barras dos símbolos: o dia inteiro para símbolos novos,
+        só as barras recentes para os que já estão na memória
+
+        Retorna os símbolos que vieram sem barras. Como a última barra
+        conhecida é sempre baixada de novo, um símbolo já na memória também
+        deveria vir com ao menos uma.
+        """
+        symbols = list(dict.fromkeys(symbols))
+        last = {symbol: self.last_timestamp(symbol) for symbol in symbols}
+
+        new_symbols = [symbol for symbol in symbols if last[symbol] is None]
+        known_symbols = [symbol for symbol in symbols if last[symbol] is not None]
+
+        missing = []
+        if new_symbols:
+            bars = split_by_ticker(self._download(new_symbols, period="1d"), new_symbols)
+            missing += missing_tickers(bars, new_symbols)
+            self._append(bars)
+
+        if known_symbols:
+            # A última barra conhecida é baixada de novo: ela podia estar incompleta
+            start = min(last[symbol] for symbol in known_symbols)
+            frame = self._download(known_symbols, start=int(start.timestamp()))
+            bars = split_by_ticker(frame, known_symbols)
+            missing += missing_tickers(bars, known_symbols)
+            self._append(bars)
+
+        return missing
+
+    def _download(self, symbols: List[str], **period) -> pd.DataFrame:
+        import yfinance as yf
+
+        return yf.download(
+            tickers=symbols,
+            interval=self.interval,
+            group_by="column",
+            auto_adjust=True,
+            progress=False,
+            threads=True,
+            **period,
+        )
+
+    def _append(self, new_bars: Dict[str, pd.DataFrame]) -> None:
+        import pandas as pd
+
+        with self._lock:
+            for symbol, bars in new_bars.items():
+                if bars.empty:
+                    continue
+
+                existing = self._bars.get(symbol)
+                if existing is not None:
+                    bars = pd.concat([existing, bars])
+                    bars = bars[~bars.index.duplicated(keep='last')].sort_index()
+
+                # Mantém só o pregão da barra mais recente (virada do dia)
+                session_day = bars.index[-1].date()
+                bars = bars[bars.index.date == session_day]
+
+                self._bars[symbol] = bars
+
+    def bars(self, symbol: str) -> Optional[pd.DataFrame]:
+        with self._lock:
+            bars = self._bars.get(symbol)
+            return bars.copy() if bars is not None else None
+
+    def summary(self, symbols: List[str]) -> pd.DataFrame:
+        """
+        Abertura, máxima, mínima, preço, volume e variação do dia de cada
+        símbolo, calculados sobre as barras guardadas
+        """
+        with self._lock:
+            frames = {symbol: self._bars[symbol] for symbol in symbols if symbol in self._bars}
+
+        if not frames:
+            return summarize_intraday(None, symbols)
+
+        import pandas as pd
+
+        combined = pd.concat(frames, axis=1).swaplevel(0, 1, axis=1)
+        return summarize_intraday(combined, list(frames))
+
+    def clear(self, symbol: Optional[str] = None) -> None:
+        with self._lock:
+            if symbol is None:
+                self._bars.clear()
+            else:
+                self._bars.pop(symbol, None)
@@ -0,0 +1,123 @@
+"""
+Cache persistente de metadados de tickers (nome da empresa, valor de mercado...)
+Cada campo tem seu próprio TTL e o cache tem tamanho máximo (LRU)
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+
+
+class MetadataCache:
+    """Cache em disco com TTL por campo e despejo dos itens menos usados"""
+
+    # Tempo de validade (segundos) de cada campo do ticker.info
+    DEFAULT_TTLS = {
+        'marketCap': 6 * 60 * 60,       # 6 horas
+        'longName': 7 * 24 * 60 * 60,   # 7 dias
+    }
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttls: Optional[Dict[str, int]] = None,
+        default_ttl: int = 60 * 60,
+        max_entries: int = 1000,
+    ):
+        self.path = path or os.getenv(
+            "METADATA_CACHE_FILE", os.path.join("cache", "ticker_metadata.json")
+        )
+        self.ttls = dict(self.DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = False
+
+        self.load()
+
+    def get(self, symbol: str, fields: Iterable[str], allow_stale: bool = False) -> Optional[Dict]:
+        """
+        Retorna os campos pedidos se todos estiverem dentro do TTL,
+        ou None se algum precisar ser buscado novamente
+
+        Com allow_stale=True campos vencidos também valem (só falta conta)
+        """
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(symbol)
+            if entry is None:
+                return None
+
+            values = {}
+            for field in fields:
+                cached = entry.get(field)
+                if cached is None:
+                    return None
+                if not allow_stale and now - cached['fetched_at'] > self.ttl(field):
+                    return None
+                values[field] = cached['value']
+
+            self._entries.move_to_end(symbol)
+            return values
+
+    def set(self, symbol: str, values: Dict) -> None:
+        """Guarda os campos de um ticker com o horário atual"""
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.setdefault(symbol, {})
+            for field, value in values.items():
+                entry[field] = {'value': value, 'fetched_at': now}
+
+            self._entries.move_to_end(symbol)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+            self._dirty = True
+
+    def ttl(self, field: str) -> int:
+        return self.ttls.get(field, self.default_ttl)
+
+    def load(self) -> None:
+        """Carrega o cache do disco (arquivo ausente ou inválido = cache vazio)"""
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, "r", encoding="utf-8") as f:
+                    stored = json.load(f)
+                with self._lock:
+                    self._entries = OrderedDict(stored.get('entries', {}))
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+        except Exception as e:
+            print(f"Erro ao carregar cache de metadados: {e}")
+
+    def save(self) -> None:
+        """Grava o cache no disco se houve alterações"""
+        with self._lock:
+            if not self._dirty:
+                return
+            stored = {
+                'entries': {symbol: dict(entry) for symbol, entry in self._entries.items()}
+            }
+            self._dirty = False
+
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            # Escreve em arquivo temporário e troca, para nunca deixar o cache pela metade
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(stored, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Erro ao salvar cache de metadados: {e}")
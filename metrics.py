@@ -0,0 +1,246 @@
+"""
+Métricas de tempo por etapa da coleta (fontes, agregação, broadcast, vMix)
+
+Cada trecho medido é um span com nome e rótulos:
+
+    with span("source", source="bcb"):
+        ...
+
+O tempo vai para um histograma e o resultado para os contadores de
+sucesso/falha (exceção dentro do span = falha). Fontes que não levantam
+exceção ao falhar (o yfinance devolve frames vazios ou incompletos) marcam
+a falha explicitamente:
+
+    with span("source", source="yahoo_fx") as outcome:
+        missing = fx_bars.update(symbols)
+        if missing:
+            outcome.fail()
+
+Tudo fica em um registro global, exposto no formato do Prometheus
+(render_prometheus, rota /metrics) e como tabela para o modo linha de
+comando (format_summary).
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+# Limites superiores dos buckets (segundos), como no Prometheus
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+METRIC_PREFIX = "financial"
+
+
+class Histogram:
+    """Histograma de latências com buckets fixos, soma, máximo e contadores"""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # último = +Inf
+        self.sum = 0.0
+        self.max = 0.0
+        self.success = 0
+        self.failure = 0
+
+    @property
+    def count(self):
+        return self.success + self.failure
+
+    def observe(self, seconds: float, ok: bool = True) -> None:
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+        if ok:
+            self.success += 1
+        else:
+            self.failure += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimativa pelo limite superior do bucket (o máximo no +Inf)"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for i, bound in enumerate(self.buckets):
+            seen += self.counts[i]
+            if seen >= target:
+                return min(bound, self.max)
+        return self.max
+
+
+class SpanOutcome:
+    """Resultado de um span em andamento; fail() conta o span como falha"""
+
+    def __init__(self):
+        self.failed = False
+
+    def fail(self) -> None:
+        self.failed = True
+
+
+class MetricsRegistry:
+    """Histogramas indexados por (nome do span, rótulos)"""
+
+    def __init__(self):
+        self._series: Dict[Tuple[str, Tuple], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, seconds: float, ok: bool = True, **labels) -> None:
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            histogram = self._series.get(key)
+            if histogram is None:
+                histogram = self._series[key] = Histogram()
+            histogram.observe(seconds, ok)
+
+    @contextmanager
+    def span(self, name: str, **labels):
+        start = time.perf_counter()
+        outcome = SpanOutcome()
+        try:
+            yield outcome
+        except BaseException:
+            self.observe(name, time.perf_counter() - start, False, **labels)
+            raise
+        self.observe(name, time.perf_counter() - start, not outcome.failed, **labels)
+
+    def series(self):
+        """Cópia ordenada de [(nome, rótulos, histograma)]"""
+        with self._lock:
+            return [
+                (name, labels, _copy(histogram))
+                for (name, labels), histogram in sorted(self._series.items())
+            ]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def render_prometheus(self) -> str:
+        """Texto no formato de exposição do Prometheus (versão 0.0.4)"""
+        seconds = f"{METRIC_PREFIX}_span_seconds"
+        total = f"{METRIC_PREFIX}_span_total"
+        lines = [
+            f"# HELP {seconds} Duração de cada etapa da coleta e da distribuição.",
+            f"# TYPE {seconds} histogram",
+        ]
+        counters = [
+            f"# HELP {total} Execuções de cada etapa por resultado.",
+            f"# TYPE {total} counter",
+        ]
+
+        for name, labels, histogram in self.series():
+            base = [("span", name)] + list(labels)
+            cumulative = 0
+            for bound, count in zip(self.bucket_labels(histogram), histogram.counts):
+                cumulative += count
+                lines.append(f"{seconds}_bucket{_labels(base + [('le', bound)])} {cumulative}")
+            lines.append(f"{seconds}_sum{_labels(base)} {histogram.sum:.6f}")
+            lines.append(f"{seconds}_count{_labels(base)} {histogram.count}")
+            counters.append(f"{total}{_labels(base + [('outcome', 'success')])} {histogram.success}")
+            counters.append(f"{total}{_labels(base + [('outcome', 'failure')])} {histogram.failure}")
+
+        return "\n".join(lines + counters) + "\n"
+
+    @staticmethod
+    def bucket_labels(histogram):
+        return [f"{bound:g}" for bound in histogram.buckets] + ["+Inf"]
+
+    def format_summary(self) -> str:
+        """Tabela com contagem, falhas, média, p95 e máximo de cada span"""
+        series = self.series()
+        if not series:
+            return "📏 Nenhuma métrica registrada ainda"
+
+        output = ["📏 MÉTRICAS POR ETAPA", "-" * 96]
+        output.append(
+            f"{'etapa':44} {'n':>6} {'falhas':>6} {'média':>9} {'p95':>9} {'máx':>9}"
+        )
+        for name, labels, histogram in series:
+            label = name + "".join(f" {value}" for _, value in labels)
+            mean = histogram.sum / histogram.count if histogram.count else 0.0
+            output.append(
+                f"{label[:44]:44} {histogram.count:6d} {histogram.failure:6d} "
+                f"{mean * 1000:7.1f}ms {histogram.quantile(0.95) * 1000:7.1f}ms "
+                f"{histogram.max * 1000:7.1f}ms"
+            )
+        return "\n".join(output)
+
+
+def _copy(histogram: Histogram) -> Histogram:
+    copy = Histogram(histogram.buckets)
+    copy.counts = list(histogram.counts)
+    copy.sum = histogram.sum
+    copy.max = histogram.max
+    copy.success = histogram.success
+    copy.failure = histogram.failure
+    return copy
+
+
+def _labels(pairs) -> str:
+    escaped = (
+        f'{key}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for key, value in pairs
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+# Registro global usado pelos módulos da coleta
+REGISTRY = MetricsRegistry()
+span = REGISTRY.span
+observe = REGISTRY.observe
+render_prometheus = REGISTRY.render_prometheus
+format_summary = REGISTRY.format_summary
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class SummaryPrinter:
+    """Decide quando mostrar o resumo periódico no modo linha de comando"""
+
+    def __init__(self, interval: Optional[float] = None):
+        # METRICS_SUMMARY_INTERVAL=0 desliga o resumo
+        if interval is None:
+            interval = float(os.getenv("METRICS_SUMMARY_INTERVAL", 300))
+        self.interval = interval
+        self._last = time.monotonic()
+
+    def maybe_print(self) -> bool:
+        if self.interval <= 0 or time.monotonic() - self._last < self.interval:
+            return False
+        self._last = time.monotonic()
+        print(format_summary())
+        return True
+
+
+def serve_metrics(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Servidor HTTP mínimo com /metrics (para processos sem Flask, como o daemon)"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"📏 Métricas em http://{host}:{port}/metrics")
+    return server
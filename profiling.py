@@ -0,0 +1,224 @@
+"""
+Perfil sob demanda do laço de coleta
+
+Um LoopProfiler envolve cada iteração do laço (run_continuous,
+update_data_background, daemon). Desligado, custa uma verificação de
+atributo por iteração. Armado, perfila as próximas N iterações e grava um
+arquivo .prof (pstats) em PROFILE_DIR, que pode ser aberto depois com
+`python -m pstats` ou snakeviz.
+
+Como armar:
+- PROFILE_ITERATIONS=N ao iniciar o processo
+- sinal SIGUSR1 (PROFILE_SIGNAL_ITERATIONS iterações, padrão 3):
+      kill -USR1 <pid>
+- dashboard web: POST /admin/profile?iterations=N com o cabeçalho
+  X-Admin-Token igual a ADMIN_TOKEN
+
+Modos (PROFILE_MODE):
+- sample (padrão): amostra as pilhas de todas as threads a cada
+  PROFILE_SAMPLE_INTERVAL segundos, inclusive as buscas nos executores e no
+  agendador; threads paradas esperando trabalho ficam de fora
+- cprofile: determinístico, mas só na thread do laço (o trabalho nos
+  executores aparece como espera)
+"""
+
+import cProfile
+import os
+import pstats
+import signal
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Optional
+
+PROFILE_MODES = ("sample", "cprofile")
+
+# Funções (arquivo, nome) em que uma thread fica parada esperando trabalho:
+# amostras com uma delas no topo da pilha são descartadas
+PARKED_FRAMES = {
+    ("threading.py", "wait"),                   # Condition/Event.wait, queue.Queue.get
+    ("threading.py", "_wait_for_tstate_lock"),  # Thread.join
+    ("thread.py", "_worker"),                   # executor ocioso (SimpleQueue.get)
+    ("selectors.py", "select"),                 # laço do asyncio sem nada pronto
+    ("socketserver.py", "serve_forever"),
+    ("connection.py", "accept"),                # Listener do daemon de coleta
+}
+
+
+class SamplingProfiler:
+    """Amostragem das pilhas de todas as threads, exportada no formato do pstats"""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        # função -> [amostras, tempo próprio, tempo acumulado, {chamador: [...]}]
+        self._entries = defaultdict(lambda: [0, 0.0, 0.0, defaultdict(lambda: [0, 0.0, 0.0])])
+        self._thread = None
+        self._running = threading.Event()
+
+    def enable(self):
+        self._running.set()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def disable(self):
+        self._running.clear()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        own = threading.get_ident()
+        last = time.perf_counter()
+        while self._running.is_set():
+            time.sleep(self.interval)
+            now = time.perf_counter()
+            elapsed, last = now - last, now
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own and not is_parked(frame):
+                    self._sample(frame, elapsed)
+
+    def _sample(self, frame, elapsed):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+            frame = frame.f_back
+
+        leaf = self._entries[stack[0]]
+        leaf[0] += 1
+        leaf[1] += elapsed
+        # Recursão: cada função conta uma vez por amostra no tempo acumulado
+        seen = set()
+        for depth, func in enumerate(stack):
+            entry = self._entries[func]
+            if func not in seen:
+                seen.add(func)
+                entry[2] += elapsed
+            if depth + 1 < len(stack):
+                caller = entry[3][stack[depth + 1]]
+                caller[0] += 1
+                caller[1] += elapsed if depth == 0 else 0.0
+                caller[2] += elapsed
+
+    def create_stats(self):
+        """Interface usada por pstats.Stats(profiler)"""
+        self.stats = {
+            func: (count, count, own, total, {
+                caller: (n, n, caller_own, caller_total)
+                for caller, (n, caller_own, caller_total) in callers.items()
+            })
+            for func, (count, own, total, callers) in self._entries.items()
+        }
+
+    def dump_stats(self, path: str):
+        pstats.Stats(self).dump_stats(path)
+
+
+def is_parked(frame) -> bool:
+    """Thread parada esperando trabalho (e não em uma busca ou cálculo)"""
+    code = frame.f_code
+    return (os.path.basename(code.co_filename), code.co_name) in PARKED_FRAMES
+
+
+class LoopProfiler:
+    """Perfila as próximas N iterações de um laço quando armado"""
+
+    def __init__(self, name: str, output_dir: Optional[str] = None, mode: Optional[str] = None):
+        self.name = name
+        self.output_dir = output_dir or os.getenv("PROFILE_DIR", "profiles")
+        self.mode = mode or os.getenv("PROFILE_MODE", "sample")
+        self.sample_interval = float(os.getenv("PROFILE_SAMPLE_INTERVAL", 0.005))
+        self.remaining = 0
+        self.iterations = 0
+        self.files = []
+        self._profiler = None
+        self._lock = threading.Lock()
+
+        if os.getenv("PROFILE_ITERATIONS"):
+            self.request(int(os.getenv("PROFILE_ITERATIONS")))
+
+    def request(self, iterations: int, mode: Optional[str] = None) -> Dict:
+        """Arma o perfil para as próximas `iterations` iterações"""
+        if mode is not None:
+            if mode not in PROFILE_MODES:
+                raise ValueError(f"Modo de perfil inválido: {mode}")
+            self.mode = mode
+        with self._lock:
+            self.remaining = max(0, int(iterations))
+        if self.remaining:
+            print(f"🔬 Perfil ({self.mode}) armado para {self.remaining} iterações de {self.name}")
+        return self.status()
+
+    @contextmanager
+    def iteration(self):
+        # Desligado: só esta verificação
+        if not self.remaining:
+            yield
+            return
+
+        if self._profiler is None:
+            self._profiler = (
+                cProfile.Profile() if self.mode == "cprofile" else SamplingProfiler(self.sample_interval)
+            )
+            self.iterations = 0
+
+        self._profiler.enable()
+        try:
+            yield
+        finally:
+            self._profiler.disable()
+            self.iterations += 1
+            with self._lock:
+                self.remaining = max(0, self.remaining - 1)
+                done = self.remaining == 0
+            if done:
+                self._dump()
+
+    def _dump(self):
+        profiler, self._profiler = self._profiler, None
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            path = os.path.join(self.output_dir, f"{self.name}_{stamp}_{self.mode}.prof")
+            profiler.dump_stats(path)
+            self.files.append(path)
+            print(f"🔬 Perfil de {self.iterations} iterações de {self.name} salvo em {path}")
+            pstats.Stats(path).sort_stats("cumulative").print_stats(15)
+        except Exception as e:
+            print(f"❌ Erro ao salvar o perfil: {e}")
+
+    def status(self) -> Dict:
+        return {
+            "name": self.name,
+            "mode": self.mode,
+            "remaining": self.remaining,
+            "files": self.files[-10:],
+        }
+
+
+_profilers: Dict[str, LoopProfiler] = {}
+
+
+def get_profiler(name: str) -> LoopProfiler:
+    """LoopProfiler compartilhado do laço `name` (o sinal arma todos)"""
+    if name not in _profilers:
+        _profilers[name] = LoopProfiler(name)
+    return _profilers[name]
+
+
+def install_signal_handler() -> bool:
+    """SIGUSR1 arma os perfis registrados; só na thread principal e em POSIX"""
+    if not hasattr(signal, "SIGUSR1") or threading.current_thread() is not threading.main_thread():
+        return False
+
+    iterations = int(os.getenv("PROFILE_SIGNAL_ITERATIONS", 3))
+
+    def handle(signum, frame):
+        for profiler in _profilers.values():
+            profiler.request(iterations)
+
+    signal.signal(signal.SIGUSR1, handle)
+    return True
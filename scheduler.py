@@ -0,0 +1,207 @@
+"""
+Agendador de taxa fixa para as fontes de dados
+
+Cada fonte tem seu período e roda na grade início + k * período do relógio
+monotônico: o tempo da busca não se soma ao intervalo e o horário não
+escorrega ao longo do dia. Uma fonte nunca tem duas buscas ao mesmo tempo;
+se a anterior ainda estiver rodando no horário seguinte, esse horário é
+pulado.
+
+Os disparos saem de uma thread de relógio própria: as fontes seguem a grade
+mesmo enquanto quem consome os resultados (wait) está ocupado com o
+snapshot anterior.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from metrics import span
+
+
+class ScheduledJob:
+    """Uma fonte agendada e seu estado"""
+
+    def __init__(self, name: str, period: float, func: Callable[[], object]):
+        if period <= 0:
+            raise ValueError(f"Período inválido para {name}: {period}")
+        self.name = name
+        self.period = period
+        self.func = func
+        self.next_run = None
+        self.running = False
+        self.runs = 0
+        # Horários pulados: busca anterior ainda rodando ou processo atrasado
+        self.skipped = 0
+        self.last_duration = None
+
+
+class FixedRateScheduler:
+    """Dispara cada fonte no seu período, em threads próprias"""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic, settle: float = 0.5):
+        self.clock = clock
+        # Após a primeira fonte terminar, espera até `settle` segundos pelas
+        # que ainda estão rodando, para entregar os resultados juntos
+        self.settle = settle
+        self.jobs: Dict[str, ScheduledJob] = {}
+        self._done = queue.Queue()
+        self._executor = None
+        self._timer = None
+        self._stop = threading.Event()
+        # Disparos da grade (thread do relógio) e sob demanda (run_now)
+        self._launch_lock = threading.Lock()
+
+    def add(self, name: str, period: float, func: Callable[[], object]) -> ScheduledJob:
+        job = self.jobs[name] = ScheduledJob(name, period, func)
+        return job
+
+    def start(self) -> None:
+        if not self.jobs:
+            # A thread do relógio não teria horário para esperar
+            raise ValueError("Agendador sem fontes")
+        # Uma thread por fonte: nenhuma espera na fila por outra mais lenta
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, len(self.jobs)), thread_name_prefix="fonte"
+        )
+        now = self.clock()
+        for job in self.jobs.values():
+            job.next_run = now
+
+        self._stop.clear()
+        self._timer = threading.Thread(target=self._timer_loop, name="agendador", daemon=True)
+        self._timer.start()
+
+    def shutdown(self) -> None:
+        self._stop.set()
+        if self._timer is not None:
+            self._timer.join()
+            self._timer = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _timer_loop(self) -> None:
+        """Dispara as fontes que venceram e dorme até o próximo horário"""
+        while not self._stop.is_set():
+            now = self.clock()
+            self._launch_due(now)
+            wait_for = min(job.next_run for job in self.jobs.values()) - now
+            self._stop.wait(max(0.0, wait_for))
+
+    def _launch_due(self, now: float) -> None:
+        with self._launch_lock:
+            for job in self.jobs.values():
+                if job.next_run > now:
+                    continue
+
+                if job.running:
+                    job.skipped += 1
+                    print(f"⚠️ {job.name}: busca anterior ainda em andamento, horário pulado")
+                else:
+                    self._launch(job)
+
+                # Próximo horário na grade; horários já passados são pulados
+                missed = int((now - job.next_run) // job.period)
+                job.skipped += missed
+                job.next_run += (missed + 1) * job.period
+
+    def _launch(self, job: ScheduledJob) -> None:
+        job.running = True
+        self._executor.submit(self._run, job)
+
+    def run_now(self, names: Optional[List[str]] = None) -> List[str]:
+        """
+        Dispara já as fontes pedidas (todas, por padrão), fora da grade; a
+        grade não muda e fontes ainda rodando não são disparadas de novo
+
+        Retorna as fontes disparadas. O resultado chega por wait(), como o
+        de qualquer outra execução.
+        """
+        launched = []
+        with self._launch_lock:
+            if self._executor is None:
+                return launched
+            for job in self.jobs.values():
+                if (names is None or job.name in names) and not job.running:
+                    self._launch(job)
+                    launched.append(job.name)
+        return launched
+
+    def _run(self, job: ScheduledJob) -> None:
+        start = self.clock()
+        result, error = None, None
+        try:
+            with span("job", job=job.name):
+                result = job.func()
+        except Exception as e:
+            error = e
+        finally:
+            job.last_duration = self.clock() - start
+            job.runs += 1
+            job.running = False
+        self._done.put((job, result, error))
+
+    def wait(self, timeout: Optional[float] = None) -> List[Tuple[str, object]]:
+        """
+        Espera até alguma fonte terminar (inicia o agendador na primeira vez)
+
+        Retorna [(fonte, resultado)] das que terminaram sem erro, ou lista
+        vazia se `timeout` passar antes.
+        """
+        if self._executor is None:
+            self.start()
+        deadline = None if timeout is None else self.clock() + timeout
+
+        while True:
+            wait_for = None
+            if deadline is not None:
+                wait_for = deadline - self.clock()
+                if wait_for <= 0:
+                    return []
+
+            try:
+                finished = [self._done.get(timeout=wait_for)]
+            except queue.Empty:
+                return []
+
+            settle_until = self.clock() + self.settle
+            while any(job.running for job in self.jobs.values()):
+                remaining = settle_until - self.clock()
+                if remaining <= 0:
+                    break
+                try:
+                    finished.append(self._done.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            while not self._done.empty():
+                finished.append(self._done.get_nowait())
+
+            results = []
+            for job, result, error in finished:
+                if error is not None:
+                    print(f"❌ Erro na fonte {job.name}: {error}")
+                else:
+                    results.append((job.name, result))
+            if results:
+                return results
+
+    def describe(self) -> str:
+        """Períodos das fontes, para o cabeçalho dos laços de coleta"""
+        return ", ".join(f"{job.name} {job.period:g}s" for job in self.jobs.values())
+
+    def status(self) -> Dict[str, Dict]:
+        now = self.clock()
+        return {
+            job.name: {
+                "period": job.period,
+                "running": job.running,
+                "runs": job.runs,
+                "skipped": job.skipped,
+                "last_duration": job.last_duration,
+                "next_in": None if job.next_run is None else max(0.0, job.next_run - now),
+            }
+            for job in self.jobs.values()
+        }
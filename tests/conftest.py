@@ -0,0 +1,13 @@
+"""
+Os módulos do projeto ficam na raiz (e os do servidor em web/), sem pacote:
+os testes importam como os scripts, com esses diretórios no sys.path
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+for path in (ROOT, os.path.join(ROOT, "web")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,130 @@
+"""Patches numerados por sala do protocolo incremental (web/delta.py)"""
+
+import copy
+
+import pytest
+
+from delta import ALL_ROOM, QUOTE_GROUPS, DeltaPublisher, diff_snapshots, filter_snapshot, subscription_rooms
+
+
+def snapshot(usd=5.0, ibov=130000.0, dax=True, status="open"):
+    data = {
+        "timestamp": "2026-10-16T10:00:00",
+        "cambio": {"USD-BRL": {"rate": usd, "timestamp": "t"}},
+        "bolsa": {"IBOV": {"price": ibov, "change": 1.0}},
+        "market_status": {"b3": status},
+    }
+    if dax:
+        data["bolsa"]["DAX"] = {"price": 18000.0, "change": 0.5}
+    return data
+
+
+def apply_patch(data, patch):
+    """Mesma regra do dashboard.js: set cria caminhos, unset apaga e poda pais vazios"""
+    data = copy.deepcopy(data)
+    for path, value in patch["set"]:
+        node = data
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+        node[path[-1]] = value
+    for path in patch["unset"]:
+        parents = [data]
+        for key in path[:-1]:
+            parents.append(parents[-1].get(key, {}))
+        parents[-1].pop(path[-1], None)
+        for depth in range(len(path) - 1, 1, -1):
+            if not parents[depth]:
+                parents[depth - 1].pop(path[depth - 1], None)
+    return data
+
+
+def without_timestamps(data):
+    """Horários de cada item não viajam nos patches (IGNORED_FIELDS)"""
+    return {
+        key: {
+            symbol: {k: v for k, v in info.items() if k != "timestamp"}
+            for symbol, info in value.items()
+        } if key in QUOTE_GROUPS else value
+        for key, value in data.items() if key != "timestamp"
+    }
+
+
+def test_diff_unsets_removed_symbol_as_one_subtree_and_ignores_item_timestamps():
+    old = snapshot()
+    new = snapshot(usd=5.1, dax=False)
+    new["cambio"]["USD-BRL"]["timestamp"] = "outro"
+
+    changed, removed = diff_snapshots(old, new)
+
+    assert changed == [[["cambio", "USD-BRL", "rate"], 5.1]]
+    assert removed == [["bolsa", "DAX"]]
+
+
+def test_patches_are_routed_per_room_with_consecutive_seqs():
+    publisher = DeltaPublisher()
+    publisher.set_active_rooms(["symbol:USD-BRL", "group:bolsa"])
+    publisher.publish(snapshot(), "t0")
+
+    patches = publisher.publish(snapshot(usd=5.1), "t1")
+    assert set(patches) == {ALL_ROOM, "symbol:USD-BRL"}
+    assert patches["symbol:USD-BRL"]["set"] == [[["cambio", "USD-BRL", "rate"], 5.1]]
+
+    # Campo compartilhado (fora das classes de ativo) vai para todas as salas ativas
+    patches = publisher.publish(snapshot(usd=5.1, status="closed"), "t2")
+    assert set(patches) == {ALL_ROOM, "symbol:USD-BRL", "group:bolsa"}
+    # O primeiro snapshot (a partir do vazio) também é um patch
+    assert patches[ALL_ROOM]["seq"] == 3
+    assert patches["symbol:USD-BRL"]["seq"] == 3
+    assert patches["group:bolsa"]["seq"] == 2
+
+    assert publisher.publish(snapshot(usd=5.1, status="closed"), "t3") == {}
+
+
+@pytest.mark.parametrize("rooms", [[ALL_ROOM], ["group:bolsa"], ["symbol:USD-BRL", "symbol:DAX"]])
+def test_full_plus_patches_rebuilds_the_filtered_snapshot(rooms):
+    publisher = DeltaPublisher()
+    publisher.set_active_rooms(rooms)
+    publisher.publish(snapshot(), "t0")
+
+    # Um cliente: um snapshot, alimentado pelos patches de todas as suas salas
+    full = publisher.full(rooms)
+    client = full["data"]
+    seqs = dict(full["seqs"])
+
+    for new in (snapshot(usd=5.2), snapshot(usd=5.2, ibov=1.0, dax=False), snapshot(status="closed")):
+        for room, patch in publisher.publish(new, "t").items():
+            if room not in rooms:
+                continue
+            assert patch["seq"] == seqs[room] + 1
+            seqs[room] = patch["seq"]
+            client = apply_patch(client, patch)
+
+        assert without_timestamps(client) == without_timestamps(filter_snapshot(new, rooms))
+
+
+def test_inactive_rooms_get_no_patches_and_lose_their_seq():
+    publisher = DeltaPublisher()
+    publisher.set_active_rooms(["symbol:USD-BRL"])
+    publisher.publish(snapshot(), "t0")
+    publisher.publish(snapshot(usd=5.1), "t1")
+    assert publisher.seqs["symbol:USD-BRL"] == 2
+
+    publisher.set_active_rooms([])
+    assert set(publisher.seqs) == {ALL_ROOM}
+    assert set(publisher.publish(snapshot(usd=5.2), "t2")) == {ALL_ROOM}
+
+
+def test_subscription_rooms_validates_input():
+    data = snapshot()
+    assert subscription_rooms(data, ["USD-BRL", "USD-BRL"], ["bolsa"], 5) == [
+        "symbol:USD-BRL", "group:bolsa",
+    ]
+    for symbols, groups, limit in (
+        ("USD-BRL", None, 5),         # texto em vez de lista
+        ([1], None, 5),
+        (["XYZ"], None, 5),           # símbolo fora do snapshot
+        (None, ["cripto"], 5),        # grupo desconhecido
+        (["USD-BRL", "IBOV"], None, 1),
+    ):
+        with pytest.raises(ValueError):
+            subscription_rooms(data, symbols, groups, limit)
@@ -0,0 +1,73 @@
+"""Política de consolidação das fontes de câmbio (CambioAPI.get_all_rates)"""
+
+import pytest
+
+from cambio_api import CambioAPI
+
+
+def rates(source, pairs, value=1.0):
+    return {pair: {"rate": value, "source": source} for pair in pairs}
+
+
+@pytest.fixture
+def api():
+    api = CambioAPI()
+    api.calls = []
+    all_pairs = [f"USD-{currency}" for currency in api.currencies]
+
+    def source(name, result):
+        def fetch(*args, **kwargs):
+            api.calls.append(name)
+            return result
+        return fetch
+
+    api.fake = lambda yahoo=all_pairs, bcb=(), fallback=all_pairs: (
+        setattr(api, "get_exchange_rates_yahoo", source("yahoo", rates("yahoo", yahoo))),
+        setattr(api, "get_usd_brl_bcb", source("bcb", rates("bcb", bcb, 5.0))),
+        setattr(api, "get_exchange_rates_exchangerate", source("exchangerate", rates("exchangerate", fallback, 9.0))),
+    )
+    yield api
+    api._executor.shutdown(wait=False)
+
+
+def test_merge_respects_fill_and_override_priority():
+    api = CambioAPI()
+    merged = api.merge_rates({
+        "yahoo": rates("yahoo", ["USD-EUR"]),
+        "exchangerate": rates("exchangerate", ["USD-EUR", "USD-JPY"]),
+        "bcb": rates("bcb", ["USD-BRL"]),
+        "fixer": rates("fixer", ["USD-BRL"]),
+    })
+    api._executor.shutdown(wait=False)
+
+    assert merged["USD-EUR"]["source"] == "yahoo"          # fill: primeira na prioridade
+    assert merged["USD-JPY"]["source"] == "exchangerate"   # fallback preenche lacuna
+    assert merged["USD-BRL"]["source"] == "bcb"            # override vence
+
+
+def test_fallbacks_are_not_called_when_yahoo_fills_every_pair(api):
+    api.fake()
+    merged = api.get_all_rates(only=["yahoo", "exchangerate", "fixer"])
+
+    assert api.calls == ["yahoo"]
+    assert len(merged) == len(api.currencies)
+
+
+def test_fallbacks_fill_only_missing_pairs(api):
+    api.fake(yahoo=["USD-BRL", "USD-EUR"])
+    merged = api.get_all_rates(only=["yahoo", "exchangerate", "fixer"])
+
+    assert api.calls == ["yahoo", "exchangerate"]
+    assert merged["USD-EUR"]["source"] == "yahoo"
+    assert merged["USD-KRW"]["source"] == "exchangerate"
+
+
+def test_partial_query_reuses_other_sources_last_result(api):
+    api.fake(bcb=["USD-BRL"])
+    api.get_all_rates(only=["bcb"])
+    api.calls.clear()
+
+    merged = api.get_all_rates(only=["yahoo", "exchangerate", "fixer"])
+
+    assert api.calls == ["yahoo"]
+    assert merged["USD-BRL"]["source"] == "bcb"
@@ -0,0 +1,114 @@
+"""Histórico binário: gravação, compactação, trava de escrita e leitura por fatia"""
+
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from history_log import HistoryLog, HistoryReader
+
+
+def snapshot(moment, usd, ibov):
+    return {
+        "timestamp": moment,
+        "cambio": {"USD-BRL": {"rate": usd, "change": 0.01}},
+        "bolsa": {"IBOV": {"price": ibov, "change": 10.0, "change_percent": 0.1}},
+    }
+
+
+def ts(moment):
+    return datetime.fromisoformat(moment).timestamp()
+
+
+@pytest.fixture
+def log(tmp_path):
+    return HistoryLog(str(tmp_path), batch_size=1000, flush_interval=3600)
+
+
+def fill_day(log, day, count=3):
+    for minute in range(count):
+        log.append_snapshot(snapshot(f"{day}T10:0{minute}:00", 5.0 + minute, 130000 + minute))
+    log.flush()
+
+
+def test_compact_merges_log_into_sorted_bin_with_index(log, tmp_path):
+    fill_day(log, "2025-09-25")
+    log.compact("2025-09-25")
+
+    day = tmp_path / "2025-09-25"
+    assert not (day / "cambio.log").exists()
+    index = json.loads((day / "bolsa.idx.json").read_text())
+    assert index == {"IBOV": [0, 3]}
+
+    frame = log.read_frame(asset_class="cambio")
+    assert list(frame["price"]) == [5.0, 6.0, 7.0]
+
+
+@pytest.mark.parametrize("use_mmap", [True, False])
+def test_reader_slices_bin_and_log(log, tmp_path, use_mmap):
+    fill_day(log, "2025-09-25")
+    log.compact("2025-09-25")
+    # Registros do mesmo dia ainda no .log, depois da compactação
+    log.append_snapshot(snapshot("2025-09-25T10:05:00", 8.0, 130005))
+    log.flush()
+
+    reader = HistoryReader(str(tmp_path), use_mmap=use_mmap)
+    rows = reader.slice("USD-BRL", ts("2025-09-25T10:01:00"), ts("2025-09-25T23:00:00"))
+
+    assert list(rows["price"]) == [6.0, 7.0, 8.0]
+    assert reader.slice("PETR4", 0, ts("2025-09-26T00:00:00")).size == 0
+
+
+def test_index_out_of_sync_with_bin_is_not_cached(log, tmp_path):
+    fill_day(log, "2025-09-25")
+    log.compact("2025-09-25")
+    reader = HistoryReader(str(tmp_path), use_mmap=False)
+    bin_path = str(tmp_path / "2025-09-25" / "cambio.bin")
+
+    # Índice de uma compactação nova com o .bin antigo ainda no lugar
+    idx_path = tmp_path / "2025-09-25" / "cambio.idx.json"
+    idx_path.write_text(json.dumps({"USD-BRL": [0, 4]}))
+
+    _, index = reader._open(bin_path)
+    assert index is None
+    assert bin_path not in reader._maps
+    rows = reader.slice("USD-BRL", 0, ts("2025-09-26T00:00:00"))
+    assert list(rows["price"]) == [5.0, 6.0, 7.0]
+
+
+def test_first_snapshot_compacts_stale_days(log, tmp_path):
+    fill_day(log, "2025-09-24")
+
+    # Como num processo reiniciado: o primeiro snapshot de hoje compacta o
+    # .log de ontem (a trava de gravação continua com este HistoryLog)
+    log._current_day = None
+    log.append_snapshot(snapshot("2025-09-25T09:00:00", 5.5, 131000))
+
+    assert not (tmp_path / "2025-09-24" / "cambio.log").exists()
+    assert (tmp_path / "2025-09-24" / "cambio.bin").exists()
+    assert (tmp_path / "2025-09-25" / "cambio.log").exists()
+
+
+@pytest.mark.skipif(os.name == "nt", reason="flock: travas por descritor só no POSIX")
+def test_second_writer_in_same_directory_does_not_write(log, tmp_path):
+    fill_day(log, "2025-09-25")
+
+    other = HistoryLog(str(tmp_path))
+    other.append_snapshot(snapshot("2025-09-25T11:00:00", 9.0, 140000))
+    other.flush()
+
+    frame = log.read_frame(asset_class="cambio")
+    assert 9.0 not in list(frame["price"])
+    assert len(frame) == 3
+
+
+def test_days_lists_only_existing_partitions(log, tmp_path):
+    fill_day(log, "2025-09-22")
+    fill_day(log, "2025-09-25")
+    (tmp_path / "2025-09-23.tmp").write_text("")
+
+    reader = HistoryReader(str(tmp_path))
+    assert reader.days(0, ts("2025-09-30T00:00:00")) == ["2025-09-22", "2025-09-25"]
+    assert reader.days(ts("2025-09-23T00:00:00"), ts("2025-09-24T00:00:00")) == []
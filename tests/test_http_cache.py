@@ -0,0 +1,67 @@
+"""Cache HTTP das rotas /api/*: ETag por representação, 304 e reconstrução por versão"""
+
+import gzip
+import json
+
+import pytest
+from flask import Flask
+
+from http_cache import ResponseCache
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    cache = ResponseCache()
+    state = {"version": 1, "builds": 0}
+
+    def build():
+        state["builds"] += 1
+        return {"version": state["version"], "rates": list(range(50))}
+
+    @app.route("/api/data")
+    def data():
+        return cache.respond("data", state["version"], build)
+
+    client = app.test_client()
+    client.state = state
+    return client
+
+
+def test_gzip_and_identity_have_distinct_etags(client):
+    plain = client.get("/api/data", headers={"Accept-Encoding": "identity"})
+    zipped = client.get("/api/data", headers={"Accept-Encoding": "gzip"})
+
+    assert plain.headers["ETag"] != zipped.headers["ETag"]
+    assert zipped.headers["Content-Encoding"] == "gzip"
+    assert "Content-Encoding" not in plain.headers
+    assert json.loads(gzip.decompress(zipped.data)) == json.loads(plain.data)
+    assert client.state["builds"] == 1
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "identity"])
+def test_either_etag_of_the_version_returns_304(client, encoding):
+    plain = client.get("/api/data", headers={"Accept-Encoding": "identity"})
+    zipped = client.get("/api/data", headers={"Accept-Encoding": "gzip"})
+
+    for etag in (plain.headers["ETag"], zipped.headers["ETag"]):
+        response = client.get(
+            "/api/data",
+            headers={"Accept-Encoding": encoding, "If-None-Match": etag},
+        )
+        assert response.status_code == 304
+        assert response.data == b""
+
+
+def test_new_version_rebuilds_and_changes_etag(client):
+    first = client.get("/api/data")
+    client.get("/api/data")
+    assert client.state["builds"] == 1
+
+    client.state["version"] = 2
+    second = client.get("/api/data", headers={"If-None-Match": first.headers["ETag"]})
+
+    assert second.status_code == 200
+    assert second.headers["ETag"] != first.headers["ETag"]
+    assert json.loads(second.data)["version"] == 2
+    assert client.state["builds"] == 2
@@ -0,0 +1,110 @@
+"""Grade de taxa fixa do FixedRateScheduler, dirigida por um relógio falso"""
+
+import pytest
+
+from scheduler import FixedRateScheduler
+
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class RecordingExecutor:
+    """Guarda os disparos sem rodar nada: a fonte fica 'rodando' até o teste terminar"""
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, func, job):
+        self.submitted.append(job.name)
+
+
+def make_scheduler(period=10.0):
+    clock = FakeClock()
+    scheduler = FixedRateScheduler(clock=clock)
+    job = scheduler.add("fonte", period, lambda: None)
+    scheduler._executor = RecordingExecutor()
+    job.next_run = clock.now
+    return scheduler, job, clock
+
+
+def finish(job):
+    job.running = False
+
+
+def test_runs_on_the_grid():
+    scheduler, job, clock = make_scheduler()
+
+    scheduler._launch_due(clock.now)
+    assert scheduler._executor.submitted == ["fonte"]
+    assert job.next_run == 10
+
+    finish(job)
+    clock.now = 4
+    scheduler._launch_due(clock.now)
+    assert scheduler._executor.submitted == ["fonte"]
+
+    # Atraso do relógio não desloca a grade
+    clock.now = 10.7
+    scheduler._launch_due(clock.now)
+    assert scheduler._executor.submitted == ["fonte", "fonte"]
+    assert job.next_run == 20
+    assert job.skipped == 0
+
+
+def test_skips_slot_while_previous_run_is_still_going():
+    scheduler, job, clock = make_scheduler()
+    scheduler._launch_due(clock.now)
+
+    clock.now = 10
+    scheduler._launch_due(clock.now)
+
+    assert scheduler._executor.submitted == ["fonte"]
+    assert job.skipped == 1
+    assert job.next_run == 20
+
+
+def test_catch_up_runs_once_and_skips_missed_slots():
+    scheduler, job, clock = make_scheduler()
+    scheduler._launch_due(clock.now)
+    finish(job)
+
+    # Processo parado por 3 períodos e meio: uma execução, dois horários pulados
+    clock.now = 35
+    scheduler._launch_due(clock.now)
+
+    assert scheduler._executor.submitted == ["fonte", "fonte"]
+    assert job.skipped == 2
+    assert job.next_run == 40
+
+
+def test_run_now_launches_off_grid_without_moving_it():
+    scheduler, job, clock = make_scheduler()
+    scheduler._launch_due(clock.now)
+    finish(job)
+
+    clock.now = 3
+    assert scheduler.run_now() == ["fonte"]
+    assert scheduler.run_now() == []
+    assert job.next_run == 10
+
+
+def test_refuses_to_start_without_jobs():
+    scheduler = FixedRateScheduler()
+    with pytest.raises(ValueError):
+        scheduler.start()
+
+
+def test_wait_returns_results_and_drops_errors():
+    scheduler = FixedRateScheduler(settle=0.5)
+    scheduler.add("ok", 60, lambda: 1)
+    scheduler.add("erro", 60, lambda: 1 / 0)
+    try:
+        results = scheduler.wait(timeout=5)
+    finally:
+        scheduler.shutdown()
+    assert results == [("ok", 1)]
@@ -0,0 +1,79 @@
+"""Caixa de um lugar do envio ao vMix e prazo dos lotes do SetTextDispatcher"""
+
+import queue
+import threading
+import time
+
+import pytest
+
+from vmix_updater.dispatcher import SetTextDispatcher
+from vmix_updater.mailbox import LatestValueMailbox
+
+
+def test_mailbox_keeps_only_the_latest_snapshot():
+    mailbox = LatestValueMailbox()
+    for n in range(3):
+        mailbox.put({"n": n})
+
+    assert mailbox.get(timeout=0) == {"n": 2}
+    assert mailbox.stats() == {
+        "put": 3, "delivered": 1, "dropped": 2, "coalesced": 1, "pending": False,
+    }
+    with pytest.raises(queue.Empty):
+        mailbox.get_nowait()
+
+
+def test_mailbox_get_waits_for_a_put():
+    mailbox = LatestValueMailbox()
+    threading.Timer(0.05, mailbox.put, args=("novo",)).start()
+    assert mailbox.get(timeout=2) == "novo"
+    with pytest.raises(queue.Empty):
+        mailbox.get(timeout=0.01)
+
+
+def test_dispatch_sends_rows_in_order():
+    sent = []
+    lock = threading.Lock()
+
+    def send(ip, porta, title, field, text):
+        with lock:
+            sent.append(field)
+        return field != "falha"
+
+    dispatcher = SetTextDispatcher(send, max_per_host=2)
+    try:
+        batch = dispatcher.dispatch(
+            "vmix", 8088, "TARJA",
+            [[("a1", "1"), ("a2", "2")], [("falha", "x")], []],
+            request_time=1,
+        )
+    finally:
+        dispatcher.shutdown()
+
+    assert (batch["sent"], batch["failed"]) == (2, 1)
+    assert sent.index("a1") < sent.index("a2")
+
+
+def test_dispatch_deadline_counts_stalled_rows_as_failed():
+    release = threading.Event()
+
+    def send(ip, porta, title, field, text):
+        if field == "travado":
+            release.wait(5)
+        return True
+
+    dispatcher = SetTextDispatcher(send, max_per_host=2)
+    rows = [[("ok", "1")], [("travado", "2"), ("depois", "3")]]
+    # 1 onda, linha mais longa com 2 campos
+    assert dispatcher.deadline(rows, 0.1) == pytest.approx(0.2)
+
+    start = time.perf_counter()
+    try:
+        batch = dispatcher.dispatch("vmix", 8088, "TARJA", rows, request_time=0.1)
+    finally:
+        release.set()
+        dispatcher.shutdown()
+
+    assert time.perf_counter() - start < 2
+    assert (batch["sent"], batch["failed"]) == (1, 2)
+    assert ("travado", "2", False) in batch["results"]
@@ -0,0 +1,151 @@
+"""
+Histórico em memória das cotações coletadas
+Um buffer circular NumPy por símbolo: memória fixa e inserção O(1)
+"""
+
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+# Colunas guardadas para cada símbolo
+COLUMNS = ('timestamp', 'price', 'change', 'change_percent', 'volume')
+
+
+class RingBuffer:
+    """Colunas pré-alocadas de um símbolo, sobrescrevendo os pontos mais antigos"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.columns = {name: np.zeros(capacity, dtype=np.float64) for name in COLUMNS}
+        self.size = 0
+        self.next = 0
+
+    def append(self, values: Dict[str, float]) -> None:
+        i = self.next
+        for name, column in self.columns.items():
+            column[i] = values.get(name, 0.0)
+
+        self.next = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def _ordered(self, column: np.ndarray) -> np.ndarray:
+        """Coluna do ponto mais antigo para o mais novo (cópia)"""
+        if self.size < self.capacity:
+            return column[:self.size].copy()
+        return np.concatenate((column[self.next:], column[:self.next]))
+
+    def latest(self, n: int) -> Dict[str, np.ndarray]:
+        n = max(0, min(n, self.size))
+        indices = (self.next - n + np.arange(n)) % self.capacity
+        return {name: column[indices] for name, column in self.columns.items()}
+
+    def range(self, start: Optional[float] = None, end: Optional[float] = None) -> Dict[str, np.ndarray]:
+        timestamps = self._ordered(self.columns['timestamp'])
+        lo = 0 if start is None else np.searchsorted(timestamps, start, side='left')
+        hi = len(timestamps) if end is None else np.searchsorted(timestamps, end, side='right')
+        return {
+            name: self._ordered(column)[lo:hi]
+            for name, column in self.columns.items()
+        }
+
+
+class TimeSeriesStore:
+    """
+    Histórico das cotações por símbolo (USD-BRL, IBOV, PETR4...)
+
+    Timestamps são segundos desde a época (float). Consultas retornam um
+    dicionário coluna -> np.ndarray em ordem cronológica.
+    """
+
+    def __init__(self, capacity: int = 2880):
+        # 2880 pontos = um dia inteiro com coleta a cada 30 segundos
+        self.capacity = capacity
+        self.asset_classes = {}
+        self._buffers = {}
+        self._lock = threading.Lock()
+
+    def append(
+        self,
+        symbol: str,
+        timestamp: float,
+        price: float,
+        change: float = 0.0,
+        change_percent: float = 0.0,
+        volume: float = 0.0,
+        asset_class: Optional[str] = None,
+    ) -> None:
+        with self._lock:
+            buffer = self._buffers.get(symbol)
+            if buffer is None:
+                buffer = self._buffers[symbol] = RingBuffer(self.capacity)
+            if asset_class:
+                self.asset_classes[symbol] = asset_class
+
+            buffer.append({
+                'timestamp': timestamp,
+                'price': price,
+                'change': change,
+                'change_percent': change_percent,
+                'volume': volume,
+            })
+
+    def append_snapshot(self, data: Dict) -> None:
+        """Adiciona todas as cotações de um resultado de collect_all_data"""
+        timestamp = datetime.fromisoformat(data["timestamp"]).timestamp()
+
+        for asset_class, symbol, price, info in iter_quotes(data):
+            self.append(
+                symbol,
+                timestamp,
+                price,
+                info.get('change', 0.0),
+                info.get('change_percent', 0.0),
+                info.get('volume', 0) or 0,
+                asset_class=asset_class,
+            )
+
+    def latest(self, symbol: str, n: int = 1) -> Dict[str, np.ndarray]:
+        """Os n pontos mais recentes do símbolo"""
+        with self._lock:
+            buffer = self._buffers.get(symbol)
+            if buffer is None:
+                return empty_columns()
+            return buffer.latest(n)
+
+    def range(self, symbol: str, start: Optional[float] = None, end: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """Pontos do símbolo com start <= timestamp <= end"""
+        with self._lock:
+            buffer = self._buffers.get(symbol)
+            if buffer is None:
+                return empty_columns()
+            return buffer.range(start, end)
+
+    def symbols(self) -> List[str]:
+        with self._lock:
+            return list(self._buffers)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(buffer.size for buffer in self._buffers.values())
+
+
+def iter_quotes(data: Dict):
+    """
+    Percorre as cotações de um snapshot: (classe, símbolo, preço, dados)
+    Câmbio usa 'rate' como preço; bolsa e ações usam 'price'.
+    """
+    for symbol, info in data.get("cambio", {}).items():
+        if 'rate' in info:
+            yield 'cambio', symbol, info['rate'], info
+
+    for asset_class in ("bolsa", "acoes"):
+        for symbol, info in data.get(asset_class, {}).items():
+            if 'price' in info:
+                yield asset_class, symbol, info['price'], info
+
+
+def empty_columns() -> Dict[str, np.ndarray]:
+    return {name: np.zeros(0, dtype=np.float64) for name in COLUMNS}
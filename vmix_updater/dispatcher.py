@@ -0,0 +1,103 @@
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+class SetTextDispatcher:
+    """
+    Envia os SetText de um snapshot em paralelo
+
+    Cada linha da tarja (nome, valor, diferença, percentual de uma cotação)
+    é enviada em ordem, mas linhas diferentes vão ao mesmo tempo. O número
+    de requisições simultâneas por host do vMix é limitado por max_per_host.
+
+    O lote tem prazo: um host que aceita a conexão e não responde não trava
+    o laço de envio; o que não terminou a tempo conta como falha.
+    """
+
+    def __init__(self, send, max_per_host=4, max_workers=16):
+        # send(ip, porta, title, field_name, text) -> bool
+        self.send = send
+        self.max_per_host = max_per_host
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="vmix"
+        )
+        self._host_limits = {}
+        self._lock = threading.Lock()
+
+    def host_limit(self, ip, porta):
+        """Semáforo que limita as requisições simultâneas para um host"""
+        host = f"{ip}:{porta}"
+        with self._lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.BoundedSemaphore(self.max_per_host)
+            return self._host_limits[host]
+
+    def _send_row(self, ip, porta, title, row):
+        limit = self.host_limit(ip, porta)
+        results = []
+        for field, text in row:
+            with limit:
+                ok = self.send(ip, porta, title, field, text)
+            results.append((field, text, ok))
+        return results
+
+    def deadline(self, rows, request_time):
+        """
+        Prazo do lote: as linhas vão em ondas de até max_per_host (ou
+        max_workers), e cada linha envia seus campos em sequência, cada um
+        em até request_time segundos
+        """
+        rows = [row for row in rows if row]
+        if not rows:
+            return 0.0
+        width = min(self.max_per_host, self.max_workers)
+        waves = math.ceil(len(rows) / width)
+        return waves * max(len(row) for row in rows) * request_time
+
+    def dispatch(self, ip, porta, title, rows, request_time=None):
+        """
+        Envia as linhas e espera todas terminarem (ou o prazo do lote, com
+        request_time = tempo máximo de um envio, ver deadline)
+
+        rows: lista de linhas, cada uma uma lista ordenada de (campo, texto).
+        Retorna o resumo do lote: enviados, falhas, tempo total e o
+        resultado de cada campo.
+        """
+        start = time.perf_counter()
+        rows = [row for row in rows if row]
+        futures = {
+            self._executor.submit(self._send_row, ip, porta, title, row): row
+            for row in rows
+        }
+        timeout = None if request_time is None else self.deadline(rows, request_time)
+        _, not_done = wait(futures, timeout=timeout)
+
+        results = []
+        for future, row in futures.items():
+            if future in not_done:
+                # Ainda na fila é cancelada; em andamento segue até o timeout
+                # do pool, mas o lote não espera e conta a linha como falha
+                future.cancel()
+                results.extend((field, text, False) for field, text in row)
+                continue
+            try:
+                results.extend(future.result())
+            except Exception as e:
+                print(f"Erro no envio para o vMix: {e}")
+
+        if not_done:
+            print(f"⚠️ vMix: {len(not_done)} linhas sem resposta em {timeout:.1f} s")
+
+        sent = sum(1 for _, _, ok in results if ok)
+        return {
+            "sent": sent,
+            "failed": len(results) - sent,
+            "elapsed": time.perf_counter() - start,
+            "results": results,
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,85 @@
+import queue
+import threading
+import time
+
+
+class LatestValueMailbox:
+    """
+    Caixa de mensagens com um único lugar: um snapshot novo substitui o
+    que ainda não foi enviado
+
+    Tem a mesma interface usada do queue.Queue (put, get com timeout,
+    task_done), então o vMix lento ou fora do ar não acumula snapshots
+    antigos para reenviar depois.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._item = None
+        self._pending = False
+        self._merged = 0  # snapshots descartados desde a última entrega
+
+        self.put_count = 0
+        self.delivered = 0
+        self.dropped = 0     # snapshots substituídos antes de serem enviados
+        self.coalesced = 0   # entregas que substituíram um ou mais snapshots
+        self.last_put = None
+
+    def put(self, item, block=True, timeout=None):
+        """Guarda o snapshot, substituindo o anterior se ainda não foi lido"""
+        with self._cond:
+            if self._pending:
+                self.dropped += 1
+                self._merged += 1
+            self._item = item
+            self._pending = True
+            self.put_count += 1
+            self.last_put = time.monotonic()
+            self._cond.notify()
+
+    def put_nowait(self, item):
+        self.put(item, block=False)
+
+    def get(self, block=True, timeout=None):
+        """
+        Retorna o snapshot mais recente, esperando até timeout segundos
+        (queue.Empty se nada chegar)
+        """
+        with self._cond:
+            if not self._pending:
+                if not block:
+                    raise queue.Empty
+                if not self._cond.wait_for(lambda: self._pending, timeout=timeout):
+                    raise queue.Empty
+
+            item = self._item
+            self._item = None
+            self._pending = False
+            self.delivered += 1
+            if self._merged:
+                self.coalesced += 1
+                self._merged = 0
+            return item
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def task_done(self):
+        """Compatibilidade com queue.Queue (não há fila para acompanhar)"""
+
+    def qsize(self):
+        with self._cond:
+            return 1 if self._pending else 0
+
+    def empty(self):
+        return self.qsize() == 0
+
+    def stats(self):
+        with self._cond:
+            return {
+                "put": self.put_count,
+                "delivered": self.delivered,
+                "dropped": self.dropped,
+                "coalesced": self.coalesced,
+                "pending": self._pending,
+            }
@@ -7,6 +7,11 @@ from urllib.parse import quote
 import queue
 import traceback
 
+from http_pool import DEFAULTS as HTTP_DEFAULTS, get_pool, reset_pool
+from metrics import observe, span
+from vmix_updater.dispatcher import SetTextDispatcher
+from vmix_updater.mailbox import LatestValueMailbox
+
 PATH_1 = "Z:\\GC\\gc_1.txt"
 PATH_2 = "Z:\\GC\\gc_2.txt"
 PATH_3 = "Z:\\GC\\gc_3.txt"
@@ -18,6 +23,17 @@ updater_1 = None
 updater_2 = None
 updater_3 = None
 
+# Pool de conexões keep-alive com o vMix (criado no primeiro envio)
+vmix_pool = None
+
+# O vMix fica na rede local e o envio seguinte já leva o valor mais novo:
+# sem retentativas nem backoff, que só atrasariam a fila atrás de um host
+# travado. Variáveis VMIX_HTTP_* (não HTTP_*) e a seção "http" do
+# config.json mudam esses valores.
+VMIX_HTTP_DEFAULTS = dict(
+    HTTP_DEFAULTS, connect_timeout=1, read_timeout=2, retries=0, backoff_factor=0
+)
+
 
 def load_config():
     """Carrega configurações"""
@@ -39,6 +55,21 @@ def load_config():
     }
 
 
+def get_vmix_pool():
+    """
+    Retorna o pool HTTP do vMix, configurado pela seção "http" do config.json,
+    pelas variáveis VMIX_HTTP_* ou por VMIX_HTTP_DEFAULTS (nunca pelas HTTP_*)
+    """
+    global vmix_pool
+
+    if vmix_pool is None:
+        vmix_pool = get_pool(
+            "vmix", load_config().get("http"),
+            env_prefix="VMIX_HTTP", defaults=VMIX_HTTP_DEFAULTS,
+        )
+    return vmix_pool
+
+
 def start_updaters():
     global updater_1, updater_2, updater_3
 
@@ -92,8 +123,9 @@ def send_phrase_directly(ip, porta, title, field_name, text):
     url = f"http://{ip}:{porta}/API?Function=SetText&Input={title}&SelectedName={field_name}&Value={encoded_text}"
     print(url)
     try:
-        response = requests.get(url, timeout=5)
-        response.raise_for_status()
+        with span("vmix_send"):
+            response = get_vmix_pool().get(url)
+            response.raise_for_status()
         print(f"Frase enviada com sucesso: {text}")
         return True
     except requests.RequestException as e:
@@ -122,9 +154,22 @@ class ApiUpdater(threading.Thread):
         self.name = name
         self.caractere_limite = caractere_limite
         self.daemon = True
-        self.queue = queue.Queue()
+        # Só o snapshot mais recente fica esperando para ir ao ar
+        self.queue = LatestValueMailbox()
         self.config = load_config()
 
+        # Último texto enviado por (título, campo): só reenvia o que mudou
+        self.last_sent = {}
+        self.resync_interval = self.config.get("resync_interval", 300)
+        self.last_resync = float("-inf")
+
+        # Envia linhas diferentes da tarja em paralelo
+        self.dispatcher = SetTextDispatcher(
+            send_phrase_directly,
+            max_per_host=self.config.get("max_concurrency", 4),
+        )
+        self.last_batch = None
+
     def run(self):
 
         while self.running:
@@ -132,77 +177,97 @@ class ApiUpdater(threading.Thread):
                 data = self.queue.get(timeout=30)
                 if data:
                     print(f"Enviando dados para API: {data}")
-                    for key in data["cambio"].keys():
-                        if key in self.config.keys():
-                            send_phrase_directly(
-                                self.config["ip"],
-                                self.config["porta"],
-                                self.config["title"],
-                                self.config[key]["name"],
-                                key,
-                            )
-                            for field in data["cambio"][key].keys():
-                                if field == "rate":
-                                    send_phrase_directly(
-                                        self.config["ip"],
-                                        self.config["porta"],
-                                        self.config["title"],
-                                        self.config[key]["value"],
-                                        f"{data['cambio'][key][field]:.4f}",
-                                    )
-                                elif field == "change":
-                                    send_phrase_directly(
-                                        self.config["ip"],
-                                        self.config["porta"],
-                                        self.config["title"],
-                                        self.config[key]["diff"],
-                                        f"{data['cambio'][key][field]:+.4f}",
-                                    )
-                                elif field == "change_percent":
-                                    send_phrase_directly(
-                                        self.config["ip"],
-                                        self.config["porta"],
-                                        self.config["title"],
-                                        self.config[key]["perc"],
-                                        f"{data['cambio'][key][field]:+.2f}%",
-                                    )
-                            send_phrase_directly(
-                                self.config["ip"],
-                                self.config["porta"],
-                                self.config["title"],
-                                self.config["IBOV"]["name"],
-                                "IBOVESPA",
-                            )
-                            send_phrase_directly(
-                                self.config["ip"],
-                                self.config["porta"],
-                                self.config["title"],
-                                self.config["IBOV"]["value"],
-                                f"{data["bolsa"]['IBOV']['price']:+.2f}",
-                            )
-                            arrow = "↑" if data["bolsa"]["IBOV"]["change"] >= 0 else "↓"
-                            send_phrase_directly(
-                                self.config["ip"],
-                                self.config["porta"],
-                                self.config["title"],
-                                self.config["IBOV"]["diff"],
-                                f"{arrow}{data["bolsa"]['IBOV']['change']:+.2f}",
-                            )
-                            send_phrase_directly(
-                                self.config["ip"],
-                                self.config["porta"],
-                                self.config["title"],
-                                self.config["IBOV"]["perc"],
-                                f"{data["bolsa"]['IBOV']['change_percent']:+.2f}%",
-                            )
+                    self.push(data)
                     self.queue.task_done()
 
+            except queue.Empty:
+                continue
             except Exception as e:
                 # traceback.print_exc()
                 print(f"Erro no APIupdater: {e}")
                 time.sleep(1)
         print(f"Terminado APIupdater")
 
+    def render_fields(self, data):
+        """
+        Monta as linhas da tarja de um snapshot: cada linha é uma lista
+        ordenada de (campo do vMix, texto), já formatada como vai ao ar
+        """
+        rows = []
+
+        for key, info in data.get("cambio", {}).items():
+            if key not in self.config:
+                continue
+
+            row = self.config[key]
+            fields = [(row["name"], key)]
+            if "rate" in info:
+                fields.append((row["value"], f"{info['rate']:.4f}"))
+            if "change" in info:
+                fields.append((row["diff"], f"{info['change']:+.4f}"))
+            if "change_percent" in info:
+                fields.append((row["perc"], f"{info['change_percent']:+.2f}%"))
+            rows.append(fields)
+
+        ibov = data.get("bolsa", {}).get("IBOV")
+        if ibov and "IBOV" in self.config:
+            row = self.config["IBOV"]
+            arrow = "↑" if ibov["change"] >= 0 else "↓"
+            rows.append([
+                (row["name"], "IBOVESPA"),
+                (row["value"], f"{ibov['price']:+.2f}"),
+                (row["diff"], f"{arrow}{ibov['change']:+.2f}"),
+                (row["perc"], f"{ibov['change_percent']:+.2f}%"),
+            ])
+
+        return rows
+
+    def diff_fields(self, rows, full=False):
+        """Filtra apenas os campos cujo texto mudou desde o último envio"""
+        title = self.config["title"]
+        changed = []
+        for fields in rows:
+            fields = [
+                (field, text)
+                for field, text in fields
+                if full or self.last_sent.get((title, field)) != text
+            ]
+            if fields:
+                changed.append(fields)
+        return changed
+
+    def push(self, data):
+        """
+        Envia ao vMix só os campos que mudaram; a cada resync_interval
+        segundos reenvia tudo (caso o título tenha sido recarregado no vMix)
+        """
+        now = time.monotonic()
+        full = self.resync_interval > 0 and now - self.last_resync >= self.resync_interval
+        if full:
+            self.last_resync = now
+
+        title = self.config["title"]
+        changed = self.diff_fields(self.render_fields(data), full=full)
+        if not changed:
+            return None
+
+        batch = self.dispatcher.dispatch(
+            self.config["ip"], self.config["porta"], title, changed,
+            request_time=get_vmix_pool().max_request_time,
+        )
+        for field, text, ok in batch["results"]:
+            if ok:
+                self.last_sent[(title, field)] = text
+
+        self.last_batch = batch
+        observe("vmix_batch", batch["elapsed"], batch["failed"] == 0)
+        print(
+            f"Lote vMix: {batch['sent']} campos enviados, {batch['failed']} falhas "
+            f"em {batch['elapsed'] * 1000:.0f} ms "
+            f"(snapshots descartados: {self.queue.dropped})"
+        )
+        return batch
+
     def stop(self):
         self.running = False
 
@@ -215,14 +280,20 @@ class ApiUpdater(threading.Thread):
             # print(f"Enviando para {url}")
 
             try:
-                response = requests.get(url, timeout=5)
-                response.raise_for_status()
+                with span("vmix_send"):
+                    response = get_vmix_pool().get(url)
+                    response.raise_for_status()
             except requests.RequestException as e:
                 print(f"Erro ao enviar mensagem para {url}: {e}")
 
 
 def apply_config_to_updaters(config):
     """Aplica configurações aos updaters"""
+    global vmix_pool
+
+    # Recria o pool HTTP do vMix com as novas configurações (ip/timeouts)
+    reset_pool("vmix")
+    vmix_pool = None
 
     # Atualizar configurações da classe ApiUpdater
     ApiUpdater.ip = config["ip"]
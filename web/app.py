@@ -5,19 +5,28 @@ Exibe dados de câmbio e bolsa em tempo real
 
 import sys
 import os
+import hmac
 from datetime import datetime
 import json
 import threading
 import time
+from collections import deque
 
 # Adiciona o diretório pai ao path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, Response, render_template, jsonify, request
 from flask_cors import CORS
-from flask_socketio import SocketIO, emit
+from flask_socketio import SocketIO, emit, join_room, leave_room
 
+from collector_daemon import SnapshotSubscriber, get_authkey
 from financial_collector import FinancialDataCollector
+from history_log import HistoryReader
+from snapshot import SnapshotRefresher
+from delta import ALL_ROOM, DeltaPublisher, subscription_rooms
+from http_cache import ResponseCache
+from metrics import PROMETHEUS_CONTENT_TYPE, render_prometheus, span
+from profiling import get_profiler, install_signal_handler
 
 # Configuração do Flask
 app = Flask(__name__)
@@ -25,44 +34,144 @@ app.config["SECRET_KEY"] = "financial_dashboard_secret_key_2025"
 CORS(app)
 socketio = SocketIO(app, cors_allowed_origins="*")
 
-# Instância global do coletor
-collector = FinancialDataCollector()
-collector.update_interval = 30  # 30 segundos
+# Com COLLECTOR_ADDRESS o servidor só assina os snapshots publicados pelo
+# daemon de coleta (collector_daemon.py) e não busca dados por conta própria;
+# assim vários workers web dividem uma única coleta
+COLLECTOR_ADDRESS = os.getenv("COLLECTOR_ADDRESS")
 
-# Dados globais atualizados
-current_data = {}
-last_update = None
+# Instância global do coletor (só no modo sem daemon)
+if COLLECTOR_ADDRESS:
+    # Sem COLLECTOR_AUTHKEY o worker não sobe (em vez de ficar tentando conectar)
+    get_authkey()
+    collector = None
+else:
+    collector = FinancialDataCollector()
+    collector.update_interval = 30  # 30 segundos
 
+# Perfil sob demanda da coleta em background (POST /admin/profile)
+profiler = get_profiler("update_data_background")
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
 
-def update_data_background():
-    """Thread para atualizar dados em background"""
-    global current_data, last_update
+# Respostas /api/* serializadas e comprimidas uma vez por versão do snapshot
+response_cache = ResponseCache(
+    dumps=app.json.dumps, max_age=int(os.getenv("HTTP_CACHE_MAX_AGE", 5))
+)
+
+# Leitura do histórico em disco (arquivos mapeados com mmap)
+history_reader = HistoryReader()
+
+# Protocolo incremental: snapshot completo na conexão, depois patches numerados
+publisher = DeltaPublisher()
+
+# Salas assinadas por cliente (sid -> salas); sem assinatura = sala "all"
+subscriptions = {}
+# Máximo de símbolos + grupos por cliente
+MAX_SUBSCRIPTIONS = int(os.getenv("MAX_SUBSCRIPTIONS", 50))
+
+# Patches de cada snapshot novo, esperando o envio. Os emits rodam numa
+# tarefa do Socket.IO (broadcast_patches) e não na thread da coleta: no modo
+# eventlet, emits feitos de threads comuns não chegam aos clientes
+pending_patches = deque()
+BROADCAST_INTERVAL = 0.05
+
+
+def client_rooms():
+    return subscriptions.get(request.sid, [ALL_ROOM])
+
+
+def update_active_rooms():
+    """Só salas com algum cliente recebem patches e guardam seq"""
+    publisher.set_active_rooms({room for rooms in subscriptions.values() for room in rooms})
 
+
+def publish_update(data, updated_at):
+    """Grava o histórico e envia aos clientes só o que mudou no snapshot novo"""
+    # Com o daemon, o histórico em disco é gravado por ele
+    if collector is not None:
+        collector.history_log.append_snapshot(collector.last_changes)
+
+    with span("aggregate", step="delta"):
+        patches = publisher.publish(data, updated_at.isoformat())
+    if patches:
+        pending_patches.append(patches)
+
+
+def emit_patches(patches):
+    """Cada sala (tudo, classe de ativo ou símbolo) recebe só os seus campos"""
+    with span("broadcast"):
+        for room, patch in patches.items():
+            socketio.emit("data_patch", patch, to=room)
+
+
+def broadcast_patches():
+    """Tarefa do Socket.IO que envia os patches enfileirados, em ordem"""
     while True:
-        try:
-            print(f"🔄 Atualizando dados... {datetime.now().strftime('%H:%M:%S')}")
+        while pending_patches:
+            try:
+                emit_patches(pending_patches.popleft())
+            except Exception as e:
+                print(f"❌ Erro ao enviar patch: {e}")
+        socketio.sleep(BROADCAST_INTERVAL)
+
+
+# Snapshot compartilhado: as rotas leem daqui. É alimentado só de fora,
+# pela coleta agendada (update_data_background) ou pelo daemon de coleta;
+# pedidos de atualização recebem o snapshot mais novo, sem buscar de novo
+# uma fonte que já tem busca agendada
+# Atualização manual: pede uma rodada já ao agendador (no máximo uma a cada
+# MIN_REFRESH_INTERVAL segundos); com o daemon, vale o último snapshot recebido
+snapshot = SnapshotRefresher(
+    on_update=publish_update,
+    trigger=collector.refresh_now if collector is not None else None,
+    min_interval=int(os.getenv("MIN_REFRESH_INTERVAL", 10)),
+)
+
 
-            # Coleta novos dados
-            new_data = collector.collect_all_data()
-            current_data = new_data
-            last_update = datetime.now()
+def update_data_background():
+    """Thread da coleta agendada (cada fonte no seu período, em taxa fixa)"""
+    snapshots = collector.scheduled_snapshots()
 
-            # Envia via WebSocket para todos os clientes conectados
-            socketio.emit(
-                "data_update", {"data": new_data, "timestamp": last_update.isoformat()}
-            )
+    while True:
+        try:
+            # Espera o próximo snapshot (o patch vai via WebSocket em publish_update)
+            with profiler.iteration():
+                snapshot.receive(next(snapshots))
 
-            print(f"✅ Dados atualizados e enviados via WebSocket")
+            print(f"✅ Dados atualizados e enviados via WebSocket {datetime.now().strftime('%H:%M:%S')}")
 
         except Exception as e:
             print(f"❌ Erro na atualização: {e}")
 
-        time.sleep(collector.update_interval)
 
+_background_started = False
+
+
+def start_background():
+    """
+    Inicia a atualização em background (uma vez só); chamado por quem sobe
+    o servidor, e não na importação do módulo
+    """
+    global _background_started
+    if _background_started:
+        return
+    _background_started = True
 
-# Inicia thread de atualização em background
-update_thread = threading.Thread(target=update_data_background, daemon=True)
-update_thread.start()
+    # kill -USR1 arma o perfil (só quando chamado da thread principal)
+    install_signal_handler()
+    socketio.start_background_task(broadcast_patches)
+
+    if COLLECTOR_ADDRESS:
+        # Recebe os snapshots do daemon de coleta em background
+        SnapshotSubscriber(snapshot.receive, COLLECTOR_ADDRESS).start()
+    else:
+        # Inicia thread de atualização em background
+        threading.Thread(target=update_data_background, daemon=True).start()
+
+
+@app.before_request
+def ensure_background():
+    """Com `flask run` não há __main__: inicia no primeiro acesso"""
+    start_background()
 
 
 @app.route("/")
@@ -75,19 +184,19 @@ def dashboard():
 def get_data():
     """API endpoint para obter dados financeiros"""
     try:
-        if not current_data:
-            # Se não há dados, coleta uma vez
-            data = collector.collect_all_data()
-        else:
-            data = current_data
-
-        return jsonify(
-            {
+        # Se não há dados, espera o primeiro snapshot
+        snapshot.ensure()
+        version, last_update, full = snapshot.read(lambda data: publisher.full())
+
+        return response_cache.respond(
+            "data",
+            version,
+            lambda: {
                 "success": True,
-                "data": data,
+                "data": full["data"],
+                "seq": full["seqs"][ALL_ROOM],
                 "last_update": last_update.isoformat() if last_update else None,
-                "server_time": datetime.now().isoformat(),
-            }
+            },
         )
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
@@ -97,13 +206,16 @@ def get_data():
 def get_cambio():
     """API endpoint específico para dados de câmbio"""
     try:
-        cambio_data = collector.cambio_api.get_all_rates()
-        return jsonify(
-            {
+        snapshot.ensure()
+        version, last_update, data = snapshot.read()
+        return response_cache.respond(
+            "cambio",
+            version,
+            lambda: {
                 "success": True,
-                "data": cambio_data,
-                "timestamp": datetime.now().isoformat(),
-            }
+                "data": data.get("cambio", {}),
+                "timestamp": (last_update or datetime.now()).isoformat(),
+            },
         )
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
@@ -113,13 +225,16 @@ def get_cambio():
 def get_bolsa():
     """API endpoint específico para dados da bolsa"""
     try:
-        bolsa_data = collector.bolsa_api.get_all_indices()
-        return jsonify(
-            {
+        snapshot.ensure()
+        version, last_update, data = snapshot.read()
+        return response_cache.respond(
+            "bolsa",
+            version,
+            lambda: {
                 "success": True,
-                "data": bolsa_data,
-                "timestamp": datetime.now().isoformat(),
-            }
+                "data": data.get("bolsa", {}),
+                "timestamp": (last_update or datetime.now()).isoformat(),
+            },
         )
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
@@ -129,60 +244,166 @@ def get_bolsa():
 def get_summary():
     """API endpoint para resumo executivo"""
     try:
-        if current_data:
-            summary = collector.get_summary(current_data)
-        else:
-            data = collector.collect_all_data()
-            summary = collector.get_summary(data)
+        snapshot.ensure()
+        version, last_update, data = snapshot.read()
+        return response_cache.respond(
+            "summary",
+            version,
+            lambda: {
+                "success": True,
+                "summary": FinancialDataCollector.get_summary(data),
+                "timestamp": (last_update or datetime.now()).isoformat(),
+            },
+        )
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
 
+
+def parse_time_arg(value, default):
+    """Converte from/to da query string (epoch em segundos ou ISO 8601)"""
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+@app.route("/api/history")
+def get_history():
+    """API endpoint para o histórico de um símbolo (?symbol=&from=&to=)"""
+    symbol = request.args.get("symbol")
+    if not symbol:
+        return jsonify({"success": False, "error": "Parâmetro 'symbol' é obrigatório"}), 400
+
+    try:
+        end = parse_time_arg(request.args.get("to"), time.time())
+        # Padrão: últimas 24 horas
+        start = parse_time_arg(request.args.get("from"), end - 24 * 60 * 60)
+    except ValueError as e:
+        return jsonify({"success": False, "error": f"Horário inválido: {e}"}), 400
+
+    try:
+        records = history_reader.slice(symbol, start, end)
         return jsonify(
             {
                 "success": True,
-                "summary": summary,
-                "timestamp": datetime.now().isoformat(),
+                "symbol": symbol,
+                "from": start,
+                "to": end,
+                "data": {
+                    field: records[field].tolist()
+                    for field in ("timestamp", "price", "change", "change_percent", "volume")
+                },
             }
         )
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
 
+@app.route("/admin/profile", methods=["GET", "POST"])
+def admin_profile():
+    """Arma o perfil das próximas iterações da coleta (?iterations=N&mode=)"""
+    # Sem ADMIN_TOKEN configurado a rota não existe
+    if not ADMIN_TOKEN:
+        return jsonify({"success": False, "error": "Não encontrado"}), 404
+    token = request.headers.get("X-Admin-Token", "")
+    if not hmac.compare_digest(token, ADMIN_TOKEN):
+        return jsonify({"success": False, "error": "Token inválido"}), 403
+    if collector is None:
+        return jsonify(
+            {"success": False, "error": "A coleta roda no daemon; use kill -USR1 no daemon"}
+        ), 409
+
+    if request.method == "GET":
+        return jsonify({"success": True, "profile": profiler.status()})
+
+    try:
+        iterations = int(request.args.get("iterations", 3))
+        status = profiler.request(iterations, request.args.get("mode"))
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    return jsonify({"success": True, "profile": status})
+
+
+@app.route("/metrics")
+def get_metrics():
+    """Latências e contadores de cada etapa no formato do Prometheus"""
+    return Response(render_prometheus(), mimetype=PROMETHEUS_CONTENT_TYPE)
+
+
 @socketio.on("connect")
 def handle_connect():
     """Quando um cliente se conecta via WebSocket"""
     print(f"🔌 Cliente conectado: {request.sid}")
+    start_background()
+    join_room(ALL_ROOM)
 
-    # Envia dados atuais imediatamente
-    if current_data:
-        emit(
-            "data_update",
-            {
-                "data": current_data,
-                "timestamp": (
-                    last_update.isoformat()
-                    if last_update
-                    else datetime.now().isoformat()
-                ),
-            },
-        )
+    # Envia o snapshot completo imediatamente; depois o cliente recebe patches
+    if publisher.data:
+        emit("data_update", publisher.full())
 
 
 @socketio.on("disconnect")
 def handle_disconnect():
     """Quando um cliente se desconecta"""
     print(f"🔌 Cliente desconectado: {request.sid}")
+    if subscriptions.pop(request.sid, None):
+        update_active_rooms()
+
+
+@socketio.on("subscribe")
+def handle_subscribe(message):
+    """
+    Cliente assina símbolos e/ou classes de ativo:
+    {"symbols": ["USD-BRL", "IBOV"], "groups": ["cambio"]}
+    Lista vazia volta a receber tudo.
+    """
+    message = message if isinstance(message, dict) else {}
+    try:
+        # Símbolos e grupos são conferidos contra o snapshot atual
+        snapshot.ensure()
+        rooms = subscription_rooms(
+            publisher.data, message.get("symbols"), message.get("groups"), MAX_SUBSCRIPTIONS
+        ) or [ALL_ROOM]
+    except ValueError as e:
+        emit("error", {"message": f"Assinatura inválida: {e}"})
+        return
+
+    for room in client_rooms():
+        leave_room(room)
+    for room in rooms:
+        join_room(room)
+
+    if rooms == [ALL_ROOM]:
+        subscriptions.pop(request.sid, None)
+    else:
+        subscriptions[request.sid] = rooms
+    update_active_rooms()
+
+    emit("data_update", publisher.full(rooms))
+    print(f"📌 {request.sid} assinou: {', '.join(rooms)}")
 
 
 @socketio.on("request_update")
 def handle_request_update():
     """Cliente solicita atualização manual"""
     try:
-        data = collector.collect_all_data()
-        emit("data_update", {"data": data, "timestamp": datetime.now().isoformat()})
+        # Coleta já (single-flight, limitada por MIN_REFRESH_INTERVAL)
+        snapshot.refresh()
+        emit("data_update", publisher.full(client_rooms()))
         print(f"📱 Atualização manual enviada para {request.sid}")
     except Exception as e:
         emit("error", {"message": str(e)})
 
 
+@socketio.on("request_resync")
+def handle_request_resync():
+    """Cliente detectou um salto no seq dos patches e pede o snapshot completo"""
+    emit("data_update", publisher.full(client_rooms()))
+    print(f"🔁 Resync enviado para {request.sid}")
+
+
 if __name__ == "__main__":
     print("🚀 Iniciando Dashboard Financeiro Web")
     print("=" * 50)
@@ -190,18 +411,19 @@ if __name__ == "__main__":
     print("🔗 API Dados: http://localhost:5000/api/data")
     print("💱 API Câmbio: http://localhost:5000/api/cambio")
     print("📈 API Bolsa: http://localhost:5000/api/bolsa")
+    print("🕒 API Histórico: http://localhost:5000/api/history?symbol=USD-BRL")
     print("=" * 50)
     print("💡 Pressione Ctrl+C para parar")
     print()
 
-    # Coleta dados iniciais
-    print("🔄 Coletando dados iniciais...")
-    try:
-        current_data = collector.collect_all_data()
-        last_update = datetime.now()
-        print("✅ Dados iniciais carregados!")
-    except Exception as e:
-        print(f"⚠️ Erro ao carregar dados iniciais: {e}")
+    # Os dados iniciais chegam da coleta agendada ou da assinatura do daemon;
+    # até lá /api/data espera pelo primeiro snapshot
+    if collector is not None:
+        print("🔄 Iniciando a coleta agendada...")
+    else:
+        print(f"📡 Assinando o daemon de coleta em {COLLECTOR_ADDRESS}")
+
+    start_background()
 
     # Inicia servidor
     socketio.run(app, debug=True, host="0.0.0.0", port=5000)
@@ -0,0 +1,213 @@
+"""
+Protocolo incremental do evento Socket.IO de dados
+
+- data_update: snapshot completo {seqs, data, timestamp} (na conexão e em resync)
+- data_patch: só os campos que mudaram {room, seq, timestamp, set, unset}
+  set = [[caminho, valor], ...], unset = [caminho, ...], onde caminho é a
+  lista de chaves (ex.: ["cambio", "USD-BRL", "rate"]); um símbolo que sai
+  do snapshot vem inteiro em unset (ex.: ["bolsa", "DAX"])
+
+Os patches são separados por sala (tópico):
+- "all": tudo (clientes sem assinatura)
+- "group:cambio", "group:bolsa", "group:acoes": uma classe de ativo
+- "symbol:USD-BRL", "symbol:IBOV"...: um símbolo
+Campos fora das classes de ativo (timestamp, market_status) vão para todas.
+
+Cada sala tem seu seq, que cresce de 1 em 1 a cada patch; o cliente que
+perceber um salto pede "request_resync" e recebe um data_update completo.
+Só as salas com algum cliente (set_active_rooms) recebem patches e guardam
+seq.
+"""
+
+import copy
+import threading
+
+
+# Campos que mudam a cada coleta sem mudar a cotação (horário de cada item);
+# o horário do snapshot vai no próprio patch
+IGNORED_FIELDS = {"timestamp"}
+
+# Grupos do snapshot cujas chaves são símbolos
+QUOTE_GROUPS = ("cambio", "bolsa", "acoes")
+
+ALL_ROOM = "all"
+
+
+def leaf_rooms(path):
+    """Salas que recebem uma folha, ou None se ela vai para todas"""
+    if path[0] not in QUOTE_GROUPS:
+        return None
+
+    rooms = [ALL_ROOM, f"group:{path[0]}"]
+    if len(path) > 1:
+        rooms.append(f"symbol:{path[1]}")
+    return rooms
+
+
+def subscription_rooms(data, symbols, groups, limit):
+    """
+    Salas de uma assinatura {"symbols": [...], "groups": [...]}, validadas
+    contra o snapshot atual; ValueError se a assinatura for inválida
+    """
+    symbols = [] if symbols is None else symbols
+    groups = [] if groups is None else groups
+    if not isinstance(symbols, list) or not isinstance(groups, list):
+        raise ValueError("symbols e groups devem ser listas")
+    if not all(isinstance(item, str) for item in symbols + groups):
+        raise ValueError("symbols e groups devem conter apenas textos")
+
+    rooms = list(dict.fromkeys(
+        [f"symbol:{symbol}" for symbol in symbols] + [f"group:{group}" for group in groups]
+    ))
+    if len(rooms) > limit:
+        raise ValueError(f"Máximo de {limit} assinaturas por cliente")
+
+    unknown = [group for group in groups if group not in QUOTE_GROUPS]
+    known_symbols = {symbol for group in QUOTE_GROUPS for symbol in data.get(group, {})}
+    unknown += [symbol for symbol in symbols if symbol not in known_symbols]
+    if unknown:
+        raise ValueError(f"Desconhecidos: {', '.join(unknown[:10])}")
+    return rooms
+
+
+def filter_snapshot(data, rooms):
+    """Parte do snapshot que interessa a quem assina essas salas"""
+    if ALL_ROOM in rooms:
+        return data
+
+    filtered = {key: value for key, value in data.items() if key not in QUOTE_GROUPS}
+    for group in QUOTE_GROUPS:
+        if group not in data:
+            continue
+        if f"group:{group}" in rooms:
+            filtered[group] = data[group]
+        else:
+            filtered[group] = {
+                symbol: info
+                for symbol, info in data[group].items()
+                if f"symbol:{symbol}" in rooms
+            }
+    return filtered
+
+
+def flatten(data, path=()):
+    """Folhas de um dicionário aninhado: {caminho (tupla): valor}"""
+    leaves = {}
+    for key, value in data.items():
+        if path and key in IGNORED_FIELDS:
+            continue
+        if isinstance(value, dict):
+            leaves.update(flatten(value, path + (key,)))
+        else:
+            leaves[path + (key,)] = value
+    return leaves
+
+
+def removed_paths(old, new, path=()):
+    """
+    Caminhos que sumiram de old para new; uma subárvore removida inteira
+    (ex.: um símbolo que saiu do snapshot) vira um único caminho
+    """
+    removed = []
+    for key, value in old.items():
+        if path and key in IGNORED_FIELDS:
+            continue
+        if key not in new:
+            removed.append(list(path + (key,)))
+        elif isinstance(value, dict) and isinstance(new[key], dict):
+            removed.extend(removed_paths(value, new[key], path + (key,)))
+    return removed
+
+
+def diff_snapshots(old, new):
+    """Retorna (set, unset): folhas alteradas/novas e caminhos removidos"""
+    old_leaves = flatten(old or {})
+    new_leaves = flatten(new or {})
+
+    changed = [
+        [list(path), value]
+        for path, value in new_leaves.items()
+        if path not in old_leaves or old_leaves[path] != value
+    ]
+    return changed, removed_paths(old or {}, new or {})
+
+
+class DeltaPublisher:
+    """Numera os snapshots e calcula os patches de cada sala em relação ao anterior"""
+
+    def __init__(self):
+        self.seqs = {}
+        # Salas com algum cliente; as demais não recebem patches
+        self.active = {ALL_ROOM}
+        self.data = {}
+        self.timestamp = None
+        self._lock = threading.Lock()
+
+    @property
+    def seq(self):
+        return self.seqs.get(ALL_ROOM, 0)
+
+    def publish(self, data, timestamp):
+        """
+        Registra um snapshot novo e retorna {sala: patch} só das salas
+        em que algo mudou
+        """
+        with self._lock:
+            changed, removed = diff_snapshots(self.data, data)
+            self.data = copy.deepcopy(data)
+            self.timestamp = timestamp
+            if not changed and not removed:
+                return {}
+
+            by_room = {}
+            shared = {"set": [], "unset": []}
+            for kind, entries in (("set", changed), ("unset", removed)):
+                for entry in entries:
+                    path = entry[0] if kind == "set" else entry
+                    rooms = leaf_rooms(path)
+                    if rooms is None:
+                        shared[kind].append(entry)
+                        rooms = [ALL_ROOM]
+                    for room in rooms:
+                        by_room.setdefault(room, {"set": [], "unset": []})[kind].append(entry)
+
+            # Campos compartilhados vão para todas as salas com clientes
+            for room in self.active:
+                patch = by_room.setdefault(room, {"set": [], "unset": []})
+                if room != ALL_ROOM:
+                    patch["set"].extend(shared["set"])
+                    patch["unset"].extend(shared["unset"])
+
+            patches = {}
+            for room, patch in by_room.items():
+                if room not in self.active or (not patch["set"] and not patch["unset"]):
+                    continue
+                self.seqs[room] = self.seqs.get(room, 0) + 1
+                patches[room] = {
+                    "room": room,
+                    "seq": self.seqs[room],
+                    "timestamp": timestamp,
+                    "set": patch["set"],
+                    "unset": patch["unset"],
+                }
+            return patches
+
+    def set_active_rooms(self, rooms):
+        """Salas assinadas por algum cliente; o seq das demais é descartado"""
+        with self._lock:
+            self.active = set(rooms) | {ALL_ROOM}
+            for room in list(self.seqs):
+                if room not in self.active:
+                    del self.seqs[room]
+
+    def full(self, rooms=(ALL_ROOM,)):
+        """Snapshot completo (filtrado pelas salas) com o seq atual de cada sala"""
+        with self._lock:
+            # Salas novas passam a receber também os campos compartilhados
+            for room in rooms:
+                self.seqs.setdefault(room, 0)
+            return {
+                "seqs": {room: self.seqs[room] for room in rooms},
+                "data": filter_snapshot(self.data, rooms),
+                "timestamp": self.timestamp,
+            }
@@ -0,0 +1,68 @@
+"""
+Cache HTTP das rotas /api/* do dashboard
+Cada versão do snapshot é serializada e comprimida (gzip) uma única vez;
+clientes com If-None-Match recebem 304 Not Modified
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+
+from flask import Response, request
+
+
+class CachedBody:
+    """Corpo JSON pronto de uma versão: original, gzip e um ETag para cada"""
+
+    def __init__(self, version, body):
+        self.version = version
+        self.body = body
+        self.gzip_body = gzip.compress(body, compresslevel=6)
+        self.etag = hashlib.sha1(body).hexdigest()[:20]
+        # ETag forte: representações com bytes diferentes, validadores diferentes
+        self.gzip_etag = f"{self.etag}-gzip"
+
+
+class ResponseCache:
+    """Respostas serializadas por rota, reconstruídas só quando a versão muda"""
+
+    def __init__(self, dumps=json.dumps, max_age=5):
+        self.dumps = dumps
+        self.max_age = max_age
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def entry(self, key, version, build):
+        """
+        Retorna o corpo pronto de key na versão pedida; build() monta o
+        payload só quando a versão muda (uma vez, mesmo com acessos simultâneos)
+        """
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is None or cached.version != version:
+                body = self.dumps(build()).encode("utf-8")
+                cached = self._entries[key] = CachedBody(version, body)
+            return cached
+
+    def respond(self, key, version, build):
+        cached = self.entry(key, version, build)
+        use_gzip = "gzip" in request.accept_encodings
+
+        headers = {
+            "ETag": f'"{cached.gzip_etag if use_gzip else cached.etag}"',
+            "Cache-Control": f"public, max-age={self.max_age}",
+            "Vary": "Accept-Encoding",
+        }
+
+        # Qualquer das duas representações desta versão continua válida
+        if cached.etag in request.if_none_match or cached.gzip_etag in request.if_none_match:
+            return Response(status=304, headers=headers)
+
+        if use_gzip:
+            headers["Content-Encoding"] = "gzip"
+            body = cached.gzip_body
+        else:
+            body = cached.body
+
+        return Response(body, status=200, mimetype="application/json", headers=headers)
@@ -8,7 +8,6 @@ Execute este arquivo para iniciar o servidor web
 import os
 import sys
 import webbrowser
-import time
 from threading import Timer
 
 # Adiciona o diretório pai ao path
@@ -36,7 +35,9 @@ def main():
 
     try:
         # Importa e executa a aplicação
-        from app import app, socketio
+        from app import app, socketio, start_background
+
+        start_background()
 
         print("✅ Servidor iniciado com sucesso!")
         print("🌐 Dashboard: http://localhost:5000")
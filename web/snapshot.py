@@ -0,0 +1,109 @@
+"""
+Snapshot compartilhado dos dados financeiros no servidor web
+Leituras veem versão, dados e seq dos patches sempre coerentes; pedidos
+de atualização simultâneos esperam pela mesma coleta (single-flight)
+"""
+
+import threading
+import time
+from datetime import datetime
+
+
+class SnapshotRefresher:
+    """
+    Guarda o último snapshot recebido de fora (receive): da coleta agendada
+    ou dos snapshots publicados pelo daemon de coleta
+
+    refresh() pede uma coleta já a quem alimenta o snapshot (trigger, ex.:
+    o agendador) e espera o resultado. Pedidos simultâneos compartilham a
+    mesma espera, e pedidos feitos antes de min_interval segundos desde o
+    último snapshot recebem o atual. Sem trigger (daemon de coleta), o
+    snapshot atual já é o mais novo disponível.
+    """
+
+    def __init__(self, on_update=None, wait_timeout=30, trigger=None, min_interval=10):
+        # Chamado uma vez por snapshot novo: on_update(data, last_update)
+        self.on_update = on_update
+        # Tempo máximo de espera pelo primeiro snapshot (ou pelo de refresh)
+        self.wait_timeout = wait_timeout
+        self.trigger = trigger
+        self.min_interval = min_interval
+
+        self.data = {}
+        self.last_update = None
+        # Incrementada a cada snapshot novo (chave do cache HTTP)
+        self.version = 0
+        self._updated_at = None
+        self._inflight = None
+        self._received = threading.Event()
+        self._lock = threading.Lock()
+
+    def is_fresh(self):
+        return (
+            self._updated_at is not None
+            and time.monotonic() - self._updated_at < self.min_interval
+        )
+
+    def ensure(self):
+        """Retorna o snapshot atual, esperando pelo primeiro se ainda não houver"""
+        if not self.data:
+            self._received.wait(self.wait_timeout)
+        return self.data
+
+    def refresh(self):
+        """Pede dados novos (respeitando min_interval) e espera por eles"""
+        if self.trigger is None:
+            return self.ensure()
+
+        with self._lock:
+            if self.data and self.is_fresh():
+                return self.data
+            inflight = self._inflight
+            leader = inflight is None
+            if leader:
+                inflight = self._inflight = threading.Event()
+
+        if leader:
+            try:
+                self.trigger()
+            except Exception:
+                self._finish(inflight)
+                raise
+
+        if not inflight.wait(self.wait_timeout):
+            # Nenhum snapshot a tempo: o próximo pedido dispara de novo
+            self._finish(inflight)
+        return self.data
+
+    def _finish(self, inflight):
+        with self._lock:
+            if self._inflight is inflight:
+                self._inflight = None
+        inflight.set()
+
+    def receive(self, data, last_update=None):
+        """Guarda um snapshot novo"""
+        last_update = last_update or datetime.now()
+        with self._lock:
+            # on_update (patches, seq) roda antes de a versão nova ficar
+            # visível: quem lê com read() vê versão, dados e seq coerentes
+            if self.on_update:
+                self.on_update(data, last_update)
+            self.data = data
+            self.version += 1
+            self.last_update = last_update
+            self._updated_at = time.monotonic()
+            inflight, self._inflight = self._inflight, None
+        self._received.set()
+        if inflight is not None:
+            inflight.set()
+        return data
+
+    def read(self, view=None):
+        """
+        Retorna (versão, horário, dados) lidos juntos; view(data), se
+        passado, roda sob o mesmo lock (ex.: para ler o seq do publisher)
+        """
+        with self._lock:
+            data = view(self.data) if view else self.data
+            return self.version, self.last_update, data
@@ -10,6 +10,13 @@ class FinancialDashboard {
         this.lastData = null;
         this.isConnected = false;
         
+        // Protocolo incremental: seq do último snapshot/patch aplicado, por sala
+        this.seqs = null;
+        this.resyncPending = false;
+        
+        // Assinatura opcional via URL: ?symbols=USD-BRL,IBOV&groups=cambio
+        this.subscription = this.readSubscription();
+        
         this.init();
     }
     
@@ -38,6 +45,10 @@ class FinancialDashboard {
             console.log('🔌 Conectado ao servidor');
             this.isConnected = true;
             this.updateStatus('online');
+            
+            if (this.subscription) {
+                this.socket.emit('subscribe', this.subscription);
+            }
         });
         
         this.socket.on('disconnect', () => {
@@ -46,10 +57,35 @@ class FinancialDashboard {
             this.updateStatus('offline');
         });
         
-        this.socket.on('data_update', (data) => {
+        // Snapshot completo (na conexão, em atualização manual e em resync)
+        this.socket.on('data_update', (message) => {
             console.log('📊 Dados atualizados via WebSocket');
-            this.updateDashboard(data.data);
-            this.updateLastUpdateTime(data.timestamp);
+            this.seqs = message.seqs;
+            this.resyncPending = false;
+            this.updateDashboard(message.data);
+            this.updateLastUpdateTime(message.timestamp);
+        });
+        
+        // Patch com apenas os campos que mudaram
+        this.socket.on('data_patch', (patch) => {
+            if (this.resyncPending) return;
+            
+            const current = this.seqs ? this.seqs[patch.room] : undefined;
+            
+            // Patch repetido ou mais antigo que o snapshot atual
+            if (current !== undefined && patch.seq <= current) return;
+            
+            if (current === undefined || patch.seq !== current + 1 || !this.lastData) {
+                console.warn(`⚠️ Salto na sequência de ${patch.room} (${current} → ${patch.seq}), pedindo resync`);
+                this.resyncPending = true;
+                this.socket.emit('request_resync');
+                return;
+            }
+            
+            this.applyPatch(this.lastData, patch);
+            this.seqs[patch.room] = patch.seq;
+            this.updateDashboard(this.lastData);
+            this.updateLastUpdateTime(patch.timestamp);
         });
         
         this.socket.on('error', (error) => {
@@ -162,6 +198,19 @@ class FinancialDashboard {
         }
     }
     
+    readSubscription() {
+        const params = new URLSearchParams(window.location.search);
+        const list = (name) => (params.get(name) || '')
+            .split(',')
+            .map((item) => item.trim())
+            .filter(Boolean);
+        
+        const symbols = list('symbols');
+        const groups = list('groups');
+        if (!symbols.length && !groups.length) return null;
+        return { symbols, groups };
+    }
+    
     async loadInitialData() {
         this.showLoading(true);
         
@@ -170,8 +219,14 @@ class FinancialDashboard {
             const result = await response.json();
             
             if (result.success) {
-                this.updateDashboard(result.data);
-                this.updateLastUpdateTime(result.last_update);
+                // /api/data traz tudo: só serve para quem não assinou salas,
+                // e o WebSocket pode já ter entregue um snapshot mais novo
+                const current = this.seqs ? this.seqs.all : undefined;
+                if (!this.subscription && (current === undefined || result.seq > current)) {
+                    this.seqs = { all: result.seq };
+                    this.updateDashboard(result.data);
+                    this.updateLastUpdateTime(result.last_update);
+                }
             } else {
                 this.showError('Erro ao carregar dados: ' + result.error);
             }
@@ -183,6 +238,38 @@ class FinancialDashboard {
         }
     }
     
+    applyPatch(data, patch) {
+        const walk = (path, create) => {
+            let node = data;
+            for (const key of path.slice(0, -1)) {
+                if (typeof node[key] !== 'object' || node[key] === null) {
+                    if (!create) return null;
+                    node[key] = {};
+                }
+                node = node[key];
+            }
+            return node;
+        };
+        
+        patch.set.forEach(([path, value]) => {
+            walk(path, true)[path[path.length - 1]] = value;
+        });
+        
+        patch.unset.forEach((path) => {
+            const node = walk(path, false);
+            if (!node) return;
+            delete node[path[path.length - 1]];
+            
+            // Remove os pais que ficaram vazios (ex.: símbolo sem campos)
+            for (let depth = path.length - 1; depth > 1; depth--) {
+                const parent = walk(path.slice(0, depth), false);
+                const key = path[depth - 1];
+                if (!parent || Object.keys(parent[key] || {}).length > 0) break;
+                delete parent[key];
+            }
+        });
+    }
+    
     updateDashboard(data) {
         this.lastData = data;
         